@@ -1,56 +1,116 @@
+import time
+
+# Taken before the other imports so --startup-timing covers them
+_IMPORT_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
-import subprocess
+import argparse
 import threading
-import time
-import psutil
-import queue
 import os
-import signal
 import shutil
 from datetime import datetime
-import webbrowser
-import platform
 
-# Determine system type
-PLATFORM = platform.system()
-IS_MACOS = PLATFORM == "Darwin"
+from batch_queue import DROP_OLDEST, BatchQueue
+from controller_core import OLLAMA, OPENWEBUI, ControllerCore, ollama_spec, openwebui_spec
+from installer import DONE, FAILED, LATEST, InstallError, Installer
+from lazy_import import lazy_module, preload
+from lifecycle import ACTIVE_STATES, CRASHED, HEALTHY, STARTING, STOPPING
+from log_view import LogBuffer, LogView
+from restart_policy import MODES, ON_FAILURE, RestartPolicy
+from sparkline import Sparkline
+from startup_timing import StartupTimer
+
+webbrowser = lazy_module("webbrowser")
+
+# Lines kept in memory, lines shown in the log widget, and lines moved from
+# the output queue to the widget per drain
+LOG_BUFFER_MAX_LINES = 100000
+LOG_VIEW_MAX_LINES = 5000
+LOG_DRAIN_BATCH = 20000
+# Lines waiting for the log widget; beyond this the oldest are dropped (the
+# on-disk log still has them)
+OUTPUT_QUEUE_MAX_LINES = 100000
 
-try:
-    import GPUtil
-    GPU_AVAILABLE = True
-except ImportError:
-    GPU_AVAILABLE = False
+# Ranges offered for the history charts, in seconds
+CHART_RANGES = {"5 min": 300, "1 hour": 3600, "24 hours": 86400, "7 days": 604800}
 
 class OpenWebUIController:
-    def __init__(self, root):
+    def __init__(self, root, startup_timer=None, exit_after_startup=False):
         self.root = root
+        # Records startup milestones when --startup-timing is given
+        self.startup_timer = startup_timer
+        self.exit_after_startup = exit_after_startup
+        self.mark_startup("imports")
         self.root.title("OpenWebUI Controller")
-        self.root.geometry("800x600")
+        self.root.geometry("900x900")
         
-        # Process variables
-        self.process = None
-        self.running = False
-        self.output_queue = queue.Queue()
+        self.output_queue = BatchQueue(OUTPUT_QUEUE_MAX_LINES, DROP_OLDEST)
         
-        # Command configuration
-        self.command_var = tk.StringVar(value="open-webui")
+        # Versioned installs; the selected one is the default command
+        self.installer = Installer()
+        current = self.installer.current()
         
-        # Ollama variables
-        self.ollama_process = None
-        self.ollama_running = False
+        # Command configuration
+        self.command_var = tk.StringVar(value=current.command if current else "open-webui")
+        self.host_var = tk.StringVar(value="0.0.0.0")
+        self.port_var = tk.StringVar(value="8080")
+        self.restart_var = tk.StringVar(value=ON_FAILURE)
+        self.prewarm_var = tk.BooleanVar(value=False)
+        self.install_version_var = tk.StringVar(value=LATEST)
+        self.installed_version_var = tk.StringVar(value=current.version if current else "")
+        self.install_progress_var = tk.StringVar(value="")
+        
+        # Services and metrics live in the UI-independent core (also used by
+        # owui_daemon.py); this window is one client of it
+        self._closing = False
+        self.core = ControllerCore(
+            specs=[ollama_spec(), self.configured_spec()],
+            on_output=self.on_service_output,
+            on_state_change=self.on_service_state,
+        )
+        self.supervisor = self.core.supervisor
+        self.sampler = self.core.sampler
+        self.startup_history = self.supervisor.startup_history
+        for error in self.core.load_errors:
+            self.output_queue.put([f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error}"])
+        self._last_snapshot = None
+        self._ui_render_seconds = 0.0
         
         # Create the GUI
         self.create_widgets()
+        self.mark_startup("widgets")
+        
+        # Let the window paint before doing anything that can wait: checking the
+        # command, loading the metric history and starting the sampler
+        self._startup_finished = False
+        self.root.bind("<Expose>", lambda e: self.finish_startup(), add="+")
+        self.root.after(500, self.finish_startup)
+        
+        # Start checking the output queue
+        self.check_queue()
+    
+    def mark_startup(self, milestone):
+        if self.startup_timer is not None:
+            self.startup_timer.mark(milestone)
+    
+    def finish_startup(self):
+        """Second half of startup, run once the window has been drawn."""
+        if self._startup_finished:
+            return
+        self._startup_finished = True
+        self.mark_startup("window")
         
-        # Update resources periodically
         self.check_and_update_command_status()
         
-        # Start monitoring system resources
+        # Start monitoring system resources; the GPU backend is opened on the sampler thread
+        self.core.start()
+        for chart in self.charts:
+            chart.redraw()
         self.update_resources()
         
-        # Start checking the output queue
-        self.check_queue()
+        # Warm up what the first service start needs
+        preload("asyncio", "psutil")
 
     def create_widgets(self):
         # Main frame
@@ -94,6 +154,36 @@ class OpenWebUIController:
             wraplength=500)
         self.install_instructions.grid(row=3, column=0, columnspan=3, sticky=tk.W, padx=5, pady=2)
         
+        # Address the service listens on (passed to "serve" and used for readiness probing)
+        address_frame = ttk.Frame(config_frame)
+        address_frame.grid(row=4, column=0, columnspan=3, sticky=tk.W, pady=2)
+        ttk.Label(address_frame, text="Host:").pack(side=tk.LEFT, padx=5)
+        ttk.Entry(address_frame, textvariable=self.host_var, width=15).pack(side=tk.LEFT, padx=5)
+        ttk.Label(address_frame, text="Port:").pack(side=tk.LEFT, padx=5)
+        ttk.Entry(address_frame, textvariable=self.port_var, width=6).pack(side=tk.LEFT, padx=5)
+        
+        # What to do when the service goes down without being stopped
+        ttk.Label(address_frame, text="Restart:").pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(address_frame, textvariable=self.restart_var, values=MODES, width=10,
+                     state="readonly").pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(address_frame, text="Pre-warm", variable=self.prewarm_var).pack(side=tk.LEFT, padx=5)
+        for var in (self.restart_var, self.prewarm_var):
+            var.trace_add("write", lambda *args: self.supervisor.set_restart_policy(OPENWEBUI, self.restart_policy()))
+        
+        # Versions installed into their own environments; picking one switches the command
+        version_frame = ttk.Frame(config_frame)
+        version_frame.grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=2)
+        ttk.Label(version_frame, text="Version:").pack(side=tk.LEFT, padx=5)
+        ttk.Entry(version_frame, textvariable=self.install_version_var, width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Button(version_frame, text="Install", command=self.install_open_webui).pack(side=tk.LEFT, padx=5)
+        ttk.Label(version_frame, text="Installed:").pack(side=tk.LEFT, padx=5)
+        self.installed_combo = ttk.Combobox(version_frame, textvariable=self.installed_version_var, width=12,
+                                            state="readonly",
+                                            values=[record.version for record in self.installer.installed()])
+        self.installed_combo.pack(side=tk.LEFT, padx=5)
+        self.installed_combo.bind("<<ComboboxSelected>>", lambda e: self.use_version(self.installed_version_var.get()))
+        ttk.Label(version_frame, textvariable=self.install_progress_var).pack(side=tk.LEFT, padx=5)
+        
         # Control frame
         control_frame = ttk.LabelFrame(main_frame, text="Controls", padding="10")
         control_frame.pack(fill=tk.X, pady=5)
@@ -112,10 +202,39 @@ class OpenWebUIController:
         status_label.pack(side=tk.LEFT, padx=20)
         
         # Add clickable link to localhost
-        self.localhost_link = ttk.Label(control_frame, text="http://localhost:8080", 
+        self.localhost_link = ttk.Label(control_frame, text=self.service_url(), 
                                         foreground="blue", cursor="hand2")
         self.localhost_link.pack(side=tk.LEFT, padx=5)
-        self.localhost_link.bind("<Button-1>", lambda e: webbrowser.open("http://localhost:8080"))
+        self.localhost_link.bind("<Button-1>", lambda e: webbrowser.open(self.service_url()))
+        for var in (self.host_var, self.port_var):
+            var.trace_add("write", lambda *args: self.localhost_link.config(text=self.service_url()))
+        
+        # Ollama controls
+        self.ollama_stop_btn = ttk.Button(control_frame, text="Stop Ollama", command=self.stop_ollama, state=tk.DISABLED)
+        self.ollama_stop_btn.pack(side=tk.RIGHT, padx=5)
+        self.ollama_start_btn = ttk.Button(control_frame, text="Start Ollama", command=self.start_ollama)
+        self.ollama_start_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # Services frame: every supervised service, including ones from services.json
+        services_frame = ttk.LabelFrame(main_frame, text="Services", padding="10")
+        services_frame.pack(fill=tk.X, pady=5)
+        
+        columns = ("state", "pid", "port", "memory", "cpu", "ready", "restarts")
+        self.services_tree = ttk.Treeview(services_frame, columns=columns, height=4)
+        self.services_tree.heading("#0", text="Service")
+        self.services_tree.column("#0", width=160)
+        for column, heading, width in zip(columns, ("State", "PID", "Port", "Memory", "CPU", "Ready In", "Restarts (MTTR)"),
+                                          (90, 70, 60, 100, 60, 70, 110)):
+            self.services_tree.heading(column, text=heading)
+            self.services_tree.column(column, width=width, anchor=tk.W)
+        for service in self.supervisor.services():
+            self.services_tree.insert("", tk.END, iid=service.name, text=service.name)
+        self.services_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        service_buttons = ttk.Frame(services_frame)
+        service_buttons.pack(side=tk.LEFT, padx=5)
+        ttk.Button(service_buttons, text="Start", command=lambda: self.control_selected(start=True)).pack(fill=tk.X, pady=2)
+        ttk.Button(service_buttons, text="Stop", command=lambda: self.control_selected(start=False)).pack(fill=tk.X, pady=2)
         
         # Resources frame
         resources_frame = ttk.LabelFrame(main_frame, text="System Resources", padding="10")
@@ -153,19 +272,87 @@ class OpenWebUIController:
         self.gpu_memory_progress = ttk.Progressbar(resources_frame, orient=tk.HORIZONTAL, length=200, mode='determinate')
         self.gpu_memory_progress.grid(row=3, column=2, padx=5)
         
+        # Request throughput parsed from the services' access logs
+        ttk.Label(resources_frame, text="Requests:").grid(row=4, column=0, sticky=tk.W, padx=5)
+        self.requests_var = tk.StringVar(value="N/A")
+        ttk.Label(resources_frame, textvariable=self.requests_var).grid(row=4, column=1, columnspan=2, sticky=tk.W, padx=5)
+        
         # Process info if running
-        ttk.Label(resources_frame, text="Process Memory:").grid(row=4, column=0, sticky=tk.W, padx=5)
+        ttk.Label(resources_frame, text="Process Memory:").grid(row=5, column=0, sticky=tk.W, padx=5)
         self.proc_mem_var = tk.StringVar(value="N/A")
-        ttk.Label(resources_frame, textvariable=self.proc_mem_var).grid(row=4, column=1, sticky=tk.W, padx=5)
+        ttk.Label(resources_frame, textvariable=self.proc_mem_var).grid(row=5, column=1, columnspan=3, sticky=tk.W, padx=5)
+        
+        # Whole process tree: the shell plus the uvicorn workers and model runners below it
+        ttk.Label(resources_frame, text="Process Tree:").grid(row=6, column=0, sticky=tk.W, padx=5)
+        self.proc_tree_var = tk.StringVar(value="N/A")
+        ttk.Label(resources_frame, textvariable=self.proc_tree_var).grid(row=6, column=1, columnspan=3, sticky=tk.W, padx=5)
+        
+        # Optional per-process breakdown and USS/PSS, both costlier to sample
+        process_options = ttk.Frame(resources_frame)
+        process_options.grid(row=7, column=0, sticky=tk.NW, padx=5)
+        self.proc_breakdown_enabled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(process_options, text="Per-process breakdown", variable=self.proc_breakdown_enabled,
+                        command=lambda: self.sampler.set_process_breakdown(self.proc_breakdown_enabled.get())
+                        ).pack(anchor=tk.W)
+        self.proc_full_memory_enabled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(process_options, text="USS/PSS memory", variable=self.proc_full_memory_enabled,
+                        command=lambda: self.sampler.set_process_full_memory(self.proc_full_memory_enabled.get())
+                        ).pack(anchor=tk.W)
+        self.proc_breakdown_var = tk.StringVar(value="")
+        ttk.Label(resources_frame, textvariable=self.proc_breakdown_var, justify=tk.LEFT).grid(row=7, column=1, columnspan=3, sticky=tk.W, padx=5)
+        
+        # Cost of monitoring itself
+        ttk.Label(resources_frame, text="Monitor Overhead:").grid(row=8, column=0, sticky=tk.W, padx=5)
+        self.overhead_var = tk.StringVar(value="N/A")
+        ttk.Label(resources_frame, textvariable=self.overhead_var).grid(row=8, column=1, columnspan=3, sticky=tk.W, padx=5)
+        
+        # Per-card GPU details (utilization, memory, temperature, power)
+        ttk.Label(resources_frame, text="GPU Devices:").grid(row=9, column=0, sticky=tk.NW, padx=5)
+        self.gpu_devices_var = tk.StringVar(value="")
+        ttk.Label(resources_frame, textvariable=self.gpu_devices_var, justify=tk.LEFT).grid(row=9, column=1, columnspan=3, sticky=tk.W, padx=5)
+        
+        # Static hardware facts are cached; re-probe only on request
+        refresh_btn = ttk.Button(resources_frame, text="Refresh Hardware", command=self.sampler.refresh_hardware)
+        refresh_btn.grid(row=10, column=0, sticky=tk.W, padx=5, pady=5)
+        
+        # Every registered collector with its reading and what it costs
+        ttk.Button(resources_frame, text="Collectors", command=self.open_collectors).grid(
+            row=10, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        # History charts next to the CPU, memory and GPU bars
+        self.charts = []
+        for row, column in enumerate(("cpu", "memory", "gpu", "gpu_memory", "requests_per_s")):
+            canvas = tk.Canvas(resources_frame, width=200, height=24, highlightthickness=0, background="white")
+            canvas.grid(row=row, column=3, padx=5, pady=1)
+            # Percentages have a fixed scale, request rates scale to fit
+            max_value = None if column == "requests_per_s" else 100.0
+            self.charts.append(Sparkline(canvas, self.core.history, column, max_value=max_value))
+        
+        chart_range_frame = ttk.Frame(resources_frame)
+        chart_range_frame.grid(row=10, column=3, sticky=tk.E, padx=5)
+        ttk.Label(chart_range_frame, text="History:").pack(side=tk.LEFT)
+        self.chart_range_var = tk.StringVar(value="5 min")
+        chart_range = ttk.Combobox(chart_range_frame, textvariable=self.chart_range_var, values=list(CHART_RANGES),
+                                   width=9, state="readonly")
+        chart_range.pack(side=tk.LEFT, padx=5)
+        chart_range.bind("<<ComboboxSelected>>", lambda e: [
+            chart.set_range(CHART_RANGES[self.chart_range_var.get()]) for chart in self.charts
+        ])
         
         # Log frame
         log_frame = ttk.LabelFrame(main_frame, text="Terminal Log", padding="10")
         log_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         
+        # Search across captured runs
+        search_btn = ttk.Button(log_frame, text="Search Past Logs", command=self.open_log_search)
+        search_btn.pack(anchor=tk.E, pady=(0, 5))
+        
         # Log text area
         self.log_text = scrolledtext.ScrolledText(log_frame, height=20)
         self.log_text.pack(fill=tk.BOTH, expand=True)
         self.log_text.config(state=tk.DISABLED)
+        self.log_view = LogView(self.log_text, max_lines=LOG_VIEW_MAX_LINES,
+                                buffer=LogBuffer(LOG_BUFFER_MAX_LINES))
         
         # Add timestamp to log
         self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Application started")
@@ -192,37 +379,40 @@ class OpenWebUIController:
         self.command_var.trace_add("write", lambda *args: self.root.after(500, self.check_and_update_command_status))
 
     def install_open_webui(self):
-        """Install OpenWebUI using pip"""
-        self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Installing OpenWebUI...")
+        """Install an OpenWebUI version into its own environment"""
+        version = self.install_version_var.get().strip() or LATEST
+        self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Installing OpenWebUI {version}...")
+        
+        def on_event(event):
+            # Installer thread
+            progress = f" ({event.done}/{event.total})" if event.total else ""
+            self.output_queue.put([f"[install {event.version}] {event.phase}: {event.message}{progress}"])
+            self.root.after(0, self.install_progress_var.set,
+                            "" if event.phase in (DONE, FAILED) else f"{event.version}: {event.phase}{progress}")
         
         def run_installation():
             try:
-                process = subprocess.Popen(
-                    "pip install open-webui",
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    shell=True
-                )
-                
-                # Read output
-                for line in iter(process.stdout.readline, ''):
-                    if line:
-                        self.output_queue.put(line.strip())
-                
-                # Wait for process to complete
-                process.wait()
-                
-                if process.returncode == 0:
-                    self.output_queue.put(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] OpenWebUI installed successfully")
-                    self.root.after(0, self.check_and_update_command_status)
-                else:
-                    self.output_queue.put(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Installation failed with return code {process.returncode}")
-            except Exception as e:
-                self.output_queue.put(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Installation error: {str(e)}")
+                record = self.installer.install(version, on_event)
+            except Exception:
+                # Already reported through a "failed" event
+                return
+            self.root.after(0, self.use_version, record.version)
         
-        # Run installation in a separate thread
+        # Run installation in a separate thread; different versions can install side by side
         threading.Thread(target=run_installation, daemon=True).start()
+    
+    def use_version(self, version):
+        """Switch the command to an installed version; takes effect at the next start."""
+        try:
+            record = self.installer.use(version)
+        except InstallError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.installed_combo.config(values=[installed.version for installed in self.installer.installed()])
+        self.installed_version_var.set(record.version)
+        self.command_var.set(record.command)
+        self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Using OpenWebUI {record.version}"
+                        + (" after the next restart" if self.running else ""))
 
     def browse_command(self):
         """Open a file browser to select the command executable"""
@@ -238,6 +428,33 @@ class OpenWebUIController:
         """Check if the specified command exists in PATH"""
         return shutil.which(command) is not None
 
+    @property
+    def running(self):
+        """True while OpenWebUI is starting, serving or stopping."""
+        return self.supervisor.get(OPENWEBUI).lifecycle.running
+    
+    @property
+    def ollama_running(self):
+        """True while Ollama is starting, serving or stopping."""
+        return self.supervisor.get(OLLAMA).lifecycle.running
+    
+    def configured_spec(self):
+        """Build the OpenWebUI service spec from the configuration fields."""
+        return openwebui_spec(self.command_var.get().strip(), self.host_var.get().strip() or "0.0.0.0",
+                              int(self.port_var.get()), self.restart_policy())
+    
+    def restart_policy(self):
+        """Restart policy selected in the configuration fields."""
+        return RestartPolicy(self.restart_var.get(), prewarm=self.prewarm_var.get())
+    
+    def restart_note(self, info):
+        """Describe what the restart policy does after a service went down."""
+        if info.get("restart_in") is not None:
+            return f", restarting in {info['restart_in']:.1f} s"
+        if info.get("crash_loop"):
+            return ", crash loop detected, not restarting"
+        return ""
+    
     def start_service(self):
         if not self.running:
             command = self.command_var.get().strip()
@@ -252,248 +469,439 @@ class OpenWebUIController:
                 return
             
             try:
-                cmd = f"{command} serve"
-                self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Executing: {cmd}")
-                
-                # Use shell=True to execute the command as you would in the terminal
-                self.process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True,
-                    shell=True  # This is important to use your shell's PATH
-                )
-                
-                self.running = True
-                self.status_var.set("Status: Running")
-                self.start_btn.config(state=tk.DISABLED)
-                self.stop_btn.config(state=tk.NORMAL)
-                
-                # Start thread to read output
-                threading.Thread(target=self.read_output, daemon=True).start()
-                
-                self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] OpenWebUI service started")
-            except Exception as e:
-                self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error starting service: {str(e)}")
+                spec = self.configured_spec()
+            except ValueError:
+                self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error: Port must be a number")
+                return
+            self.supervisor.add(spec)
+            self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Executing: {spec.command}")
+            
+            # Spawning happens on the lifecycle worker; state changes come back through on_service_state
+            self.supervisor.start(OPENWEBUI)
     
     def stop_service(self):
-        if self.running and self.process:
-            try:
-                # Check if process is still running before trying to terminate
-                if self.process.poll() is None:
-                    # Send terminate signal to process
-                    if hasattr(signal, 'SIGTERM'):
-                        try:
-                            os.kill(self.process.pid, signal.SIGTERM)
-                        except ProcessLookupError:
-                            # Process already terminated
-                            pass
-                    else:
-                        self.process.terminate()
-                
-                    # Give it some time to terminate gracefully
-                    for _ in range(5):
-                        if self.process.poll() is not None:
-                            break
-                        time.sleep(0.5)
-                    
-                    # Force kill if still running
-                    if self.process.poll() is None:
-                        self.process.kill()
-                
-                self.running = False
+        """Ask the lifecycle worker to stop the service, or cancel a pending restart; never blocks the UI."""
+        self.supervisor.stop(OPENWEBUI)
+    
+    def start_ollama(self):
+        if not self.ollama_running:
+            if not self.check_command_exists("ollama"):
+                self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error: Command 'ollama' not found")
+                return
+            self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Executing: ollama serve")
+            self.supervisor.start(OLLAMA)
+    
+    def stop_ollama(self):
+        self.supervisor.stop(OLLAMA)
+    
+    def control_selected(self, start):
+        """Start or stop the services selected in the services list."""
+        for name in self.services_tree.selection():
+            if name == OPENWEBUI:
+                self.start_service() if start else self.stop_service()
+            elif start:
+                self.supervisor.start(name)
+            else:
+                self.supervisor.stop(name)
+    
+    def on_service_output(self, name, lines):
+        """Queue service output for the log; output of other services is prefixed with their name."""
+        if name != OPENWEBUI:
+            lines = [f"[{name}] {line}" for line in lines]
+        self.output_queue.put(lines)
+    
+    def service_url(self):
+        """URL of the served instance as seen from this machine."""
+        host = self.host_var.get().strip()
+        if host in ("", "0.0.0.0"):
+            host = "localhost"
+        return f"http://{host}:{self.port_var.get().strip()}"
+    
+    def on_service_state(self, name, old, new, info):
+        """Supervisor callback from a worker thread; hand over to the Tk thread."""
+        if self._closing:
+            return
+        self.root.after(0, self.apply_service_state, name, old, new, info)
+    
+    def apply_service_state(self, name, old, new, info):
+        """Reflect a lifecycle state change in the UI."""
+        self.update_services_tree()
+        if name == OPENWEBUI:
+            self.apply_openwebui_state(old, new, info)
+            return
+        
+        if name == OLLAMA:
+            active = new in (STARTING, HEALTHY)
+            self.ollama_start_btn.config(state=tk.DISABLED if new in ACTIVE_STATES else tk.NORMAL)
+            self.ollama_stop_btn.config(state=tk.NORMAL if active else tk.DISABLED)
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if new == HEALTHY:
+            record = info.get("readiness")
+            ready = f" (ready in {record.time_to_ready:.1f} s)" if getattr(record, "time_to_ready", None) else ""
+            self.add_to_log(f"[{timestamp}] [{name}] service ready{ready}")
+        elif new == CRASHED:
+            reason = info.get("error") or f"exit code {info.get('returncode')}"
+            self.add_to_log(f"[{timestamp}] [{name}] service crashed: {reason}{self.restart_note(info)}")
+        elif new not in ACTIVE_STATES:
+            self.add_to_log(f"[{timestamp}] [{name}] service stopped{self.restart_note(info)}")
+    
+    def apply_openwebui_state(self, old, new, info):
+        """Reflect an OpenWebUI state change in the main controls."""
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if new == STARTING:
+            self.status_var.set("Status: Starting...")
+            self.start_btn.config(state=tk.DISABLED)
+            self.stop_btn.config(state=tk.NORMAL)
+        elif new == HEALTHY:
+            self.start_btn.config(state=tk.DISABLED)
+            self.stop_btn.config(state=tk.NORMAL)
+            record = info.get("readiness")
+            if getattr(record, "ready", False):
+                self.status_var.set(f"Status: Running (ready in {record.time_to_ready:.1f} s)")
+                version = f" (OpenWebUI {record.version})" if record.version else ""
+                first_byte = f"{record.ttfb:.2f} s" if record.ttfb is not None else "n/a"
+                self.add_to_log(f"[{timestamp}] OpenWebUI service ready{version}: first byte after {first_byte}, "
+                                f"ready after {record.time_to_ready:.2f} s ({record.attempts} probes)")
+            else:
+                self.status_var.set("Status: Running")
+                self.add_to_log(f"[{timestamp}] OpenWebUI service started")
+        elif new == STOPPING:
+            self.status_var.set("Status: Stopping...")
+            self.start_btn.config(state=tk.DISABLED)
+            self.stop_btn.config(state=tk.DISABLED)
+        else:
+            if new == CRASHED:
+                reason = info.get("error") or f"exit code {info.get('returncode')}"
+                self.status_var.set(f"Status: Crashed ({reason}{self.restart_note(info)})")
+                self.add_to_log(f"[{timestamp}] OpenWebUI service crashed: {reason}{self.restart_note(info)}")
+            elif old == STOPPING:
                 self.status_var.set("Status: Not Running")
-                self.start_btn.config(state=tk.NORMAL)
-                self.stop_btn.config(state=tk.DISABLED)
-                self.proc_mem_var.set("N/A")
-                
-                self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] OpenWebUI service stopped")
-            except Exception as e:
-                self.add_to_log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error stopping service: {str(e)}")
-                # Ensure UI is updated even if an error occurs
-                self.running = False
-                self.status_var.set("Status: Error")
-                self.start_btn.config(state=tk.NORMAL)
-                self.stop_btn.config(state=tk.DISABLED)
+                elapsed = info.get("elapsed")
+                took = f" in {elapsed:.1f} s" if elapsed is not None else ""
+                self.add_to_log(f"[{timestamp}] OpenWebUI service stopped{took}")
+            else:
+                self.status_var.set(f"Status: Not Running{self.restart_note(info)}")
+                self.add_to_log(f"[{timestamp}] Process exited{self.restart_note(info)}")
+            self.update_status_stopped()
+            if info.get("restart_in") is not None:
+                # Stop cancels the pending restart
+                self.stop_btn.config(state=tk.NORMAL)
+    
+    def open_collectors(self):
+        """Open a window listing every metrics collector, its latest reading and its cost."""
+        window = tk.Toplevel(self.root)
+        window.title("Metrics Collectors")
+        window.geometry("900x300")
+        
+        columns = ("reading", "cost", "interval", "wall", "cpu", "runs")
+        tree = ttk.Treeview(window, columns=columns, height=10)
+        tree.heading("#0", text="Collector")
+        tree.column("#0", width=140)
+        for column, heading, width in zip(columns, ("Reading", "Cost", "Every", "Wall (avg)", "CPU (avg)", "Runs"),
+                                          (360, 80, 70, 80, 80, 60)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W if column == "reading" else tk.E)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        def refresh():
+            if not window.winfo_exists():
+                return
+            snapshot = self.sampler.latest()
+            readings = snapshot.readings if snapshot is not None else {}
+            collectors = {collector.name: collector for collector in self.sampler.collectors()}
+            for stats in self.sampler.stats()["collectors"]:
+                name = stats["name"]
+                collector = collectors.get(name)
+                reading = readings.get(name)
+                if stats["error"]:
+                    text = f"Error: {stats['error']}"
+                elif reading is None or collector is None:
+                    text = ""
+                else:
+                    text = collector.summary(reading)
+                if not tree.exists(name):
+                    tree.insert("", tk.END, iid=name, text=stats["label"])
+                tree.item(name, values=(
+                    text,
+                    stats["cost"],
+                    f"{stats['interval']:.1f} s",
+                    f"{stats['avg_seconds'] * 1000:.2f} ms",
+                    f"{stats['avg_cpu_seconds'] * 1000:.2f} ms",
+                    stats["runs"],
+                ))
+            window.after(1000, refresh)
+        
+        refresh()
     
-    def read_output(self):
-        """Read the output from the process in a separate thread."""
-        for line in iter(self.process.stdout.readline, ''):
-            if line:
-                self.output_queue.put(line)
+    def open_log_search(self):
+        """Open a window for searching output captured from past runs."""
+        window = tk.Toplevel(self.root)
+        window.title("Search Past Logs")
+        window.geometry("900x500")
+        
+        filters = ttk.Frame(window, padding="10")
+        filters.pack(fill=tk.X)
+        
+        ttk.Label(filters, text="Service:").pack(side=tk.LEFT, padx=5)
+        service_var = tk.StringVar(value=OPENWEBUI)
+        ttk.Combobox(filters, textvariable=service_var, width=14, state="readonly",
+                     values=[service.name for service in self.supervisor.services()]).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(filters, text="Minimum level:").pack(side=tk.LEFT, padx=5)
+        level_var = tk.StringVar(value="ERROR")
+        ttk.Combobox(filters, textvariable=level_var, width=10, state="readonly",
+                     values=["Any", "INFO", "WARNING", "ERROR", "CRITICAL"]).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(filters, text="Last runs:").pack(side=tk.LEFT, padx=5)
+        runs_var = tk.StringVar(value="3")
+        ttk.Spinbox(filters, from_=1, to=self.supervisor.get(OPENWEBUI).log_store.max_runs, textvariable=runs_var, width=5).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(filters, text="Pattern:").pack(side=tk.LEFT, padx=5)
+        pattern_var = tk.StringVar()
+        ttk.Entry(filters, textvariable=pattern_var, width=30).pack(side=tk.LEFT, padx=5)
+        
+        status_var = tk.StringVar()
+        results = scrolledtext.ScrolledText(window, height=20)
+        
+        def show_results(matches, elapsed, error=None):
+            results.config(state=tk.NORMAL)
+            results.delete("1.0", tk.END)
+            if error:
+                status_var.set(f"Search failed: {error}")
             else:
-                break
+                results.insert(tk.END, "\n".join(
+                    f"[{match.run_id}] {datetime.fromtimestamp(match.timestamp).strftime('%Y-%m-%d %H:%M:%S') if match.timestamp else ''} {match.text}"
+                    for match in matches
+                ))
+                status_var.set(f"{len(matches)} matching lines in {elapsed * 1000:.0f} ms")
+            results.config(state=tk.DISABLED)
+        
+        def run_search():
+            level = level_var.get()
+            try:
+                runs = int(runs_var.get())
+            except ValueError:
+                runs = 3
+            pattern = pattern_var.get().strip() or None
+            log_store = self.supervisor.get(service_var.get()).log_store
+            status_var.set("Searching...")
+            
+            # Search off the UI thread; large runs can take a moment to scan
+            def search():
+                started = time.perf_counter()
+                try:
+                    matches = log_store.search(level=None if level == "Any" else level, runs=runs, pattern=pattern)
+                    self.root.after(0, show_results, matches, time.perf_counter() - started)
+                except Exception as e:
+                    self.root.after(0, show_results, [], 0, str(e))
+            
+            threading.Thread(target=search, daemon=True).start()
         
-        # Process ended
-        if self.running:
-            self.running = False
-            self.output_queue.put(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Process exited")
-            self.root.after(0, self.update_status_stopped)
+        ttk.Button(filters, text="Search", command=run_search).pack(side=tk.LEFT, padx=5)
+        ttk.Label(window, textvariable=status_var, padding="5").pack(fill=tk.X)
+        results.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        results.config(state=tk.DISABLED)
+    
+    def shutdown(self):
+        """Stop everything before the window closes."""
+        # The Tk loop is about to go away; stop posting state changes to it
+        self._closing = True
+        self.core.shutdown()
     
     def update_status_stopped(self):
-        self.status_var.set("Status: Not Running")
         self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.proc_mem_var.set("N/A")
+        self.proc_tree_var.set("N/A")
+        self.proc_breakdown_var.set("")
     
     def check_queue(self):
-        """Check if there's any output in the queue and update the log."""
+        """Move queued output to the log in a single batched insert."""
         try:
-            while True:
-                line = self.output_queue.get_nowait()
-                self.add_to_log(line)
-                self.output_queue.task_done()
-        except queue.Empty:
-            pass
+            lines = self.output_queue.drain(LOG_DRAIN_BATCH)
+            dropped = self.output_queue.take_dropped()
+            if dropped:
+                lines.insert(0, f"[... {dropped} lines skipped because the log could not keep up; "
+                                f"see Search Past Logs ...]")
+            if lines:
+                self.log_view.append(lines)
         finally:
             # Schedule to run again
             self.root.after(100, self.check_queue)
     
     def add_to_log(self, text):
         """Add text to the log widget."""
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, text + "\n")
-        self.log_text.see(tk.END)  # Scroll to the end
-        self.log_text.config(state=tk.DISABLED)
+        self.log_view.append([text])
     
-    def get_mac_gpu_info(self):
-        """Get GPU information on macOS systems"""
-        try:
-            # Run system_profiler to get GPU information
-            result = subprocess.run(
-                ["system_profiler", "SPDisplaysDataType"],
-                capture_output=True,
-                text=True,
-                check=True
+    def update_resources(self):
+        """Render the latest metrics snapshot from the background sampler."""
+        started = time.perf_counter()
+        snapshot = self.sampler.latest()
+
+        # Only repaint when the sampler has published something new
+        if snapshot is not None and snapshot is not self._last_snapshot:
+            self._last_snapshot = snapshot
+            self.render_snapshot(snapshot)
+            if self.mark_startup_first_metrics():
+                return
+
+            # Report what monitoring costs: collection runs on the worker thread,
+            # rendering is the only part that touches the UI thread
+            self._ui_render_seconds = time.perf_counter() - started
+            stats = self.sampler.stats()
+            self.overhead_var.set(
+                f"Sampler {stats['last_seconds'] * 1000:.1f} ms "
+                f"(avg {stats['avg_seconds'] * 1000:.1f}, max {stats['max_seconds'] * 1000:.1f}) | "
+                f"CPU {stats['cpu_share'] * 100:.2f}% of a core | "
+                f"UI {self._ui_render_seconds * 1000:.2f} ms | "
+                f"log queue {len(self.output_queue)} lines, {self.output_queue.dropped} dropped"
             )
-            output = result.stdout
-            
-            # Parse the output to extract GPU info
-            gpu_info = {"name": "Unknown GPU", "metal": False}
-            metal_found = False
-            current_section = None
-            
-            lines = output.splitlines()
-            for line in lines:
-                line = line.strip()
-                
-                # Check for graphics card section
-                if "Chipset Model:" in line:
-                    gpu_info["name"] = line.split(":", 1)[1].strip()
-                
-                # Check for Metal support
-                if "Metal:" in line:
-                    metal_support = line.split(":", 1)[1].strip()
-                    if "supported" in metal_support.lower():
-                        gpu_info["metal"] = True
-                
-                # Get VRAM if available
-                if "VRAM" in line and ":" in line:
-                    try:
-                        vram_text = line.split(":", 1)[1].strip()
-                        # Extract just the number
-                        vram_mb = int(''.join(filter(str.isdigit, vram_text)))
-                        gpu_info["vram"] = vram_mb
-                    except:
-                        pass
-            
-            return gpu_info
-        except Exception as e:
-            print(f"Error getting Mac GPU info: {e}")
-            return None
+
+        # Schedule the next update; this is a cheap poll, sampling rate is set on the sampler.
+        # Poll quickly until the first snapshot arrives so it shows without delay
+        self.root.after(250 if self._last_snapshot is not None else 20, self.update_resources)
     
-    def update_resources(self):
-        """Update system resource information."""
+    def mark_startup_first_metrics(self):
+        """Record the first rendered metrics; returns True if the app is quitting because of it."""
+        if self.startup_timer is None or not self.startup_timer.mark("first_metrics"):
+            return False
+        self.startup_timer.print_report()
+        if self.exit_after_startup:
+            self.shutdown()
+            self.root.destroy()
+            return True
+        return False
+
+    def render_snapshot(self, snapshot):
+        """Update the resource widgets from a metrics snapshot."""
         # CPU usage
-        cpu_percent = psutil.cpu_percent()
-        self.cpu_var.set(f"{cpu_percent:.1f}%")
-        self.cpu_progress['value'] = cpu_percent
-        
+        self.cpu_var.set(f"{snapshot.cpu_percent:.1f}%")
+        self.cpu_progress['value'] = snapshot.cpu_percent
+
         # Memory usage
-        memory = psutil.virtual_memory()
-        memory_percent = memory.percent
-        self.memory_var.set(f"{memory_percent:.1f}% ({self.format_bytes(memory.used)})")
-        self.memory_progress['value'] = memory_percent
-        
+        self.memory_var.set(f"{snapshot.memory_percent:.1f}% ({self.format_bytes(snapshot.memory_used)})")
+        self.memory_progress['value'] = snapshot.memory_percent
+
         # GPU usage - handle different platforms
-        if IS_MACOS:
-            # Apple Silicon/Mac GPU monitoring
-            try:
-                mac_gpu = self.get_mac_gpu_info()
-                if mac_gpu:
-                    self.gpu_var.set(f"Active: {mac_gpu.get('name', 'Unknown GPU')}")
-                    self.gpu_progress['value'] = 50  # We don't have usage percentage on Mac
-                    
-                    # Show VRAM if available, otherwise show Metal support
-                    if "vram" in mac_gpu:
-                        self.gpu_memory_var.set(f"VRAM: {mac_gpu['vram']} MB")
-                        self.gpu_memory_progress['value'] = 50  # We don't have usage percentage
-                    else:
-                        metal_support = "Yes" if mac_gpu.get('metal', False) else "No"
-                        self.gpu_memory_var.set(f"Metal Support: {metal_support}")
-                        self.gpu_memory_progress['value'] = 100 if mac_gpu.get('metal', False) else 0
-                else:
-                    self.gpu_var.set("No Mac GPU info available")
-                    self.gpu_memory_var.set("No Mac GPU info available")
-                    self.gpu_progress['value'] = 0
-                    self.gpu_memory_progress['value'] = 0
-            except Exception as e:
-                self.gpu_var.set(f"Error: {str(e)}")
-                self.gpu_memory_var.set("Error retrieving Mac GPU info")
-                self.gpu_progress['value'] = 0
-                self.gpu_memory_progress['value'] = 0
-        elif GPU_AVAILABLE:
-            # NVIDIA GPU monitoring via GPUtil
-            try:
-                gpus = GPUtil.getGPUs()
-                if gpus:
-                    gpu = gpus[0]  # Use the first GPU
-                    gpu_util = gpu.load * 100  # Convert to percentage
-                    gpu_memory_used = gpu.memoryUsed
-                    gpu_memory_total = gpu.memoryTotal
-                    gpu_memory_percent = (gpu_memory_used / gpu_memory_total) * 100
-                    
-                    self.gpu_var.set(f"{gpu_util:.1f}% ({gpu.name})")
-                    self.gpu_progress['value'] = gpu_util
-                    
-                    self.gpu_memory_var.set(f"{gpu_memory_percent:.1f}% ({gpu_memory_used:.0f} MB / {gpu_memory_total:.0f} MB)")
-                    self.gpu_memory_progress['value'] = gpu_memory_percent
-                else:
-                    self.gpu_var.set("No GPU detected")
-                    self.gpu_memory_var.set("No GPU detected")
-                    self.gpu_progress['value'] = 0
-                    self.gpu_memory_progress['value'] = 0
-            except Exception as e:
-                self.gpu_var.set(f"Error: {str(e)}")
-                self.gpu_memory_var.set("Error")
-                self.gpu_progress['value'] = 0
-                self.gpu_memory_progress['value'] = 0
+        gpus = snapshot.gpus
+        if gpus and gpus[0].utilization is None:
+            # Apple Silicon/Mac GPU: no usage percentage available
+            gpu = gpus[0]
+            self.gpu_var.set(f"Active: {gpu.name}")
+            self.gpu_progress['value'] = 50
+
+            # Show VRAM if available, otherwise show Metal support
+            if gpu.vram_mb is not None:
+                self.gpu_memory_var.set(f"VRAM: {gpu.vram_mb} MB")
+                self.gpu_memory_progress['value'] = 50
+            else:
+                metal_support = "Yes" if gpu.metal else "No"
+                self.gpu_memory_var.set(f"Metal Support: {metal_support}")
+                self.gpu_memory_progress['value'] = 100 if gpu.metal else 0
+            self.gpu_devices_var.set("")
+        elif gpus:
+            # Aggregate across all cards; per-card details go in the devices row
+            utilizations = [gpu.utilization for gpu in gpus if gpu.utilization is not None]
+            gpu_util = sum(utilizations) / len(utilizations) if utilizations else 0
+            gpu_memory_used = sum(gpu.memory_used_mb or 0 for gpu in gpus)
+            gpu_memory_total = sum(gpu.memory_total_mb or 0 for gpu in gpus)
+            gpu_memory_percent = (gpu_memory_used / gpu_memory_total) * 100 if gpu_memory_total else 0
+
+            if len(gpus) == 1:
+                self.gpu_var.set(f"{gpu_util:.1f}% ({gpus[0].name})")
+            else:
+                self.gpu_var.set(f"{gpu_util:.1f}% (average of {len(gpus)} GPUs)")
+            self.gpu_progress['value'] = gpu_util
+
+            self.gpu_memory_var.set(f"{gpu_memory_percent:.1f}% ({gpu_memory_used:.0f} MB / {gpu_memory_total:.0f} MB)")
+            self.gpu_memory_progress['value'] = gpu_memory_percent
+
+            self.gpu_devices_var.set("\n".join(self.format_gpu(gpu) for gpu in gpus))
         else:
-            # No GPU monitoring available
-            if IS_MACOS:
-                self.gpu_var.set("Error accessing Mac GPU")
-                self.gpu_memory_var.set("Check permissions")
+            self.gpu_var.set(snapshot.gpu_error or "No GPU detected")
+            if snapshot.gpu_error == "No GPU backend available":
+                self.gpu_memory_var.set("Install nvidia-ml-py (or GPUtil) for NVIDIA GPUs")
             else:
-                self.gpu_var.set("GPUtil not installed")
-                self.gpu_memory_var.set("Install GPUtil with: pip install gputil")
-            
+                self.gpu_memory_var.set("Not available")
             self.gpu_progress['value'] = 0
             self.gpu_memory_progress['value'] = 0
+            self.gpu_devices_var.set("")
+
+        # Requests since the previous sample, on the same timeline as the charts
+        rates = self.core.request_rates
+        if rates:
+            text = f"{rates['requests_per_s']:.1f} req/s"
+            if rates["error_rate"] is not None:
+                text += f", {rates['error_rate']:.1f}% errors"
+            text += f", {rates['slow_requests']} slow, {rates['log_errors']} error lines"
+            self.requests_var.set(text)
         
         # Process memory if running
-        if self.running and self.process and self.process.poll() is None:
-            try:
-                proc = psutil.Process(self.process.pid)
-                proc_memory = proc.memory_info().rss
-                self.proc_mem_var.set(self.format_bytes(proc_memory))
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                self.proc_mem_var.set("N/A")
-        
-        # Schedule the next update
-        self.root.after(1000, self.update_resources)  # Changed from 2000 to 1000 milliseconds
+        tree = snapshot.processes.get(OPENWEBUI)
+        if self.running and tree is not None:
+            memory = f"RSS {self.format_bytes(tree.rss)}"
+            if tree.uss is not None:
+                memory += f", USS {self.format_bytes(tree.uss)}"
+            if tree.pss is not None:
+                memory += f", PSS {self.format_bytes(tree.pss)}"
+            self.proc_mem_var.set(f"{memory} ({tree.process_count} processes)")
+
+            details = f"CPU {tree.cpu_percent:.1f}%, {tree.num_threads} threads"
+            if tree.num_fds is not None:
+                details += f", {tree.num_fds} open files"
+            if tree.io_read_bytes is not None:
+                details += f", I/O read {self.format_bytes(tree.io_read_bytes)} / write {self.format_bytes(tree.io_write_bytes)}"
+            self.proc_tree_var.set(details)
+
+            self.proc_breakdown_var.set("\n".join(
+                f"{child.pid} {child.name}: {self.format_bytes(child.rss)}, CPU {child.cpu_percent:.1f}%"
+                for child in tree.children[:8]
+            ))
+        
+        self.update_services_tree(snapshot)
+        
+        # Only the points added since the last tick are drawn
+        for chart in self.charts:
+            chart.update()
     
+    def update_services_tree(self, snapshot=None):
+        """Refresh the per-service rows of the services list."""
+        snapshot = snapshot or self._last_snapshot
+        processes = snapshot.processes if snapshot is not None else {}
+        for status in self.supervisor.status():
+            name = status["name"]
+            if not self.services_tree.exists(name):
+                self.services_tree.insert("", tk.END, iid=name, text=name)
+            tree = processes.get(name) if status["pid"] else None
+            ready = status["time_to_ready"]
+            restarts = str(status["restarts"])
+            if status["mttr"] is not None:
+                restarts += f" ({status['mttr']:.1f} s)"
+            if status["crash_loop"]:
+                restarts += " loop"
+            self.services_tree.item(name, values=(
+                status["state"] + (" (paused)" if status["paused"] else ""),
+                status["pid"] or "",
+                status["port"] or "",
+                self.format_bytes(tree.rss) if tree is not None else "",
+                f"{tree.cpu_percent:.1f}%" if tree is not None else "",
+                f"{ready:.1f} s" if ready is not None else "",
+                restarts,
+            ))
+
+    def format_gpu(self, gpu):
+        """Format one GPU sample as a single line of text."""
+        text = f"GPU{gpu.index} {gpu.name}"
+        if gpu.utilization is not None:
+            text += f": {gpu.utilization:.0f}%"
+        if gpu.memory_used_mb is not None and gpu.memory_total_mb:
+            text += f", {gpu.memory_used_mb:.0f}/{gpu.memory_total_mb:.0f} MB"
+        if gpu.temperature_c is not None:
+            text += f", {gpu.temperature_c:.0f}°C"
+        if gpu.power_w is not None:
+            text += f", {gpu.power_w:.0f} W"
+        return text
+
     def format_bytes(self, bytes):
         """Format bytes to a human-readable string."""
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -503,11 +911,29 @@ class OpenWebUIController:
         return f"{bytes:.1f} PB"
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenWebUI Controller")
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="print time to window and time to first metrics as JSON")
+    parser.add_argument("--exit-after-startup", action="store_true",
+                        help="quit once the first metrics are shown (for benchmarks)")
+    parser.add_argument("--aggregator", metavar="HOST:PORT",
+                        help="stream metrics and error lines to an owui_aggregator.py dashboard")
+    parser.add_argument("--agent-name", help="name of this host on the dashboard (default: the hostname)")
+    parser.add_argument("--agent-interval", type=float, default=2.0, help="seconds between updates to the aggregator")
+    parser.add_argument("--agent-token", help="shared secret expected by the aggregator")
+    args = parser.parse_args()
+    timer = StartupTimer(_IMPORT_STARTED) if args.startup_timing or args.exit_after_startup else None
+    
     root = tk.Tk()
-    app = OpenWebUIController(root)
+    app = OpenWebUIController(root, startup_timer=timer, exit_after_startup=args.exit_after_startup)
+    agent = None
+    if args.aggregator:
+        from remote_monitor import Agent
+        agent = Agent(app.core, args.aggregator, args.agent_name, args.agent_interval, args.agent_token)
+        agent.start()
     root.protocol("WM_DELETE_WINDOW", lambda: (
-        app.stop_service() if app.running else None, 
-        app.stop_ollama() if app.ollama_running else None,
+        agent is not None and agent.stop(),
+        app.shutdown(),
         root.destroy()
     ))
     root.mainloop()
@@ -0,0 +1,107 @@
+"""Request statistics parsed from service output.
+
+AccessLogParser picks HTTP request lines out of the output stream and keeps
+running counters: requests, 4xx and 5xx responses, slow requests and error
+log lines. Two formats are recognised:
+
+    uvicorn (OpenWebUI):  INFO:     127.0.0.1:5000 - "GET /api/models HTTP/1.1" 200 OK
+    gin (Ollama):         [GIN] 2024/05/01 - 12:00:00 | 200 |  1.234567s | 127.0.0.1 | POST "/api/chat"
+
+Uvicorn does not log latency by default; a trailing duration such as
+"0.123s" or "123ms", as added by custom log formats, is picked up when
+present. Lines are classified with a substring check first, so only request
+lines pay for a regex match.
+
+Counters are cumulative; the controller diffs them at every metrics sample,
+which puts request rates on the same timeline as CPU and GPU usage.
+"""
+import re
+import threading
+from collections import namedtuple
+
+from log_store import LEVELS, detect_level
+
+ERROR = LEVELS["ERROR"]
+
+# Requests taking longer than this many seconds count as slow
+SLOW_REQUEST_SECONDS = 1.0
+
+RequestCounts = namedtuple("RequestCounts", [
+    "requests",
+    "client_errors",    # 4xx responses
+    "server_errors",    # 5xx responses
+    "slow",             # requests slower than slow_seconds (only when latency is logged)
+    "log_errors",       # ERROR/CRITICAL/Traceback lines that are not requests
+    "latency_sum",      # seconds, over requests whose latency was logged
+    "latency_count",
+])
+
+EMPTY_COUNTS = RequestCounts(0, 0, 0, 0, 0, 0.0, 0)
+
+_UVICORN_RE = re.compile(r'"[A-Z]+ [^"]* HTTP/[\d.]+" (\d{3})(?:[^\d]*?(\d+(?:\.\d+)?)\s*(ms|s)\b)?')
+# Go prints long durations as e.g. "1m2.5s"; those requests are counted without a latency
+_GIN_RE = re.compile(r"\|\s*(\d{3})\s*\|\s*(?:(\d+(?:\.\d+)?)(ns|µs|us|ms|s)\s*\|)?")
+
+_UNIT_SECONDS = {"ns": 1e-9, "µs": 1e-6, "us": 1e-6, "ms": 1e-3, "s": 1.0}
+
+
+def add(a, b):
+    """Sum of two RequestCounts."""
+    return RequestCounts(*(x + y for x, y in zip(a, b)))
+
+
+def subtract(new, old):
+    """Counts accumulated between two cumulative readings."""
+    return RequestCounts(*(a - b for a, b in zip(new, old)))
+
+
+class AccessLogParser:
+    """Accumulates request statistics from batches of output lines."""
+
+    def __init__(self, slow_seconds=SLOW_REQUEST_SECONDS):
+        self.slow_seconds = slow_seconds
+        self._counts = EMPTY_COUNTS
+        self._lock = threading.Lock()
+
+    def feed(self, lines):
+        """Parse a batch of lines (without trailing newlines)."""
+        requests = client_errors = server_errors = slow = log_errors = latency_count = 0
+        latency_sum = 0.0
+        slow_seconds = self.slow_seconds
+        uvicorn_search = _UVICORN_RE.search
+        gin_search = _GIN_RE.search
+
+        for line in lines:
+            if "HTTP/" in line:
+                match = uvicorn_search(line)
+            elif "[GIN]" in line:
+                match = gin_search(line)
+            else:
+                match = None
+                if ("ERROR" in line or "Traceback" in line or "CRITICAL" in line or "FATAL" in line) \
+                        and detect_level(line) >= ERROR:
+                    log_errors += 1
+            if match is None:
+                continue
+
+            requests += 1
+            status, duration, unit = match.groups()
+            if status[0] == "5":
+                server_errors += 1
+            elif status[0] == "4":
+                client_errors += 1
+            if duration is not None:
+                seconds = float(duration) * _UNIT_SECONDS[unit]
+                latency_sum += seconds
+                latency_count += 1
+                if seconds > slow_seconds:
+                    slow += 1
+
+        if requests or log_errors:
+            batch = (requests, client_errors, server_errors, slow, log_errors, latency_sum, latency_count)
+            with self._lock:
+                self._counts = add(self._counts, batch)
+
+    def counts(self):
+        """Cumulative RequestCounts since the parser was created."""
+        return self._counts
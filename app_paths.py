@@ -0,0 +1,13 @@
+"""Locations of files the OpenWebUI Controller keeps between runs."""
+import os
+
+
+def data_dir(*parts):
+    """Return a directory under the controller's data directory, creating it.
+
+    Defaults to ~/.openwebui_controller; set OWUI_CONTROLLER_HOME to move it.
+    """
+    base = os.environ.get("OWUI_CONTROLLER_HOME") or os.path.join(os.path.expanduser("~"), ".openwebui_controller")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
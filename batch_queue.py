@@ -0,0 +1,135 @@
+"""Bounded queue of line batches between output readers and their consumer.
+
+Producers put whole batches (one per pipe read) and the consumer drains up to
+a number of lines at a time, so the lock is taken once per batch instead of
+once per line. The queue holds at most `max_lines`; what happens when a
+batch does not fit is the policy:
+
+    DROP_OLDEST   discard the oldest queued lines (the UI default: the
+                  newest output is what matters, and the on-disk log keeps
+                  everything)
+    DROP_NEWEST   discard the incoming lines
+    BLOCK         wait for room, pushing back on the producer
+
+Dropped lines are counted, both in total and since the last drain, so the
+consumer can show that output was skipped.
+"""
+import threading
+import time
+from collections import deque
+
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+BLOCK = "block"
+
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class BatchQueue:
+    def __init__(self, max_lines=50000, policy=DROP_OLDEST):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}'")
+        self.max_lines = max_lines
+        self.policy = policy
+        self._batches = deque()
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self.dropped = 0
+        self._dropped_since_drain = 0
+        self.high_water = 0
+
+    def __len__(self):
+        """Number of queued lines."""
+        return self._lines
+
+    def put(self, lines, timeout=None):
+        """Queue a batch of lines; returns how many lines were dropped to make it fit.
+
+        Under BLOCK, waits up to `timeout` seconds (forever if None) for room
+        and drops whatever still does not fit after that.
+        """
+        if not lines:
+            return 0
+        if not isinstance(lines, list):
+            lines = list(lines)
+        with self._lock:
+            if self.policy == BLOCK:
+                return self._put_blocking(lines, timeout)
+            dropped = 0
+            room = self.max_lines - self._lines
+            if len(lines) > room:
+                if self.policy == DROP_NEWEST:
+                    dropped = len(lines) - room
+                    lines = lines[:room]
+                else:
+                    if len(lines) > self.max_lines:
+                        dropped = len(lines) - self.max_lines
+                        lines = lines[dropped:]
+                    dropped += self._drop_oldest(len(lines) - (self.max_lines - self._lines))
+            self._append(lines)
+            return self._record_drop(dropped)
+
+    def drain(self, max_lines=None):
+        """Remove and return up to `max_lines` queued lines (all by default), oldest first."""
+        lines = []
+        with self._lock:
+            while self._batches and (max_lines is None or len(lines) < max_lines):
+                batch = self._batches.popleft()
+                if max_lines is not None and len(lines) + len(batch) > max_lines:
+                    split = max_lines - len(lines)
+                    self._batches.appendleft(batch[split:])
+                    batch = batch[:split]
+                lines.extend(batch)
+            self._lines -= len(lines)
+            if lines:
+                self._not_full.notify_all()
+        return lines
+
+    def take_dropped(self):
+        """Lines dropped since the previous call."""
+        with self._lock:
+            dropped, self._dropped_since_drain = self._dropped_since_drain, 0
+        return dropped
+
+    def stats(self):
+        return {"queued": self._lines, "dropped": self.dropped, "high_water": self.high_water,
+                "max_lines": self.max_lines, "policy": self.policy}
+
+    def _put_blocking(self, lines, timeout):
+        # Caller holds self._lock; a batch larger than the queue goes in max_lines at a time
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for start in range(0, len(lines), self.max_lines):
+            part = lines[start:start + self.max_lines]
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self._not_full.wait_for(lambda: self.max_lines - self._lines >= len(part), remaining):
+                return self._record_drop(len(lines) - start)
+            self._append(part)
+        return 0
+
+    def _append(self, lines):
+        # Caller holds self._lock
+        if lines:
+            self._batches.append(lines)
+            self._lines += len(lines)
+            self.high_water = max(self.high_water, self._lines)
+
+    def _drop_oldest(self, count):
+        # Caller holds self._lock
+        dropped = 0
+        while dropped < count and self._batches:
+            batch = self._batches[0]
+            if len(batch) <= count - dropped:
+                self._batches.popleft()
+                dropped += len(batch)
+            else:
+                self._batches[0] = batch[count - dropped:]
+                dropped = count
+        self._lines -= dropped
+        return dropped
+
+    def _record_drop(self, count):
+        # Caller holds self._lock
+        self.dropped += count
+        self._dropped_since_drain += count
+        return count
@@ -0,0 +1,74 @@
+"""Measure how fast AccessLogParser classifies service output.
+
+Feeds a realistic mix of uvicorn access lines, Ollama GIN lines, plain log
+messages and error tracebacks through the parser in reader-sized batches and
+reports lines per second on one core. Exits with status 1 when the rate is
+below --min-rate, so it can guard against regressions.
+
+    python benchmarks/bench_access_log.py --lines 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from access_log import AccessLogParser
+
+LINES = [
+    'INFO:     127.0.0.1:{n} - "GET /api/v1/chats/{n} HTTP/1.1" 200 OK',
+    'INFO:     127.0.0.1:{n} - "POST /api/chat/completions HTTP/1.1" 200 OK 1.{n}s',
+    'INFO:     127.0.0.1:{n} - "GET /api/v1/models HTTP/1.1" 404 Not Found',
+    'INFO:     127.0.0.1:{n} - "POST /api/v1/chats/new HTTP/1.1" 500 Internal Server Error',
+    '[GIN] 2024/05/01 - 12:00:00 | 200 |  2.{n}s |       127.0.0.1 | POST     "/api/chat"',
+    '[GIN] 2024/05/01 - 12:00:01 | 200 |     {n}µs |       127.0.0.1 | GET      "/api/tags"',
+    'INFO:apps.ollama.main:get_all_models() {n}',
+    'INFO:httpx:HTTP Request: GET http://localhost:11434/api/tags "HTTP/1.1 200 OK"',
+    'time=2024-05-01T12:00:00 level=INFO source=server.go:{n} msg="llama runner started"',
+    'ERROR:    Exception in ASGI application {n}',
+    '  File "/usr/lib/python3/site-packages/starlette/routing.py", line {n}, in handle',
+    'Traceback (most recent call last):',
+]
+
+
+def make_lines(count):
+    return [LINES[n % len(LINES)].format(n=n % 1000) for n in range(count)]
+
+
+def run(total_lines, batch, min_rate):
+    lines = make_lines(min(total_lines, 200000))
+    batches = [lines[i:i + batch] for i in range(0, len(lines), batch)]
+
+    parser = AccessLogParser()
+    fed = 0
+    started = time.perf_counter()
+    while fed < total_lines:
+        for chunk in batches:
+            parser.feed(chunk)
+            fed += len(chunk)
+            if fed >= total_lines:
+                break
+    elapsed = time.perf_counter() - started
+    rate = fed / elapsed
+    counts = parser.counts()
+
+    print(f"lines:          {fed}")
+    print(f"elapsed:        {elapsed:.2f} s")
+    print(f"rate:           {rate:,.0f} lines/s")
+    print(f"requests:       {counts.requests} ({counts.client_errors} 4xx, {counts.server_errors} 5xx, "
+          f"{counts.slow} slow)")
+    print(f"error lines:    {counts.log_errors}")
+    if rate < min_rate:
+        print(f"FAIL: below the required {min_rate:,.0f} lines/s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=500, help="lines per feed() call, like one reader chunk")
+    parser.add_argument("--min-rate", type=float, default=100000, help="lines/s required to pass")
+    args = parser.parse_args()
+    sys.exit(run(args.lines, args.batch, args.min_rate))
@@ -0,0 +1,445 @@
+"""Benchmark the controller core against a stub OpenWebUI server.
+
+Runs ControllerCore, the same core the window and the daemon use, against
+benchmarks/stub_serve.py and measures:
+
+    lifecycle   start-to-ready latency, how long stop_service() blocks the
+                caller, and stop latency until the process tree is gone
+    ingest      log lines per second through the output pipeline while a UI
+                loop drains them, and that loop's lag
+    sampling    metrics sampling overhead while the service is busy
+    memory      whether the sampled process-tree RSS tracks a growing service
+    crash       restarts and time to recovery of a service that keeps crashing
+
+The UI loop ticks like the window's Tk timers: it drains the output queue into
+the log every 100 ms and reads the latest metrics and service status every
+250 ms. Its lag is how late each tick runs. With a display the loop runs on
+a real (hidden) Tk root and log widget; without one it runs on a thread with
+the same work minus the widget.
+
+Results are printed and written as JSON (--output), so runs can be compared
+over time (--compare previous.json). Everything runs on the loopback
+interface with GPU probing disabled.
+
+    python benchmarks/bench_controller.py --output results.json
+    python benchmarks/bench_controller.py --scenarios lifecycle,crash --compare results.json
+"""
+import argparse
+import heapq
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB = os.path.join(ROOT, "benchmarks", "stub_serve.py")
+sys.path.insert(0, ROOT)
+
+# No GPU probing, and nothing written to the real data directory
+os.environ.setdefault("OWUI_GPU_BACKEND", "none")
+os.environ.setdefault("OWUI_CONTROLLER_HOME", tempfile.mkdtemp(prefix="owui-bench-"))
+
+from batch_queue import BatchQueue
+from controller_core import ControllerCore
+from lifecycle import CRASHED, HEALTHY, STOPPED
+from log_buffer import LogBuffer
+from restart_policy import RestartPolicy
+from supervisor import ServiceSpec
+
+SCENARIOS = ("lifecycle", "ingest", "sampling", "memory", "crash")
+
+# The window's timers, in seconds
+LOG_TICK = 0.1
+METRICS_TICK = 0.25
+# OpenWebUIController's queue and drain sizes
+OUTPUT_QUEUE_MAX_LINES = 100000
+LOG_DRAIN_BATCH = 20000
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def stub_spec(name, restart=None, **options):
+    """ServiceSpec running the stub server on a free port; options become its flags."""
+    port = free_port()
+    flags = " ".join(f"--{key.replace('_', '-')} {value}" for key, value in options.items() if value is not None)
+    command = f'"{sys.executable}" "{STUB}" serve --host 127.0.0.1 --port {port} {flags}'
+    if os.name != "nt":
+        # Replace the shell, so stop latency measures the stub and not an orphaned grandchild
+        command = "exec " + command
+    return ServiceSpec(name, command, host="127.0.0.1", port=port, restart=restart)
+
+
+class UILoop:
+    """Does the window's periodic work and records how late each tick runs."""
+
+    def __init__(self, core, output):
+        self.core = core
+        self.output = output
+        self.buffer = LogBuffer(100000)
+        self.lags = []
+        self.drained = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._root = None
+        self._view = None
+        try:
+            import tkinter as tk
+            from tkinter import scrolledtext
+
+            from log_view import LogView
+            self._root = tk.Tk()
+            self._root.withdraw()
+            widget = scrolledtext.ScrolledText(self._root, height=20)
+            widget.pack()
+            self._view = LogView(widget, max_lines=5000, buffer=self.buffer)
+            self.mode = "tk"
+        except Exception:
+            self._root = None
+            self.mode = "simulated (no display)"
+
+    def drain_log(self):
+        lines = self.output.drain(LOG_DRAIN_BATCH)
+        self.drained += len(lines)
+        if self._view is not None:
+            self._view.append(lines)
+        else:
+            self.buffer.extend(lines)
+
+    def read_metrics(self):
+        self.core.sampler.latest()
+        self.core.status()
+
+    def run_for(self, seconds):
+        """Run the loop for `seconds`, on Tk's main loop when there is a display."""
+        self.lags = []
+        if self._root is not None:
+            self._run_tk(seconds)
+        else:
+            self._run_thread(seconds)
+
+    def _run_tk(self, seconds):
+        root = self._root
+        end = time.monotonic() + seconds
+
+        def schedule(work, period):
+            due = time.monotonic() + period
+
+            def tick():
+                self.lags.append(max(0.0, time.monotonic() - due))
+                work()
+                if time.monotonic() < end:
+                    schedule(work, period)
+            root.after(int(period * 1000), tick)
+
+        schedule(self.drain_log, LOG_TICK)
+        schedule(self.read_metrics, METRICS_TICK)
+        root.after(int(seconds * 1000), root.quit)
+        root.mainloop()
+
+    def _run_thread(self, seconds):
+        end = time.monotonic() + seconds
+        now = time.monotonic()
+        timers = [(now + LOG_TICK, 0, self.drain_log, LOG_TICK), (now + METRICS_TICK, 1, self.read_metrics, METRICS_TICK)]
+        while True:
+            due, order, work, period = heapq.heappop(timers)
+            if due > end:
+                break
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.lags.append(max(0.0, time.monotonic() - due))
+            work()
+            heapq.heappush(timers, (time.monotonic() + period, order, work, period))
+
+    def lag_stats(self):
+        return {
+            "ticks": len(self.lags),
+            "lag_p50_ms": ms(percentile(self.lags, 50)),
+            "lag_p99_ms": ms(percentile(self.lags, 99)),
+            "lag_max_ms": ms(max(self.lags) if self.lags else None),
+        }
+
+    def close(self):
+        if self._root is not None:
+            self._root.destroy()
+
+
+class Harness:
+    """A ControllerCore wired up like the window, with state changes recorded."""
+
+    def __init__(self, sample_interval):
+        self.output = BatchQueue(OUTPUT_QUEUE_MAX_LINES)
+        self.lines = 0
+        self.events = []
+        self._changed = threading.Condition()
+        self.core = ControllerCore(on_output=self._output, on_state_change=self._state_changed,
+                                   sample_interval=sample_interval, load_service_file=False,
+                                   persist_history=False)
+        self.ui = UILoop(self.core, self.output)
+
+    def _output(self, name, lines):
+        self.lines += len(lines)
+        self.output.put(lines)
+
+    def _state_changed(self, name, old, new, info):
+        with self._changed:
+            self.events.append((time.monotonic(), name, old, new, info))
+            self._changed.notify_all()
+
+    def wait_for(self, name, states, since, timeout=30.0):
+        """Wait for `name` to enter one of `states` after `since`; returns (time, info) or (None, None)."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                for at, event_name, _, new, info in self.events:
+                    if event_name == name and new in states and at >= since:
+                        return at, info
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, None
+                self._changed.wait(remaining)
+
+    def add(self, spec):
+        self.core.supervisor.add(spec)
+
+    def start(self):
+        self.core.start()
+
+    def shutdown(self):
+        self.core.shutdown()
+        self.ui.close()
+
+
+def bench_lifecycle(harness, cycles):
+    options = {"startup_delay": 0.3, "workers": 2, "stop_delay": 0.2, "lines_per_second": 100}
+    spec = stub_spec("lifecycle", **options)
+    harness.add(spec)
+    start_to_ready, time_to_ready, stop_calls, stop_latencies = [], [], [], []
+    for _ in range(cycles):
+        started = time.monotonic()
+        harness.core.start_service(spec.name)
+        ready_at, info = harness.wait_for(spec.name, (HEALTHY,), started)
+        if ready_at is None:
+            raise RuntimeError("stub did not become ready")
+        start_to_ready.append(ready_at - started)
+        readiness = info.get("readiness")
+        if readiness is not None and readiness.time_to_ready is not None:
+            time_to_ready.append(readiness.time_to_ready)
+
+        stopping = time.monotonic()
+        harness.core.stop_service(spec.name)
+        stop_calls.append(time.monotonic() - stopping)
+        stopped_at, _ = harness.wait_for(spec.name, (STOPPED, CRASHED), stopping)
+        if stopped_at is None:
+            raise RuntimeError("stub did not stop")
+        stop_latencies.append(stopped_at - stopping)
+    return {
+        "cycles": cycles,
+        "start_to_ready_p50_ms": ms(percentile(start_to_ready, 50)),
+        "start_to_ready_max_ms": ms(max(start_to_ready)),
+        "probe_time_to_ready_p50_ms": ms(percentile(time_to_ready, 50)),
+        "stop_call_max_ms": ms(max(stop_calls)),
+        "stop_latency_p50_ms": ms(percentile(stop_latencies, 50)),
+        "stop_latency_max_ms": ms(max(stop_latencies)),
+        "stub_stop_delay_ms": ms(options["stop_delay"]),
+    }
+
+
+def run_busy_service(harness, name, duration, **options):
+    """Start a stub with `options`, run the UI loop for `duration`, stop it.
+
+    Returns the lines read from the service and the lines the UI loop drained
+    while the loop ran, and how long it ran.
+    """
+    spec = stub_spec(name, **options)
+    harness.add(spec)
+    started = time.monotonic()
+    harness.core.start_service(spec.name)
+    if harness.wait_for(spec.name, (HEALTHY,), started)[0] is None:
+        raise RuntimeError("stub did not become ready")
+    # Lines queued while no UI loop ran (earlier scenarios, startup) are not part of this run
+    harness.output.drain()
+    lines_before, drained_before = harness.lines, harness.ui.drained
+    measured = time.monotonic()
+    harness.ui.run_for(duration)
+    elapsed = time.monotonic() - measured
+    lines, drained = harness.lines - lines_before, harness.ui.drained - drained_before
+    stopping = time.monotonic()
+    harness.core.stop_service(spec.name)
+    harness.wait_for(spec.name, (STOPPED, CRASHED), stopping)
+    return lines, drained, elapsed
+
+
+def bench_ingest(harness, rate, duration):
+    dropped_before = harness.output.dropped
+    lines, drained, elapsed = run_busy_service(harness, "ingest", duration, lines_per_second=rate, startup_delay=0.1)
+    status = next(status for status in harness.core.status() if status["name"] == "ingest")
+    return {
+        "ui_loop": harness.ui.mode,
+        "offered_lines_per_s": rate,
+        "ingested_lines_per_s": round(lines / elapsed),
+        "shown_lines_per_s": round(drained / elapsed),
+        "dropped_lines": harness.output.dropped - dropped_before,
+        "requests_parsed": status["requests"],
+        "server_errors_parsed": status["server_errors"],
+        **harness.ui.lag_stats(),
+    }
+
+
+def bench_sampling(harness, duration):
+    cpu_before = time.process_time()
+    stats_before = harness.core.sampler.stats()
+    _, _, elapsed = run_busy_service(harness, "sampling", duration, lines_per_second=2000, workers=4,
+                                      startup_delay=0.1)
+    stats = harness.core.sampler.stats()
+    samples = stats["samples"] - stats_before["samples"]
+    wall = stats["avg_seconds"] * stats["samples"] - stats_before["avg_seconds"] * stats_before["samples"]
+    return {
+        "samples": samples,
+        "sample_avg_ms": ms(wall / samples if samples else None),
+        "sample_max_ms": ms(stats["max_seconds"]),
+        "sampler_cpu_share": round(stats["cpu_share"], 4),
+        "controller_cpu_share": round((time.process_time() - cpu_before) / elapsed, 4),
+        "collectors_avg_ms": {collector["name"]: ms(collector["avg_seconds"]) for collector in stats["collectors"]},
+        **harness.ui.lag_stats(),
+    }
+
+
+def bench_memory(harness, grow_mb_per_s, duration):
+    spec = stub_spec("memory", grow_mb_per_second=grow_mb_per_s, startup_delay=0.1, lines_per_second=10)
+    harness.add(spec)
+    started = time.monotonic()
+    harness.core.start_service(spec.name)
+    if harness.wait_for(spec.name, (HEALTHY,), started)[0] is None:
+        raise RuntimeError("stub did not become ready")
+    readings = []
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        snapshot = harness.core.sampler.latest()
+        tree = snapshot.processes.get(spec.name) if snapshot is not None else None
+        if tree is not None and (not readings or readings[-1][0] != snapshot.timestamp):
+            readings.append((snapshot.timestamp, tree.rss))
+        time.sleep(0.05)
+    stopping = time.monotonic()
+    harness.core.stop_service(spec.name)
+    harness.wait_for(spec.name, (STOPPED, CRASHED), stopping)
+    if len(readings) < 2:
+        return {"samples": len(readings)}
+    (first_at, first_rss), (last_at, last_rss) = readings[0], readings[-1]
+    return {
+        "samples": len(readings),
+        "configured_growth_mb_per_s": grow_mb_per_s,
+        "measured_growth_mb_per_s": round((last_rss - first_rss) / (1024 * 1024) / (last_at - first_at), 2),
+        "final_rss_mb": round(last_rss / (1024 * 1024), 1),
+    }
+
+
+def bench_crash(harness, duration):
+    policy = RestartPolicy("on-failure", initial_delay=0.2, max_delay=1.0, jitter=0.0, crash_loop_count=100)
+    spec = stub_spec("crash", restart=policy, crash_after=0.5, startup_delay=0.2, lines_per_second=100)
+    harness.add(spec)
+    harness.core.start_service(spec.name)
+    time.sleep(duration)
+    stopping = time.monotonic()
+    harness.core.stop_service(spec.name)
+    harness.wait_for(spec.name, (STOPPED, CRASHED), stopping)
+    status = next(status for status in harness.core.status() if status["name"] == "crash")
+    return {
+        "duration_s": duration,
+        "crashes": status["crashes"],
+        "restarts": status["restarts"],
+        "mttr_ms": ms(status["mttr"]),
+        "crash_loop": status["crash_loop"],
+    }
+
+
+def compare(results, previous):
+    """Print the relative change of every numeric result against a previous run."""
+    print(f"\nCompared with {previous.get('started', 'previous run')}:")
+    for scenario, values in results["scenarios"].items():
+        old_values = previous.get("scenarios", {}).get(scenario, {})
+        for key, value in values.items():
+            old = old_values.get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and not isinstance(value, bool):
+                change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+                print(f"  {scenario}.{key}: {old} -> {value} ({change})")
+
+
+def run(scenarios, duration, cycles, rate, grow, interval):
+    harness = Harness(interval)
+    harness.start()
+    results = {
+        "benchmark": "controller",
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "ui_loop": harness.ui.mode,
+        "sample_interval_s": interval,
+        "scenarios": {},
+    }
+    try:
+        for scenario in scenarios:
+            print(f"running {scenario}...", file=sys.stderr, flush=True)
+            if scenario == "lifecycle":
+                result = bench_lifecycle(harness, cycles)
+            elif scenario == "ingest":
+                result = bench_ingest(harness, rate, duration)
+            elif scenario == "sampling":
+                result = bench_sampling(harness, duration)
+            elif scenario == "memory":
+                result = bench_memory(harness, grow, duration)
+            else:
+                result = bench_crash(harness, duration)
+            results["scenarios"][scenario] = result
+    finally:
+        shutdown_started = time.monotonic()
+        harness.shutdown()
+        results["shutdown_ms"] = ms(time.monotonic() - shutdown_started)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {SCENARIOS}")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per load scenario")
+    parser.add_argument("--cycles", type=int, default=5, help="start/stop cycles in the lifecycle scenario")
+    parser.add_argument("--rate", type=float, default=50000, help="log lines per second in the ingest scenario")
+    parser.add_argument("--grow", type=float, default=20.0, help="MB per second of memory growth in the memory scenario")
+    parser.add_argument("--interval", type=float, default=1.0, help="metrics sampling interval")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    results = run(selected, args.duration, args.cycles, args.rate, args.grow, args.interval)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
@@ -0,0 +1,120 @@
+"""Push a large volume of log lines through the controller's log pipeline.
+
+Simulates the output reader putting bursts of lines into a BatchQueue while
+the UI drains it every tick, the same way OpenWebUIController.check_queue
+does, and reports peak memory and per-drain UI latency. The latency covers
+only the view's work (LogView.append and the widget redraw); the queue is
+measured on its own by bench_output_pipeline.py.
+
+    python benchmarks/bench_log_view.py --lines 1000000
+
+Without a display the Tk widget cannot be created; the benchmark then only
+exercises the ring buffer and says so in its output.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tkinter as tk
+from tkinter import scrolledtext
+
+from batch_queue import BatchQueue
+from log_view import LogBuffer, LogView
+
+ACCESS_LINE = 'INFO:     127.0.0.1:{port} - "GET /api/v1/chats/{n} HTTP/1.1" 200 OK'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, where the OS reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run(total_lines, burst, drain_batch, view_lines, buffer_lines, trace_memory=True):
+    try:
+        root = tk.Tk()
+        root.withdraw()
+        widget = scrolledtext.ScrolledText(root, height=20)
+        widget.pack()
+        view = LogView(widget, max_lines=view_lines, buffer=LogBuffer(buffer_lines))
+        mode = "tk"
+    except tk.TclError:
+        root = None
+        view = None
+        buffer = LogBuffer(buffer_lines)
+        mode = "buffer-only (no display)"
+
+    # Unbounded, so every produced line reaches the view
+    output_queue = BatchQueue(max_lines=total_lines)
+    latencies = []
+    produced = 0
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    while produced < total_lines:
+        # Reader thread side: one burst of output
+        count = min(burst, total_lines - produced)
+        output_queue.put([ACCESS_LINE.format(port=40000 + n % 20000, n=n)
+                          for n in range(produced, produced + count)])
+        produced += count
+
+        # UI side: drain until the queue is empty, one batch per tick
+        while len(output_queue):
+            lines = output_queue.drain(drain_batch)
+            tick = time.perf_counter()
+            if view is not None:
+                view.append(lines)
+                root.update_idletasks()
+            else:
+                buffer.extend(lines)
+            latencies.append(time.perf_counter() - tick)
+    elapsed = time.perf_counter() - started
+    peak_traced = None
+    if trace_memory:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    if root is not None:
+        root.destroy()
+
+    print(f"mode:              {mode}")
+    print(f"lines:             {total_lines}")
+    print(f"elapsed:           {elapsed:.2f} s ({total_lines / elapsed:,.0f} lines/s)")
+    print(f"drains:            {len(latencies)}")
+    print(f"drain latency p50: {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"drain latency p99: {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"drain latency max: {max(latencies) * 1000:.2f} ms")
+    if peak_traced is not None:
+        print(f"peak traced alloc: {peak_traced / (1024 * 1024):.1f} MB")
+    rss = peak_rss()
+    if rss is not None:
+        print(f"peak RSS:          {rss / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--burst", type=int, default=5000, help="lines produced between UI ticks")
+    parser.add_argument("--drain-batch", type=int, default=20000)
+    parser.add_argument("--view-lines", type=int, default=5000)
+    parser.add_argument("--buffer-lines", type=int, default=100000)
+    parser.add_argument("--no-trace", action="store_true",
+                        help="skip tracemalloc, which slows allocation and inflates latencies")
+    args = parser.parse_args()
+    run(args.lines, args.burst, args.drain_batch, args.view_lines, args.buffer_lines,
+        trace_memory=not args.no_trace)
@@ -0,0 +1,151 @@
+"""Measure the throughput of the service output pipeline.
+
+A child process writes --lines lines of log-like output as fast as it can,
+while a consumer drains the queue at the log widget's pace; the time until
+every line has been read and drained is measured. Output is read the way
+the controller reads service output: with OutputMultiplexer (binary
+readinto into a reused buffer, one batch per read) into a BatchQueue,
+drained every 100 ms like the log widget's timer. For comparison the same
+output is also read the old way: a text-mode pipe read with readline() and
+one queue.Queue item per line.
+
+Reports delivered lines/s and MB/s for both, next to how many lines the
+bounded queue dropped and how large the unbounded queue grew. The default
+--policy block delivers every line, like the readline path, so the two are
+compared like for like; with a dropping policy the batched figure covers
+fewer lines and a warning says so. Exits with status 1 when the batched
+pipeline delivers fewer than --min-rate lines/s, or loses lines under block.
+
+    python benchmarks/bench_output_pipeline.py --lines 2000000
+"""
+import argparse
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_queue import BLOCK, POLICIES, BatchQueue
+from output_reader import OutputMultiplexer
+
+# The log widget's timer: at most this many lines every this many seconds
+DRAIN_LINES = 20000
+DRAIN_INTERVAL = 0.1
+
+WRITER = """
+import sys
+line = 'INFO:     127.0.0.1:51234 - "GET /api/v1/chats/{{n}} HTTP/1.1" 200 OK\\n'
+out = sys.stdout
+block = []
+for n in range({lines}):
+    block.append(line.format(n=n))
+    if len(block) == 1000:
+        out.write("".join(block))
+        block = []
+out.write("".join(block))
+"""
+
+
+def spawn(lines, text):
+    return subprocess.Popen([sys.executable, "-c", WRITER.format(lines=lines)], stdout=subprocess.PIPE,
+                            bufsize=1 if text else 0, text=text)
+
+
+def run_batched(lines, max_lines, policy):
+    output = BatchQueue(max_lines, policy)
+    finished = threading.Event()
+    multiplexer = OutputMultiplexer()
+    received = 0
+
+    started = time.perf_counter()
+    process = spawn(lines, text=False)
+    multiplexer.add(process.stdout, output.put, on_eof=finished.set)
+    while True:
+        # Everything is queued once EOF is seen; finish draining it without waiting
+        eof = finished.is_set()
+        received += len(output.drain(DRAIN_LINES))
+        if eof and not len(output):
+            break
+        if not eof:
+            finished.wait(DRAIN_INTERVAL)
+    elapsed = time.perf_counter() - started
+    process.wait()
+    return elapsed, received, output.stats()
+
+
+def run_legacy(lines):
+    output = queue.Queue()
+    finished = threading.Event()
+    received = peak = 0
+
+    started = time.perf_counter()
+    process = spawn(lines, text=True)
+
+    def read():
+        for line in iter(process.stdout.readline, ""):
+            output.put(line.rstrip("\n"))
+        finished.set()
+
+    threading.Thread(target=read, daemon=True).start()
+    while True:
+        eof = finished.is_set()
+        peak = max(peak, output.qsize())
+        try:
+            for _ in range(DRAIN_LINES):
+                output.get_nowait()
+                received += 1
+        except queue.Empty:
+            pass
+        if eof and output.empty():
+            break
+        if not eof:
+            finished.wait(DRAIN_INTERVAL)
+    elapsed = time.perf_counter() - started
+    process.wait()
+    return elapsed, received, peak
+
+
+def report(label, elapsed, delivered, dropped, line_bytes):
+    """Print the delivered throughput; dropped lines never reached the consumer and are not counted."""
+    print(f"{label:<10}{elapsed:6.2f} s  {delivered / elapsed:12,.0f} lines/s  "
+          f"{delivered * line_bytes / elapsed / 1e6:8.1f} MB/s  dropped {dropped}")
+
+
+def run(total_lines, max_lines, policy, min_rate, legacy):
+    line_bytes = len('INFO:     127.0.0.1:51234 - "GET /api/v1/chats/100000 HTTP/1.1" 200 OK\n')
+    elapsed, received, stats = run_batched(total_lines, max_lines, policy)
+    report("batched", elapsed, received, stats["dropped"], line_bytes)
+    print(f"          queue high water {stats['high_water']} of {max_lines} ({policy})")
+    rate = received / elapsed
+
+    if legacy:
+        if stats["dropped"]:
+            print(f"WARNING: {policy} dropped {stats['dropped']} lines; the comparison below is not like for like "
+                  f"(use --policy {BLOCK})")
+        elapsed, legacy_received, peak = run_legacy(total_lines)
+        report("readline", elapsed, legacy_received, 0, line_bytes)
+        print(f"          unbounded queue peaked at {peak} lines")
+
+    if policy == BLOCK and received != total_lines:
+        print(f"FAIL: delivered {received} of {total_lines} lines under {BLOCK}")
+        return 1
+    if rate < min_rate:
+        print(f"FAIL: delivered below the required {min_rate:,.0f} lines/s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=2000000)
+    parser.add_argument("--max-lines", type=int, default=100000, help="capacity of the bounded queue")
+    parser.add_argument("--policy", choices=POLICIES, default=BLOCK,
+                        help="queue policy; dropping policies make the readline comparison uneven")
+    # Delivery is paced by the drain, so this is well below what the reader alone sustains
+    parser.add_argument("--min-rate", type=float, default=150000, help="delivered lines/s required to pass")
+    parser.add_argument("--no-legacy", dest="legacy", action="store_false", help="skip the readline comparison")
+    args = parser.parse_args()
+    sys.exit(run(args.lines, args.max_lines, args.policy, args.min_rate, args.legacy))
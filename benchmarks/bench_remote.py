@@ -0,0 +1,121 @@
+"""Measure what remote monitoring costs each agent, with several agents on localhost.
+
+Starts an Aggregator and --agents ControllerCores in this process, each with
+an Agent and a benchmarks/stub_serve.py service (every other one crashes and
+restarts, so state changes and error lines flow too). After --duration
+seconds it reports, per agent, the bytes per second sent on the wire and
+before compression, what sending the full snapshot as JSON every interval
+would have cost, and the agent thread's CPU time. It also checks that the
+aggregator saw every host and that a stopped agent shows as disconnected.
+
+    python benchmarks/bench_remote.py --agents 4 --duration 20 --output remote.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+os.environ.setdefault("OWUI_GPU_BACKEND", "none")
+os.environ.setdefault("OWUI_CONTROLLER_HOME", tempfile.mkdtemp(prefix="owui-bench-"))
+
+from bench_controller import stub_spec
+from controller_core import ControllerCore
+from remote_monitor import Agent, Aggregator, flatten
+from restart_policy import RestartPolicy
+
+
+def run(agents, duration, interval, sample_interval):
+    aggregator = Aggregator("127.0.0.1", 0)
+    aggregator.start()
+    address = aggregator.address
+    nodes = []
+    for index in range(agents):
+        core = ControllerCore(sample_interval=sample_interval, load_service_file=False, persist_history=False)
+        if index % 2:
+            spec = stub_spec("open-webui", restart=RestartPolicy("on-failure", initial_delay=0.5, jitter=0.0,
+                                                                 crash_loop_count=100),
+                             crash_after=3.0, lines_per_second=50)
+        else:
+            spec = stub_spec("open-webui", lines_per_second=200, workers=2)
+        core.supervisor.add(spec)
+        core.start()
+        core.start_service(spec.name)
+        agent = Agent(core, address, f"node{index + 1}", interval)
+        agent.start()
+        nodes.append((core, agent))
+
+    # What sending every snapshot in full, as plain JSON, would have cost
+    full_bytes = [0] * agents
+    started = time.monotonic()
+    while time.monotonic() - started < duration:
+        for index, (core, agent) in enumerate(nodes):
+            full = json.dumps(flatten(core.sampler.latest(), core.status()), separators=(",", ":"))
+            full_bytes[index] += len(full) + 1
+        time.sleep(interval)
+    elapsed = time.monotonic() - started
+
+    hosts = aggregator.hosts()
+    per_agent = []
+    for (core, agent), full in zip(nodes, full_bytes):
+        stats = agent.stats()
+        per_agent.append({
+            "host": agent.name,
+            "frames": stats["frames"],
+            "wire_bytes_per_s": round(stats["bytes_sent"] / elapsed, 1),
+            "json_bytes_per_s": round(stats["raw_bytes"] / elapsed, 1),
+            "full_snapshot_bytes_per_s": round(full / elapsed, 1),
+            "agent_cpu_share": round(stats["cpu_seconds"] / elapsed, 5),
+            "reconnects": stats["reconnects"],
+        })
+
+    # A stopped agent must show up as disconnected
+    nodes[0][1].stop()
+    time.sleep(0.2)
+    first = next(host for host in aggregator.hosts() if host["host"] == nodes[0][1].name)
+
+    for core, agent in nodes:
+        agent.stop()
+        core.shutdown()
+    aggregator.stop()
+
+    return {
+        "benchmark": "remote",
+        "agents": agents,
+        "duration_s": round(elapsed, 1),
+        "interval_s": interval,
+        "hosts_seen": len(hosts),
+        "hosts_connected": sum(1 for host in hosts if host["connected"]),
+        "services_seen": sum(len(host["services"]) for host in hosts),
+        "error_lines_seen": sum(len(host["errors"]) for host in hosts),
+        "stopped_agent_disconnected": not first["connected"],
+        "wire_bytes_per_s_median": statistics.median(agent["wire_bytes_per_s"] for agent in per_agent),
+        "full_snapshot_bytes_per_s_median": statistics.median(agent["full_snapshot_bytes_per_s"]
+                                                              for agent in per_agent),
+        "agent_cpu_share_max": max(agent["agent_cpu_share"] for agent in per_agent),
+        "per_agent": per_agent,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between agent updates")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="metrics sampling interval")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.agents, args.duration, args.interval, args.sample_interval)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if results["hosts_connected"] != args.agents or not results["stopped_agent_disconnected"]:
+        sys.exit(1)
@@ -0,0 +1,91 @@
+"""Measure how long the controller takes to show its window and first metrics.
+
+Launches the controller several times with --startup-timing --exit-after-startup
+against a throwaway data directory and reports the median and worst time to
+window and to first metrics. Exits with status 1 when the median time to
+window is above --max-window-ms.
+
+Without a display (no $DISPLAY on Linux) the Tk window cannot be opened; the
+headless part of startup is timed instead: importing controller_core,
+constructing the core (held to --max-window-ms) and publishing the first metrics sample.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADLESS_SCRIPT = """
+import time
+_started = time.perf_counter()
+from startup_timing import StartupTimer
+timer = StartupTimer(_started)
+from controller_core import ControllerCore
+timer.mark("imports")
+core = ControllerCore()
+timer.mark("core")
+core.start()
+while core.sampler.latest() is None:
+    time.sleep(0.002)
+timer.mark("first_metrics")
+core.shutdown()
+timer.print_report()
+"""
+
+
+def has_display():
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def run_once(headless, home):
+    env = dict(os.environ, OWUI_CONTROLLER_HOME=home)
+    if headless:
+        command = [sys.executable, "-c", HEADLESS_SCRIPT]
+    else:
+        command = [sys.executable, os.path.join(ROOT, "OpenWebUI_Controller.py"),
+                   "--startup-timing", "--exit-after-startup"]
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"no timing report (exit {result.returncode}): {result.stderr.strip()}")
+
+
+def run(runs, max_window_ms, headless):
+    reports = []
+    with tempfile.TemporaryDirectory() as home:
+        for _ in range(runs):
+            reports.append(run_once(headless, home))
+
+    print(f"mode:           {'headless' if headless else 'window'}")
+    print(f"runs:           {runs}")
+    for milestone in ("imports_ms", "core_ms", "widgets_ms", "window_ms", "first_metrics_ms"):
+        values = [report[milestone] for report in reports if milestone in report]
+        if values:
+            label = f"{milestone[:-3].replace('_', ' ')}:"
+            print(f"{label:<16}median {statistics.median(values):7.1f} ms   max {max(values):7.1f} ms")
+
+    # Headless runs have no window; the core being ready is the closest equivalent
+    milestone = "core_ms" if headless else "window_ms"
+    window = statistics.median(report[milestone] for report in reports)
+    if window > max_window_ms:
+        print(f"FAIL: median time to {milestone[:-3]} above {max_window_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-window-ms", type=float, default=500, help="median time to window required to pass")
+    parser.add_argument("--headless", action="store_true", help="time the headless core even if a display is available")
+    args = parser.parse_args()
+    sys.exit(run(args.runs, args.max_window_ms, args.headless or not has_display()))
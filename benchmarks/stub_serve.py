@@ -0,0 +1,137 @@
+"""Stand-in for `open-webui serve` used by the benchmarks.
+
+Answers /health and /api/version like OpenWebUI once its startup delay has
+passed, and produces a configurable load while it runs: access-log lines at
+a given rate, memory that grows steadily, worker subprocesses, a crash after
+some seconds and a slow graceful shutdown. It needs no network beyond the
+loopback port and no GPU.
+
+    python benchmarks/stub_serve.py serve --port 8080 --lines-per-second 5000 --crash-after 10
+
+The window can run it too: set Command to "python benchmarks/stub_serve.py".
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+VERSION = "0.0.0-stub"
+
+ACCESS_LINE = 'INFO:     127.0.0.1:{port} - "GET /api/v1/chats/{n} HTTP/1.1" {status} OK'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--startup-delay", type=float, default=0.5, help="seconds before /health answers 200")
+    parser.add_argument("--lines-per-second", type=float, default=100, help="access-log lines written per second")
+    parser.add_argument("--error-every", type=int, default=100, help="every Nth request is a 500 (0 disables)")
+    parser.add_argument("--grow-mb-per-second", type=float, default=0.0, help="memory allocated and kept per second")
+    parser.add_argument("--workers", type=int, default=0, help="idle child processes, like uvicorn workers")
+    parser.add_argument("--crash-after", type=float, help="exit with --crash-code after this many seconds")
+    parser.add_argument("--crash-code", type=int, default=1)
+    parser.add_argument("--stop-delay", type=float, default=0.0, help="seconds to spend shutting down on SIGTERM")
+    return parser.parse_args(argv)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        ready = time.monotonic() >= self.server.ready_at
+        if self.path == "/health":
+            self._reply(200 if ready else 503, b'{"status": true}' if ready else b'{"status": false}')
+        elif self.path == "/api/version":
+            self._reply(200, ('{"version": "%s"}' % VERSION).encode())
+        else:
+            self._reply(404, b"{}")
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_lines(rate, error_every, stop):
+    """Write access-log lines at `rate` per second, in 10 ms batches."""
+    out = sys.stdout
+    n = 0
+    started = time.monotonic()
+    while not stop.is_set():
+        due = int((time.monotonic() - started) * rate)
+        if due > n:
+            lines = []
+            for i in range(n, due):
+                status = 500 if error_every and i % error_every == error_every - 1 else 200
+                lines.append(ACCESS_LINE.format(port=40000 + i % 20000, n=i, status=status))
+            out.write("\n".join(lines) + "\n")
+            out.flush()
+            n = due
+        stop.wait(0.01)
+
+
+def grow_memory(mb_per_second, stop):
+    hoard = []
+    while not stop.wait(0.1):
+        # Touch every page so the memory counts towards RSS
+        hoard.append(bytearray(b"x" * int(mb_per_second * 1024 * 1024 / 10)))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stop = threading.Event()
+
+    def on_sigterm(*_):
+        if args.stop_delay:
+            print(f"Shutting down (taking {args.stop_delay:.1f} s)", flush=True)
+            time.sleep(args.stop_delay)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    workers = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(3600)"])
+               for _ in range(args.workers)]
+
+    server = HTTPServer((args.host, args.port), _Handler)
+    server.ready_at = time.monotonic() + args.startup_delay
+    threading.Thread(target=server.serve_forever, args=(0.1,), daemon=True).start()
+    print(f"INFO:     Started server process [{os.getpid()}]", flush=True)
+    print(f"INFO:     Uvicorn running on http://{args.host}:{args.port}", flush=True)
+
+    threads = [threading.Thread(target=write_lines, args=(args.lines_per_second, args.error_every, stop),
+                                daemon=True)]
+    if args.grow_mb_per_second:
+        threads.append(threading.Thread(target=grow_memory, args=(args.grow_mb_per_second, stop), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    code = 0
+    if args.crash_after is not None:
+        if not stop.wait(args.crash_after):
+            print("ERROR:    Simulated crash", flush=True)
+            code = args.crash_code
+    else:
+        while not stop.wait(0.5):
+            pass
+
+    stop.set()
+    server.shutdown()
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.wait()
+    sys.stdout.flush()
+    os._exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Metrics collectors run by the MetricsSampler.
+
+Each Collector gathers one kind of metric and declares what that costs: a
+`cost` class and a preferred `interval` in seconds. The sampler runs every
+collector on its worker thread, skips ones whose interval has not elapsed
+(reusing their previous reading), and measures the wall and CPU time of
+every run. A collector that turns out slower than its declared cost is
+stretched further apart so that it spends at most MAX_DUTY of its wall time
+collecting.
+
+A reading is whatever collect() returns, normally a dict of numbers.
+Collectors also say how to show a reading (summary()) and which numbers
+to export (values()). The generic collectors view in the window and the
+Prometheus endpoint use only these two methods, so a new collector needs
+nothing beyond being registered with MetricsSampler.register():
+
+    class LoadAverageCollector(Collector):
+        name = "load"
+        label = "Load average"
+
+        def collect(self):
+            one, five, fifteen = os.getloadavg()
+            return {"1m": one, "5m": five, "15m": fifteen}
+"""
+import time
+from types import MappingProxyType
+
+from gpu_backends import GPUBackendUnavailable, open_backend
+from lazy_import import lazy_module
+from process_tree import ProcessTreeMonitor
+
+psutil = lazy_module("psutil")
+
+CHEAP = "cheap"             # a few syscalls
+MODERATE = "moderate"       # walks /proc or similar; scales with the system
+EXPENSIVE = "expensive"     # spawns a process or talks to a driver
+
+# Preferred interval by cost class, in seconds; 0 means every sample
+DEFAULT_INTERVALS = {CHEAP: 0.0, MODERATE: 0.0, EXPENSIVE: 5.0}
+
+# Largest share of wall time a collector may spend collecting before its interval is stretched
+MAX_DUTY = 0.05
+
+
+def format_rate(bytes_per_second):
+    for unit in ("B/s", "KB/s", "MB/s", "GB/s"):
+        if bytes_per_second < 1024 or unit == "GB/s":
+            return f"{bytes_per_second:.0f} {unit}" if unit == "B/s" else f"{bytes_per_second:.1f} {unit}"
+        bytes_per_second /= 1024
+
+
+class Collector:
+    """Base class: override collect(), and summary()/values() for non-dict readings."""
+
+    name = None
+    label = None
+    cost = CHEAP
+    interval = None         # None uses DEFAULT_INTERVALS[cost]
+    # Opening is slow (driver sessions, imports), so the very first sample skips it
+    slow_open = False
+
+    def open(self):
+        """Prepare for collecting; called on the worker thread before the first collect()."""
+
+    def collect(self):
+        raise NotImplementedError
+
+    def close(self):
+        """Release what open() acquired."""
+
+    def preferred_interval(self):
+        return DEFAULT_INTERVALS[self.cost] if self.interval is None else self.interval
+
+    def values(self, reading):
+        """Flat {metric: number} view of a reading, for export."""
+        if isinstance(reading, dict):
+            return {key: value for key, value in reading.items()
+                    if isinstance(value, (int, float)) and not isinstance(value, bool)}
+        return {}
+
+    def summary(self, reading):
+        """One line of text describing a reading."""
+        return ", ".join(f"{key} {value:.1f}" for key, value in self.values(reading).items())
+
+
+class CpuCollector(Collector):
+    name = "cpu"
+    label = "CPU"
+
+    def collect(self):
+        return {"percent": psutil.cpu_percent()}
+
+    def summary(self, reading):
+        return f"{reading['percent']:.1f}%"
+
+
+class PerCoreCpuCollector(Collector):
+    name = "cpu_cores"
+    label = "CPU per core"
+
+    def collect(self):
+        return tuple(psutil.cpu_percent(percpu=True))
+
+    def values(self, reading):
+        return {f"core{index}": value for index, value in enumerate(reading)}
+
+    def summary(self, reading):
+        return " ".join(f"{value:.0f}" for value in reading) + " %"
+
+
+class MemoryCollector(Collector):
+    name = "memory"
+    label = "Memory"
+
+    def collect(self):
+        memory = psutil.virtual_memory()
+        return {"percent": memory.percent, "used": memory.used, "total": memory.total}
+
+    def summary(self, reading):
+        return f"{reading['percent']:.1f}% of {reading['total'] / 1024 ** 3:.1f} GB"
+
+
+class _RateCollector(Collector):
+    """Turns cumulative byte counters into rates between consecutive runs."""
+
+    fields = ()
+
+    def __init__(self):
+        self._previous = None
+
+    def counters(self):
+        raise NotImplementedError
+
+    def collect(self):
+        now = time.monotonic()
+        counters = self.counters()
+        if counters is None:
+            return None
+        previous, self._previous = self._previous, (now, counters)
+        if previous is None or now <= previous[0]:
+            return {f"{field}_per_s": 0.0 for field in self.fields}
+        elapsed = now - previous[0]
+        return {f"{field}_per_s": max(0.0, (getattr(counters, field) - getattr(previous[1], field)) / elapsed)
+                for field in self.fields}
+
+
+class DiskIOCollector(_RateCollector):
+    name = "disk_io"
+    label = "Disk I/O"
+    fields = ("read_bytes", "write_bytes")
+
+    def counters(self):
+        return psutil.disk_io_counters()
+
+    def summary(self, reading):
+        if reading is None:
+            return "unavailable"
+        return f"read {format_rate(reading['read_bytes_per_s'])}, write {format_rate(reading['write_bytes_per_s'])}"
+
+
+class NetIOCollector(_RateCollector):
+    name = "net_io"
+    label = "Network"
+    fields = ("bytes_recv", "bytes_sent")
+
+    def counters(self):
+        return psutil.net_io_counters()
+
+    def summary(self, reading):
+        if reading is None:
+            return "unavailable"
+        return f"down {format_rate(reading['bytes_recv_per_s'])}, up {format_rate(reading['bytes_sent_per_s'])}"
+
+
+class GPUCollector(Collector):
+    """GPU readings from a gpu_backends backend: NVML or GPUtil (NVIDIA), ioreg (Apple) or fake.
+
+    Its cost depends on the backend that opens: NVML is cheap, while GPUtil
+    (nvidia-smi) and Apple (ioreg) spawn a process on every read.
+    """
+
+    name = "gpu"
+    label = "GPU"
+    cost = MODERATE
+    slow_open = True
+
+    BACKEND_COSTS = {"nvml": CHEAP, "gputil": EXPENSIVE, "mac": EXPENSIVE, "fake": CHEAP}
+
+    def __init__(self, backend="auto"):
+        # Backend name to open on the worker thread, or a GPUBackend instance
+        self._backend_spec = backend
+        self.backend = None
+        self._refresh_requested = False
+
+    def open(self):
+        spec = self._backend_spec
+        if isinstance(spec, str):
+            self.backend = open_backend(spec)
+        else:
+            try:
+                if spec is not None:
+                    spec.open()
+                self.backend = spec
+            except GPUBackendUnavailable:
+                self.backend = None
+        if self.backend is not None:
+            self.cost = self.BACKEND_COSTS.get(self.backend.name, MODERATE)
+            self.interval = 0.0 if self.cost != EXPENSIVE else 2.0
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+    def refresh(self):
+        """Re-probe static GPU facts before the next read."""
+        self._refresh_requested = True
+
+    def collect(self):
+        """Return (gpus, error) where gpus is a tuple of GPUSample."""
+        if self.backend is None:
+            return (), "No GPU backend available"
+        if self._refresh_requested:
+            self._refresh_requested = False
+            self.backend.refresh()
+        try:
+            gpus = self.backend.read()
+        except Exception as e:
+            return (), f"Error: {str(e)}"
+        if not gpus:
+            return (), "No GPU detected"
+        return gpus, None
+
+    def values(self, reading):
+        values = {}
+        for gpu in reading[0]:
+            for field in ("utilization", "memory_used_mb", "temperature_c", "power_w"):
+                if getattr(gpu, field) is not None:
+                    values[f"gpu{gpu.index}_{field}"] = getattr(gpu, field)
+        return values
+
+    def summary(self, reading):
+        gpus, error = reading
+        if error:
+            return error
+        backend = self.backend.name if self.backend is not None else "?"
+        return f"{len(gpus)} GPU(s) via {backend}"
+
+
+class ProcessTreeCollector(Collector):
+    """Resource usage of every tracked service's process tree."""
+
+    name = "processes"
+    label = "Service processes"
+    cost = MODERATE
+
+    def __init__(self, full_memory=False):
+        # USS/PSS read every process's smaps on Linux, the slowest psutil call there; opt-in
+        self.full_memory = full_memory
+        self.breakdown = False
+        self._pids = {}
+        self._monitors = {}
+
+    def track(self, name, pid):
+        pids = dict(self._pids)
+        pids[name] = pid
+        # Swap the whole dict so the worker never sees it half-updated
+        self._pids = pids
+
+    def untrack(self, name):
+        pids = dict(self._pids)
+        pids.pop(name, None)
+        self._pids = pids
+
+    def collect(self):
+        # Keep monitors across samples so per-process CPU deltas are meaningful
+        monitors = {}
+        samples = {}
+        for name, pid in self._pids.items():
+            monitor = self._monitors.get(name)
+            if monitor is None or monitor.root_pid != pid:
+                monitor = ProcessTreeMonitor(pid, full_memory=self.full_memory)
+            monitor.full_memory = self.full_memory
+            monitors[name] = monitor
+            sample = monitor.sample(per_child=self.breakdown)
+            if sample is not None:
+                samples[name] = sample
+        self._monitors = monitors
+        return MappingProxyType(samples)
+
+    def values(self, reading):
+        values = {}
+        for name, tree in reading.items():
+            values[f"{name}_rss"] = tree.rss
+            values[f"{name}_cpu_percent"] = tree.cpu_percent
+            values[f"{name}_processes"] = tree.process_count
+        return {key: value for key, value in values.items() if value is not None}
+
+    def summary(self, reading):
+        if not reading:
+            return "no services running"
+        return ", ".join(f"{name}: {tree.process_count} processes" for name, tree in reading.items())
+
+
+def default_collectors(gpu_backend="auto", process_full_memory=False):
+    """The collectors every MetricsSampler starts with."""
+    return [
+        CpuCollector(),
+        PerCoreCpuCollector(),
+        MemoryCollector(),
+        DiskIOCollector(),
+        NetIOCollector(),
+        GPUCollector(gpu_backend),
+        ProcessTreeCollector(process_full_memory),
+    ]
@@ -0,0 +1,252 @@
+"""Local HTTP control API for a ControllerCore.
+
+    GET  /status                      JSON list of services with cached metrics
+    POST /services/<name>/start       start a service
+    POST /services/<name>/stop        stop a service
+    GET  /services/<name>/logs?lines=N  last N lines of output (text/plain)
+    GET  /metrics                     Prometheus text format
+    GET  /history?column=cpu&seconds=3600  downsampled metric history (JSON)
+    GET  /guardrails                  guardrail rules and their recent events (JSON)
+
+The API is served on a loopback TCP port or, on POSIX systems, on a Unix
+socket whose file permissions restrict who can control the services.
+
+POST requests must carry the token from control_token in the data directory
+(created on first use, readable only by its owner):
+
+    curl -X POST -H "Authorization: Bearer $(cat ~/.openwebui_controller/control_token)" \
+        http://127.0.0.1:8765/services/open-webui/start
+
+Requests from browsers are refused: any Origin header is rejected, and on TCP
+the Host header must name the address the request arrived on, which stops
+DNS-rebinding pages from reaching the API.
+"""
+import errno
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import stat
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import prometheus
+from app_paths import data_dir
+from timeseries import nan_to_none
+
+TOKEN_FILE = "control_token"
+LOOPBACK_NAMES = ("localhost",)
+
+
+def load_token(path=None):
+    """Return the control API token, creating the token file on first use."""
+    path = path or os.path.join(data_dir(), TOKEN_FILE)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path) as f:
+            return f.read().strip()
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(fd, "w") as f:
+        f.write(token + "\n")
+    return token
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "OpenWebUIController"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def core(self):
+        return self.server.core
+
+    def do_GET(self):
+        if not self._allowed():
+            return
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        if parts == ["status"]:
+            self._send_json(self.core.status())
+        elif parts == ["metrics"]:
+            sampler = self.core.sampler
+            text = prometheus.render(sampler.latest(), self.core.status(), sampler.stats(), sampler.collectors())
+            self._send(200, text, prometheus.CONTENT_TYPE)
+        elif len(parts) == 3 and parts[0] == "services" and parts[2] == "logs":
+            try:
+                lines = int(parse_qs(url.query).get("lines", ["100"])[0])
+                self._send(200, "".join(line + "\n" for line in self.core.tail(parts[1], max(0, lines))),
+                           "text/plain; charset=utf-8")
+            except KeyError:
+                self._send_json({"error": f"unknown service {parts[1]}"}, 404)
+            except ValueError:
+                self._send_json({"error": "lines must be a number"}, 400)
+        elif parts == ["history"]:
+            query = parse_qs(url.query)
+            column = query.get("column", ["cpu"])[0]
+            try:
+                seconds = float(query.get("seconds", ["3600"])[0])
+            except ValueError:
+                self._send_json({"error": "seconds must be a number"}, 400)
+                return
+            history = self.core.history
+            if column not in history.columns:
+                self._send_json({"error": f"unknown column {column}", "columns": history.columns}, 404)
+                return
+            resolution = history.tier_for(seconds)
+            latest = history.latest(column, resolution)
+            times, values = history.query(column, latest[0] - seconds if latest else None, resolution)
+            self._send_json({
+                "column": column,
+                "resolution": resolution,
+                # Values are stored as float32; round away the representation noise
+                "points": [[t, nan_to_none(v) and round(v, 3)] for t, v in zip(times, values)],
+            })
+        elif parts == ["guardrails"]:
+            self._send_json({
+                "rules": self.core.guardrails.status(),
+                "events": [event._asdict() for event in list(self.core.guardrails.events)],
+            })
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        # Requests carry no body; drain one if a client sent it anyway
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if not self._allowed() or not self._authorized():
+            return
+        parts = [unquote(part) for part in urlsplit(self.path).path.strip("/").split("/")]
+        if len(parts) != 3 or parts[0] != "services" or parts[2] not in ("start", "stop"):
+            self._send_json({"error": "not found"}, 404)
+            return
+        name, action = parts[1], parts[2]
+        if self.core.supervisor.get(name) is None:
+            self._send_json({"error": f"unknown service {name}"}, 404)
+            return
+        if action == "start":
+            accepted = self.core.start_service(name)
+        else:
+            accepted = self.core.stop_service(name)
+        self._send_json({"service": name, "action": action, "accepted": bool(accepted)}, 202 if accepted else 409)
+
+    def _allowed(self):
+        """Refuse browser requests: any Origin, or a Host other than the address connected to."""
+        if self.headers.get("Origin") is not None:
+            self._send_json({"error": "cross-origin requests are not allowed"}, 403)
+            return False
+        if self.server.check_host and self.headers.get("Host", "").lower() not in self._host_names():
+            self._send_json({"error": "unexpected Host header"}, 403)
+            return False
+        return True
+
+    def _host_names(self):
+        address, port = self.connection.getsockname()[:2]
+        hosts = [f"[{address}]" if ":" in address else address]
+        if address in ("127.0.0.1", "::1"):
+            hosts.extend(LOOPBACK_NAMES)
+        names = [f"{host}:{port}" for host in hosts]
+        if port == 80:
+            names.extend(hosts)
+        return names
+
+    def _authorized(self):
+        scheme, _, token = self.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode("utf-8"),
+                                                                  self.server.token.encode("utf-8")):
+            self._send_json({"error": "missing or wrong token"}, 401)
+            return False
+        return True
+
+    def _send_json(self, body, status=200):
+        self._send(status, json.dumps(body), "application/json")
+
+    def _send(self, status, text, content_type):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ControlServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    check_host = True
+
+    def __init__(self, core, address, token, verbose=False):
+        self.core = core
+        self.token = token
+        self.verbose = verbose
+        super().__init__(address, _Handler)
+
+
+if hasattr(socket, "AF_UNIX"):
+    class UnixControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+        # No browser can reach a Unix socket, and clients send arbitrary Host names
+        check_host = False
+
+        def __init__(self, core, path, token, verbose=False):
+            self.core = core
+            self.token = token
+            self.verbose = verbose
+            _remove_stale_socket(path)
+            # Create the socket owner-only from the start rather than chmod-ing it afterwards
+            umask = os.umask(0o177)
+            try:
+                super().__init__(path, _Handler)
+            finally:
+                os.umask(umask)
+
+        def get_request(self):
+            # Unix socket peers have no address; the request handler expects a (host, port) pair
+            request, _ = super().get_request()
+            return request, ("unix", 0)
+
+        def server_close(self):
+            super().server_close()
+            try:
+                os.unlink(self.server_address)
+            except OSError:
+                pass
+
+
+    def _remove_stale_socket(path):
+        """Unlink a socket file left behind by a server that is gone; refuse anything else."""
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise OSError(errno.EEXIST, f"{path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+        finally:
+            probe.close()
+        raise OSError(errno.EADDRINUSE, f"Another controller is listening on {path}")
+
+
+def make_server(core, host="127.0.0.1", port=8765, unix_socket=None, verbose=False, token=None):
+    """Create (but do not start) a control server; call serve_forever() on a thread.
+
+    POST requests need `token`; by default it is read from, or created in,
+    control_token in the data directory.
+    """
+    token = token or load_token()
+    if unix_socket:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix sockets are not supported on this platform")
+        return UnixControlServer(core, unix_socket, token, verbose)
+    return ControlServer(core, (host, port), token, verbose)
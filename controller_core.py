@@ -0,0 +1,280 @@
+"""Process management and metrics of the OpenWebUI Controller, without a UI.
+
+ControllerCore owns the Supervisor, the MetricsSampler, the metric history,
+the resource guardrails and a bounded tail of each service's output. The Tk window and the headless
+daemon (owui_daemon.py) are both thin clients of it; nothing here imports
+tkinter.
+"""
+import os
+import threading
+import time
+
+from access_log import EMPTY_COUNTS, AccessLogParser, add, subtract
+from app_paths import data_dir
+from guardrails import LOG, PAUSE, RENICE, RESTART, TRIGGERED, GuardrailEngine, GuardrailHistory, load_rules
+from lifecycle import ACTIVE_STATES
+from log_buffer import LogBuffer
+from metrics_sampler import MetricsSampler
+from restart_policy import ON_FAILURE, RestartPolicy
+from supervisor import ServiceSpec, Supervisor, load_specs
+from timeseries import TimeSeriesStore
+
+# Names of the built-in services; more can be added in services.json
+OPENWEBUI = "open-webui"
+OLLAMA = "ollama"
+
+# Lines of recent output kept per service for log tails
+TAIL_MAX_LINES = 10000
+
+# Columns of the metric history; service_* refer to the OpenWebUI process tree,
+# request columns are summed over every service's access log
+HISTORY_COLUMNS = ("cpu", "memory", "gpu", "gpu_memory", "service_rss_mb", "service_cpu",
+                   "requests_per_s", "error_rate", "slow_requests", "log_errors")
+
+# How often the history is written to disk (it is also saved at shutdown)
+HISTORY_SAVE_SECONDS = 300
+
+
+def openwebui_spec(command="open-webui", host="0.0.0.0", port=8080, restart=None):
+    """ServiceSpec for an OpenWebUI server started with `<command> serve`."""
+    port = int(port)
+    return ServiceSpec(OPENWEBUI, f"{command} serve --host {host} --port {port}", host=host, port=port,
+                       restart=restart if restart is not None else RestartPolicy(ON_FAILURE))
+
+
+def ollama_spec():
+    """ServiceSpec for a local Ollama server on its default port."""
+    return ServiceSpec(OLLAMA, "ollama serve", port=11434, health_path="/", version_path="/api/version",
+                       restart=RestartPolicy(ON_FAILURE))
+
+
+class ControllerCore:
+    """Supervised services plus background metrics, usable with or without a UI.
+
+    on_output(name, lines) and on_state_change(name, old, new, info) are
+    forwarded from the supervisor and called from worker threads.
+    """
+
+    def __init__(self, specs=(), on_output=None, on_state_change=None, sample_interval=1.0,
+                 load_service_file=True, history_path=None, persist_history=True):
+        self.on_output = on_output
+        self.on_state_change = on_state_change
+        self.sampler = MetricsSampler(interval=sample_interval)
+
+        # Every sample is also kept, downsampled, in the metric history
+        self.history = TimeSeriesStore(HISTORY_COLUMNS)
+        self.history_path = (history_path or os.path.join(data_dir(), "metrics_history.bin")) if persist_history else None
+        self._history_saved_at = time.monotonic()
+        self.sampler.add_listener(self._record_sample)
+        # Rules from guardrails.json, evaluated against every sample
+        self.guardrails = GuardrailEngine(on_action=self._guardrail_action,
+                                          history=GuardrailHistory() if persist_history else None)
+        self.supervisor = Supervisor(
+            on_output=self._output,
+            on_state_change=self._state_changed,
+            on_process_started=self._process_started,
+        )
+        self._tails = {}
+        self._tails_lock = threading.Lock()
+        self._output_listeners = []
+
+        # Request statistics parsed from each service's output, diffed per sample
+        self._parsers = {}
+        self._request_counts = EMPTY_COUNTS
+        self._request_counts_at = None
+        # Request rates over the last sample interval, replaced as a whole
+        self.request_rates = {}
+        # Problems found while loading services.json, for the client to report
+        self.load_errors = []
+
+        for spec in specs:
+            self.supervisor.add(spec)
+        if load_service_file:
+            try:
+                for spec in load_specs():
+                    self.supervisor.add(spec)
+            except (OSError, ValueError, TypeError) as e:
+                self.load_errors.append(f"Could not load services.json: {e}")
+            try:
+                self.guardrails.set_rules(load_rules())
+            except (OSError, ValueError, TypeError) as e:
+                self.load_errors.append(f"Could not load guardrails.json: {e}")
+
+    def start(self):
+        """Load the saved metric history and start background metrics collection.
+
+        Kept out of __init__ so a UI can paint its window first.
+        """
+        if self.history_path:
+            self.history.load(self.history_path)
+        self.sampler.start()
+
+    def shutdown(self):
+        """Stop every service and the sampler; blocks until they are gone."""
+        self.supervisor.stop_all(wait=True)
+        self.sampler.stop()
+        self.save_history()
+
+    def save_history(self):
+        if self.history_path:
+            try:
+                self.history.save(self.history_path)
+            except OSError as e:
+                print(f"Error saving metric history: {e}")
+
+    def start_service(self, name):
+        return self.supervisor.start(name)
+
+    def stop_service(self, name):
+        return self.supervisor.stop(name)
+
+    def status(self):
+        """Service status merged with the latest cached process metrics; never probes."""
+        snapshot = self.sampler.latest()
+        processes = snapshot.processes if snapshot is not None else {}
+        services = self.supervisor.status()
+        for status in services:
+            tree = processes.get(status["name"]) if status["pid"] else None
+            status["rss"] = tree.rss if tree is not None else None
+            status["cpu_percent"] = tree.cpu_percent if tree is not None else None
+            status["process_count"] = tree.process_count if tree is not None else None
+            parser = self._parsers.get(status["name"])
+            counts = parser.counts() if parser is not None else EMPTY_COUNTS
+            status["requests"] = counts.requests
+            status["client_errors"] = counts.client_errors
+            status["server_errors"] = counts.server_errors
+            status["slow_requests"] = counts.slow
+            status["log_errors"] = counts.log_errors
+        return services
+
+    def add_output_listener(self, callback):
+        """Also call callback(name, lines) for every batch of service output, on the reader thread."""
+        self._output_listeners = self._output_listeners + [callback]
+
+    def tail(self, name, lines=100):
+        """Return the last `lines` lines of a service's output, oldest first."""
+        if self.supervisor.get(name) is None:
+            raise KeyError(name)
+        with self._tails_lock:
+            buffer = self._tails.get(name)
+            return buffer.tail(lines) if buffer is not None else []
+
+    def _output(self, name, lines):
+        with self._tails_lock:
+            buffer = self._tails.get(name)
+            if buffer is None:
+                buffer = self._tails[name] = LogBuffer(TAIL_MAX_LINES)
+                self._parsers[name] = AccessLogParser()
+            buffer.extend(lines)
+            parser = self._parsers[name]
+        parser.feed(lines)
+        for listener in self._output_listeners:
+            try:
+                listener(name, lines)
+            except Exception as e:
+                print(f"Error in output listener: {e}")
+        if self.on_output:
+            self.on_output(name, lines)
+
+    def _record_sample(self, snapshot):
+        # Sampler worker thread
+        utilizations = [gpu.utilization for gpu in snapshot.gpus if gpu.utilization is not None]
+        memory_total = sum(gpu.memory_total_mb or 0 for gpu in snapshot.gpus)
+        tree = snapshot.processes.get(OPENWEBUI)
+        rates = self._request_rates(snapshot.timestamp)
+        system = {
+            "cpu": snapshot.cpu_percent,
+            "memory": snapshot.memory_percent,
+            "gpu": sum(utilizations) / len(utilizations) if utilizations else None,
+            "gpu_memory": (sum(gpu.memory_used_mb or 0 for gpu in snapshot.gpus) / memory_total * 100
+                           if memory_total else None),
+        }
+        self.history.append(snapshot.timestamp, {
+            **system,
+            "service_rss_mb": tree.rss / (1024 * 1024) if tree is not None else None,
+            "service_cpu": tree.cpu_percent if tree is not None else None,
+            **rates,
+        })
+
+        if self.guardrails.rules:
+            metrics = dict(system)
+            for name, tree in snapshot.processes.items():
+                if tree is not None:
+                    metrics[f"{name}.rss_mb"] = tree.rss / (1024 * 1024) if tree.rss is not None else None
+                    metrics[f"{name}.cpu"] = tree.cpu_percent
+                    metrics[f"{name}.processes"] = tree.process_count
+            self.guardrails.evaluate(snapshot.timestamp, metrics)
+
+        if time.monotonic() - self._history_saved_at >= HISTORY_SAVE_SECONDS:
+            self._history_saved_at = time.monotonic()
+            self.save_history()
+
+    def _request_rates(self, timestamp):
+        """Request statistics since the previous sample, on the sample's timeline."""
+        total = EMPTY_COUNTS
+        with self._tails_lock:
+            parsers = list(self._parsers.values())
+        for parser in parsers:
+            total = add(total, parser.counts())
+        previous, previous_at = self._request_counts, self._request_counts_at
+        self._request_counts, self._request_counts_at = total, timestamp
+        if previous_at is None or timestamp <= previous_at:
+            return {}
+        delta = subtract(total, previous)
+        rates = {
+            "requests_per_s": delta.requests / (timestamp - previous_at),
+            "error_rate": delta.server_errors / delta.requests * 100 if delta.requests else None,
+            "slow_requests": delta.slow,
+            "log_errors": delta.log_errors,
+        }
+        self.request_rates = rates
+        return rates
+
+    def _guardrail_action(self, event):
+        # Sampler worker thread, via GuardrailEngine.evaluate
+        service = self.supervisor.get(event.service) if event.service else None
+        triggered = event.phase == TRIGGERED
+        if event.action == LOG:
+            result = "logged"
+        elif service is None:
+            result = f"unknown service {event.service}"
+        elif not service.lifecycle.running:
+            result = "service not running"
+        elif event.action == RESTART:
+            if triggered:
+                self.supervisor.restart(service.name)
+            result = "restarting" if triggered else None
+        elif event.action == PAUSE:
+            if triggered:
+                result = "paused" if service.lifecycle.pause() else "already paused"
+            else:
+                result = "resumed" if service.lifecycle.resume() else "not paused"
+        elif event.action == RENICE:
+            rule = next((rule for rule in self.guardrails.rules if rule.name == event.rule), None)
+            niceness = rule.niceness if triggered and rule is not None else 0
+            try:
+                result = f"niceness {niceness} on {service.lifecycle.set_niceness(niceness)} processes"
+            except Exception as e:
+                result = f"could not set niceness {niceness}: {e}"
+        else:
+            result = None
+
+        if triggered:
+            window = f" for {event.timestamp - event.samples[0][0]:.0f} s" if event.samples else ""
+            text = (f"Guardrail '{event.rule}': {event.metric} at {event.value:.1f} "
+                    f"({'above' if event.value > event.threshold else 'below'} {event.threshold:g}){window}; "
+                    f"{event.action}: {result}")
+        else:
+            text = f"Guardrail '{event.rule}' cleared" + (f"; {result}" if result else "")
+        self.supervisor.message(event.service or OPENWEBUI, text)
+        return result
+
+    def _process_started(self, name, pid):
+        self.sampler.track_process(name, pid)
+
+    def _state_changed(self, name, old, new, info):
+        # Untrack on the lifecycle's thread, so it cannot race a restart's track_process
+        if new not in ACTIVE_STATES:
+            self.sampler.untrack_process(name)
+        if self.on_state_change:
+            self.on_state_change(name, old, new, info)
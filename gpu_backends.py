@@ -0,0 +1,274 @@
+"""GPU telemetry backends for the OpenWebUI Controller.
+
+Every backend returns a tuple of GPUSample for all devices from a single
+read() call. The NVIDIA backend keeps one NVML session open for the lifetime
+of the sampler instead of spawning nvidia-smi every tick; GPUtil is only used
+when NVML bindings are not installed.
+"""
+import math
+import os
+import platform
+import time
+from collections import namedtuple
+
+from hardware_inventory import HardwareInventory, match_accelerators, parse_ioreg_accelerators, run_ioreg_accelerators
+
+# One GPU as seen at sample time. Fields that a backend cannot report are None.
+GPUSample = namedtuple("GPUSample", [
+    "index",
+    "name",
+    "utilization",      # percent, None when unknown (macOS)
+    "memory_used_mb",
+    "memory_total_mb",
+    "temperature_c",
+    "power_w",
+    "vram_mb",          # static VRAM size reported by system_profiler
+    "metal",            # Metal support (macOS only)
+])
+
+
+def make_sample(index, name, utilization=None, memory_used_mb=None, memory_total_mb=None,
+                temperature_c=None, power_w=None, vram_mb=None, metal=None):
+    """Build a GPUSample, leaving unsupported fields as None."""
+    return GPUSample(index, name, utilization, memory_used_mb, memory_total_mb,
+                     temperature_c, power_w, vram_mb, metal)
+
+
+class GPUBackendUnavailable(Exception):
+    """Raised by GPUBackend.open() when the backend cannot be used here."""
+
+
+class GPUBackend:
+    """Interface for GPU telemetry sources."""
+
+    name = "none"
+
+    def open(self):
+        """Acquire any long-lived handles. Raise GPUBackendUnavailable if unusable."""
+
+    def read(self):
+        """Return a tuple of GPUSample, one per device."""
+        return ()
+
+    def refresh(self):
+        """Re-probe static device facts (names, VRAM) if the backend caches them."""
+
+    def close(self):
+        """Release handles acquired in open()."""
+
+
+class NvmlBackend(GPUBackend):
+    """NVIDIA telemetry through a persistent NVML session (nvidia-ml-py)."""
+
+    name = "nvml"
+
+    def __init__(self):
+        self._nvml = None
+        self._devices = []
+
+    def open(self):
+        try:
+            import pynvml
+        except ImportError:
+            raise GPUBackendUnavailable("nvidia-ml-py not installed")
+        try:
+            pynvml.nvmlInit()
+        except pynvml.NVMLError as e:
+            raise GPUBackendUnavailable(f"NVML init failed: {e}")
+
+        self._nvml = pynvml
+        # Handles and names are static, look them up once
+        self._devices = []
+        for index in range(pynvml.nvmlDeviceGetCount()):
+            handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+            name = pynvml.nvmlDeviceGetName(handle)
+            if isinstance(name, bytes):
+                name = name.decode(errors="replace")
+            self._devices.append((index, name, handle))
+
+    def read(self):
+        nvml = self._nvml
+        samples = []
+        for index, name, handle in self._devices:
+            utilization = nvml.nvmlDeviceGetUtilizationRates(handle)
+            memory = nvml.nvmlDeviceGetMemoryInfo(handle)
+            try:
+                temperature = nvml.nvmlDeviceGetTemperature(handle, nvml.NVML_TEMPERATURE_GPU)
+            except nvml.NVMLError:
+                temperature = None
+            try:
+                power = nvml.nvmlDeviceGetPowerUsage(handle) / 1000.0  # milliwatts
+            except nvml.NVMLError:
+                power = None
+            samples.append(make_sample(
+                index, name,
+                utilization=float(utilization.gpu),
+                memory_used_mb=memory.used / (1024 * 1024),
+                memory_total_mb=memory.total / (1024 * 1024),
+                temperature_c=temperature,
+                power_w=power,
+            ))
+        return tuple(samples)
+
+    def close(self):
+        if self._nvml:
+            try:
+                self._nvml.nvmlShutdown()
+            except self._nvml.NVMLError:
+                pass
+            self._nvml = None
+            self._devices = []
+
+
+class GPUtilBackend(GPUBackend):
+    """NVIDIA telemetry through GPUtil, which spawns nvidia-smi on every read."""
+
+    name = "gputil"
+
+    def __init__(self):
+        self._gputil = None
+
+    def open(self):
+        try:
+            import GPUtil
+        except ImportError:
+            raise GPUBackendUnavailable("GPUtil not installed")
+        self._gputil = GPUtil
+
+    def read(self):
+        return tuple(
+            make_sample(
+                index, gpu.name,
+                utilization=gpu.load * 100,  # Convert to percentage
+                memory_used_mb=gpu.memoryUsed,
+                memory_total_mb=gpu.memoryTotal,
+                temperature_c=gpu.temperature,
+            )
+            for index, gpu in enumerate(self._gputil.getGPUs())
+        )
+
+
+class AppleGPUBackend(GPUBackend):
+    """Apple GPU telemetry.
+
+    Static facts come from a HardwareInventory probed once with
+    system_profiler; utilization comes from ioreg. Every read spawns ioreg,
+    so GPUCollector counts this backend as expensive and reads it every few
+    seconds rather than every tick. The two list GPUs independently, so
+    readings are matched to GPUs by model and driver vendor (see
+    match_accelerators).
+    """
+
+    name = "mac"
+
+    def __init__(self, inventory=None, ioreg=None):
+        self.inventory = inventory or HardwareInventory()
+        # Callable returning ioreg output; replaceable with recorded text
+        self._ioreg = ioreg or run_ioreg_accelerators
+        self._ioreg_failed = False
+
+    def open(self):
+        if not self.inventory.probe():
+            raise GPUBackendUnavailable(self.inventory.error or "No Mac GPU info available")
+
+    def refresh(self):
+        self.inventory.refresh()
+        self._ioreg_failed = False
+
+    def read(self):
+        accelerators = []
+        if not self._ioreg_failed:
+            try:
+                accelerators = parse_ioreg_accelerators(self._ioreg())
+            except Exception:
+                # Older macOS versions do not expose performance statistics
+                self._ioreg_failed = True
+
+        gpus = self.inventory.gpus
+        samples = []
+        for index, (gpu, dynamic) in enumerate(zip(gpus, match_accelerators(gpus, accelerators))):
+            dynamic = dynamic or {}
+            samples.append(make_sample(
+                index, gpu.get("name", "Unknown GPU"),
+                utilization=dynamic.get("utilization"),
+                memory_used_mb=dynamic.get("memory_used_mb"),
+                memory_total_mb=gpu.get("vram"),
+                vram_mb=gpu.get("vram"),
+                metal=gpu.get("metal", False),
+            ))
+        return tuple(samples)
+
+
+class FakeGPUBackend(GPUBackend):
+    """Synthetic GPUs for machines without one.
+
+    Readings follow a slow sine wave per device unless fixed values are
+    supplied with set_readings().
+    """
+
+    name = "fake"
+
+    def __init__(self, count=2, memory_total_mb=24576, period=60.0):
+        self.count = count
+        self.memory_total_mb = memory_total_mb
+        self.period = period
+        self.reads = 0
+        self._fixed = None
+
+    def set_readings(self, samples):
+        """Return exactly these GPUSample values from read(); None resumes the wave."""
+        self._fixed = tuple(samples) if samples is not None else None
+
+    def read(self):
+        self.reads += 1
+        if self._fixed is not None:
+            return self._fixed
+
+        now = time.time()
+        samples = []
+        for index in range(self.count):
+            phase = 2 * math.pi * (now / self.period + index / max(self.count, 1))
+            load = 50 + 45 * math.sin(phase)
+            samples.append(make_sample(
+                index, f"Fake GPU {index}",
+                utilization=load,
+                memory_used_mb=self.memory_total_mb * (0.3 + 0.005 * load),
+                memory_total_mb=self.memory_total_mb,
+                temperature_c=40 + load * 0.4,
+                power_w=50 + load * 2.5,
+            ))
+        return tuple(samples)
+
+
+BACKENDS = {
+    "nvml": NvmlBackend,
+    "gputil": GPUtilBackend,
+    "mac": AppleGPUBackend,
+    "fake": FakeGPUBackend,
+}
+
+
+def open_backend(name="auto"):
+    """Open and return a GPU backend, or None if no GPU telemetry is available.
+
+    "auto" (the default, overridable with the OWUI_GPU_BACKEND environment
+    variable) picks the Apple backend on macOS and NVML with a GPUtil fallback
+    elsewhere.
+    """
+    name = os.environ.get("OWUI_GPU_BACKEND", name) if name == "auto" else name
+    if name == "none":
+        return None
+
+    if name == "auto":
+        candidates = ["mac"] if platform.system() == "Darwin" else ["nvml", "gputil"]
+    else:
+        candidates = [name]
+
+    for candidate in candidates:
+        backend = BACKENDS[candidate]()
+        try:
+            backend.open()
+        except GPUBackendUnavailable:
+            continue
+        return backend
+    return None
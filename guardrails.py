@@ -0,0 +1,234 @@
+"""Resource guardrails: rules over sampled metrics that act on services.
+
+A GuardrailRule watches one metric and triggers when it stays past its
+threshold for `duration` seconds, for example
+
+    {"name": "webui-rss", "metric": "open-webui.rss_mb", "above": 12000,
+     "duration": 30, "action": "restart", "service": "open-webui"}
+    {"name": "gpu-full", "metric": "gpu_memory", "above": 95, "clear": 85,
+     "action": "pause", "service": "ollama"}
+
+Rules are listed in guardrails.json in the controller's data directory.
+Metric names are the system columns of the metric history ("cpu",
+"memory", "gpu", "gpu_memory", in percent) and per-service process-tree
+metrics "<service>.rss_mb", "<service>.cpu" and "<service>.processes".
+
+Rules have hysteresis: a triggered rule only clears once the metric has been
+back past `clear` (the threshold itself by default) for `clear_duration`
+seconds, and it cannot trigger again within `cooldown` seconds. Clearing
+undoes the actions that can be undone: a paused service is resumed and a
+reniced one gets its priority back.
+
+The engine itself only sees (timestamp, {metric: value}) pairs and calls an
+action callback, so it can be driven by a synthetic metric stream:
+
+    engine = GuardrailEngine([parse_rule({"name": "hot", "metric": "cpu", "above": 90, "duration": 10})])
+    for t, cpu in enumerate([95] * 12):
+        events = engine.evaluate(t, {"cpu": cpu})
+"""
+import json
+import os
+import threading
+from collections import deque, namedtuple
+
+from app_paths import data_dir
+from jsonl_history import JsonlHistory
+
+LOG = "log"             # only record the event
+RESTART = "restart"     # stop the service gracefully and start it again
+RENICE = "renice"       # lower the CPU priority of the service's process tree
+PAUSE = "pause"         # suspend the service's process tree until the rule clears
+
+ACTIONS = (LOG, RESTART, RENICE, PAUSE)
+
+TRIGGERED = "triggered"
+CLEARED = "cleared"
+
+# Samples kept per rule to explain an event, beyond those in its window
+MAX_EVENT_SAMPLES = 120
+
+GuardrailRule = namedtuple("GuardrailRule", [
+    "name",
+    "metric",
+    "threshold",
+    "above",            # True triggers above the threshold, False below it
+    "duration",         # seconds the threshold must be exceeded before acting
+    "clear",            # value the metric must return past to clear; None means threshold
+    "clear_duration",   # seconds it must stay there
+    "action",           # log | restart | renice | pause
+    "service",          # service acted on; required for every action but log
+    "cooldown",         # seconds after triggering before the rule can trigger again
+    "niceness",         # niceness applied by renice
+], defaults=(True, 30.0, None, 10.0, LOG, None, 300.0, 10))
+
+GuardrailEvent = namedtuple("GuardrailEvent", [
+    "rule",
+    "phase",            # triggered | cleared
+    "timestamp",
+    "metric",
+    "value",
+    "threshold",
+    "action",
+    "service",
+    "samples",          # ((timestamp, value), ...) that led to the event
+    "result",           # what the action did, or the error it hit
+])
+
+
+def parse_rule(value):
+    """Build a GuardrailRule from a dict as found in guardrails.json."""
+    if isinstance(value, GuardrailRule):
+        rule = value
+    elif isinstance(value, dict):
+        options = dict(value)
+        if "above" in options and "below" in options:
+            raise ValueError(f"Guardrail '{options.get('name')}' has both 'above' and 'below'")
+        if "above" in options:
+            options["threshold"] = options.pop("above")
+            options["above"] = True
+        elif "below" in options:
+            options["threshold"] = options.pop("below")
+            options["above"] = False
+        rule = GuardrailRule(**options)
+    else:
+        raise TypeError(f"Invalid guardrail rule: {value!r}")
+
+    if rule.action not in ACTIONS:
+        raise ValueError(f"Guardrail '{rule.name}': unknown action '{rule.action}'")
+    if rule.action != LOG and not rule.service:
+        raise ValueError(f"Guardrail '{rule.name}': action '{rule.action}' needs a service")
+    return rule._replace(threshold=float(rule.threshold), duration=float(rule.duration),
+                         clear=None if rule.clear is None else float(rule.clear),
+                         clear_duration=float(rule.clear_duration), cooldown=float(rule.cooldown))
+
+
+def load_rules(path=None):
+    """Read GuardrailRules from a JSON file; missing file means none."""
+    path = path or os.path.join(data_dir(), "guardrails.json")
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [parse_rule(entry) for entry in entries]
+
+
+class _RuleState:
+    def __init__(self):
+        self.breach_since = None
+        self.clear_since = None
+        self.triggered = False
+        self.triggered_at = None
+        self.samples = deque(maxlen=MAX_EVENT_SAMPLES)
+
+
+class GuardrailEngine:
+    """Evaluates rules against a stream of metric samples.
+
+    on_action(event) is called for every TRIGGERED and CLEARED event and may
+    return a short description of what it did, which is stored as the
+    event's result; exceptions become the result instead of propagating.
+    Events are kept in memory (the last `keep_events`) and appended to
+    `history` when one is given.
+    """
+
+    def __init__(self, rules=(), on_action=None, history=None, keep_events=200):
+        self.on_action = on_action
+        self.history = history
+        self.events = deque(maxlen=keep_events)
+        self._lock = threading.Lock()
+        self.set_rules(rules)
+
+    def set_rules(self, rules):
+        """Replace the rules; the state of rules whose name is kept carries over."""
+        rules = [parse_rule(rule) for rule in rules]
+        with self._lock:
+            old_states = getattr(self, "_states", {})
+            self.rules = rules
+            self._states = {rule.name: old_states.get(rule.name) or _RuleState() for rule in rules}
+
+    def evaluate(self, timestamp, metrics):
+        """Feed one sample; returns the events it caused."""
+        events = []
+        with self._lock:
+            for rule in self.rules:
+                event = self._evaluate_rule(rule, self._states[rule.name], timestamp, metrics.get(rule.metric))
+                if event is not None:
+                    events.append(event)
+
+        # Act outside the lock, so a slow action does not hold up evaluation of the next sample
+        for index, event in enumerate(events):
+            result = None
+            if self.on_action:
+                try:
+                    result = self.on_action(event)
+                except Exception as e:
+                    result = f"error: {e}"
+            event = events[index] = event._replace(result=result)
+            self.events.append(event)
+            if self.history is not None:
+                self.history.record(event)
+        return events
+
+    def status(self):
+        """Return a list of plain dicts describing every rule and whether it is triggered."""
+        with self._lock:
+            return [
+                {
+                    **rule._asdict(),
+                    "triggered": self._states[rule.name].triggered,
+                    "triggered_at": self._states[rule.name].triggered_at,
+                }
+                for rule in self.rules
+            ]
+
+    def _evaluate_rule(self, rule, state, timestamp, value):
+        # Caller holds self._lock
+        if value is not None:
+            state.samples.append((timestamp, value))
+        breaching = value is not None and (value > rule.threshold if rule.above else value < rule.threshold)
+
+        if not state.triggered:
+            if not breaching:
+                state.breach_since = None
+                return None
+            if state.breach_since is None:
+                state.breach_since = timestamp
+            if timestamp - state.breach_since < rule.duration:
+                return None
+            if state.triggered_at is not None and timestamp - state.triggered_at < rule.cooldown:
+                return None
+            state.triggered = True
+            state.triggered_at = timestamp
+            state.clear_since = None
+            return self._event(rule, state, TRIGGERED, timestamp, value, state.breach_since)
+
+        # Triggered: a missing value (the service stopped) counts as clear
+        clear = rule.threshold if rule.clear is None else rule.clear
+        cleared = value is None or (value <= clear if rule.above else value >= clear)
+        if not cleared:
+            state.clear_since = None
+            return None
+        if state.clear_since is None:
+            state.clear_since = timestamp
+        if timestamp - state.clear_since < rule.clear_duration:
+            return None
+        state.triggered = False
+        state.breach_since = None
+        return self._event(rule, state, CLEARED, timestamp, value, state.clear_since)
+
+    def _event(self, rule, state, phase, timestamp, value, since):
+        samples = tuple(sample for sample in state.samples if sample[0] >= since)
+        return GuardrailEvent(rule.name, phase, timestamp, rule.metric, value, rule.threshold,
+                              rule.action, rule.service, samples, None)
+
+
+class GuardrailHistory(JsonlHistory):
+    """Append-only JSON-lines log of GuardrailEvents."""
+
+    filename = "guardrail_actions.jsonl"
+    record_type = GuardrailEvent
+
+    def parse(self, entry):
+        entry["samples"] = tuple(tuple(sample) for sample in entry["samples"])
+        return GuardrailEvent(**entry)
@@ -0,0 +1,234 @@
+"""Static hardware inventory for the OpenWebUI Controller.
+
+Facts that cannot change while the app is running (GPU chipset, GPU core
+count, Metal support, VRAM) are probed once and cached. On macOS the probe runs
+system_profiler, which takes around a second, so it must never be part of the
+per-tick sampling path. The parsers take plain text so they can be exercised
+with recorded command output on any platform.
+"""
+import platform
+import re
+import subprocess
+import threading
+
+_VRAM_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(MB|GB)", re.IGNORECASE)
+_IOREG_UTIL_RE = re.compile(r'"Device Utilization %"\s*=\s*(\d+)')
+_IOREG_MEMORY_RE = re.compile(r'"In use system memory"\s*=\s*(\d+)')
+_IOREG_MODEL_RE = re.compile(r'"model"\s*=\s*"([^"]*)"')
+_IOREG_CLASS_RE = re.compile(r'"IOClass"\s*=\s*"([^"]*)"')
+
+# Vendor of an IOAccelerator driver, by the start of its registry name
+_ACCELERATOR_VENDORS = (("AGX", "apple"), ("AMD", "amd"), ("ATI", "amd"), ("Intel", "intel"),
+                        ("NVDA", "nvidia"), ("GeForce", "nvidia"))
+# Vendor of a system_profiler GPU, by a word in its vendor or chipset name
+_GPU_VENDOR_WORDS = (("apple", "apple"), ("amd", "amd"), ("radeon", "amd"), ("ati", "amd"),
+                     ("intel", "intel"), ("nvidia", "nvidia"), ("geforce", "nvidia"))
+
+
+def parse_vram_mb(text):
+    """Convert a VRAM description such as "1536 MB" or "8 GB" to megabytes."""
+    match = _VRAM_RE.search(text)
+    if not match:
+        return None
+    value = float(match.group(1))
+    if match.group(2).upper() == "GB":
+        value *= 1024
+    return int(value)
+
+
+def parse_system_profiler_displays(output):
+    """Parse `system_profiler SPDisplaysDataType` output into a list of GPU dicts.
+
+    Each dict has "name", "metal" and, when reported, "vram" (MB), "cores"
+    and "vendor". A new GPU starts at every "Chipset Model:" line; the
+    attached "Displays:" section is skipped.
+    """
+    gpus = []
+    current = None
+    displays_indent = None
+
+    for raw_line in output.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        indent = len(raw_line) - len(raw_line.lstrip())
+
+        # Skip monitor details nested below the GPU entry
+        if displays_indent is not None:
+            if indent > displays_indent:
+                continue
+            displays_indent = None
+        if line == "Displays:":
+            displays_indent = indent
+            continue
+
+        if ":" not in line:
+            continue
+        key, value = (part.strip() for part in line.split(":", 1))
+
+        if key == "Chipset Model":
+            current = {"name": value, "metal": False}
+            gpus.append(current)
+        elif current is None:
+            continue
+        elif key.startswith("Metal"):
+            # "Metal: Supported, ..." on Intel Macs, "Metal Support: Metal 3" on Apple Silicon
+            lowered = value.lower()
+            if ("supported" in lowered and "not supported" not in lowered) or lowered.startswith("metal"):
+                current["metal"] = True
+        elif key.startswith("VRAM"):
+            vram = parse_vram_mb(value)
+            if vram is not None:
+                current["vram"] = vram
+        elif key == "Total Number of Cores":
+            try:
+                current["cores"] = int(value)
+            except ValueError:
+                pass
+        elif key == "Vendor":
+            current["vendor"] = value
+
+    return gpus
+
+
+def parse_ioreg_accelerators(output):
+    """Parse `ioreg -r -d 1 -w 0 -c IOAccelerator` output into utilization dicts.
+
+    Returns one dict per accelerator with "utilization" (percent),
+    "registry_name" (the driver class, such as AGXAcceleratorG13X) and, when
+    reported, "memory_used_mb" and "model".
+    """
+    accelerators = []
+    # Each accelerator is a top-level "+-o" entry
+    for block in output.split("+-o")[1:]:
+        util = _IOREG_UTIL_RE.search(block)
+        if not util:
+            continue
+        entry = {"utilization": float(util.group(1))}
+        io_class = _IOREG_CLASS_RE.search(block)
+        entry["registry_name"] = io_class.group(1) if io_class else block.split(None, 1)[0]
+        memory = _IOREG_MEMORY_RE.search(block)
+        if memory:
+            entry["memory_used_mb"] = int(memory.group(1)) / (1024 * 1024)
+        model = _IOREG_MODEL_RE.search(block)
+        if model:
+            entry["model"] = model.group(1)
+        accelerators.append(entry)
+    return accelerators
+
+
+def _normalized(name):
+    return re.sub(r"[^a-z0-9]", "", (name or "").lower())
+
+
+def _gpu_vendor(gpu):
+    words = re.findall(r"[a-z]+", f"{gpu.get('vendor', '')} {gpu.get('name', '')}".lower())
+    for word, vendor in _GPU_VENDOR_WORDS:
+        if word in words:
+            return vendor
+    return None
+
+
+def _accelerator_vendor(accelerator):
+    registry_name = accelerator.get("registry_name") or ""
+    for prefix, vendor in _ACCELERATOR_VENDORS:
+        if registry_name.startswith(prefix):
+            return vendor
+    return None
+
+
+def match_accelerators(gpus, accelerators):
+    """Pair system_profiler GPUs with ioreg accelerator stats; returns one dict (or None) per GPU.
+
+    The two tools do not list GPUs in the same order, so accelerators are
+    matched by model name first, then by the vendor of their driver when
+    that leaves a single candidate. Position is trusted only when there is
+    one GPU and one accelerator.
+    """
+    matched = [None] * len(gpus)
+    unused = list(accelerators)
+
+    for index, gpu in enumerate(gpus):
+        name = _normalized(gpu.get("name"))
+        for accelerator in unused:
+            model = _normalized(accelerator.get("model"))
+            if name and model and (model == name or model in name or name in model):
+                matched[index] = accelerator
+                unused.remove(accelerator)
+                break
+
+    for index, gpu in enumerate(gpus):
+        vendor = _gpu_vendor(gpu)
+        if matched[index] is not None or vendor is None:
+            continue
+        candidates = [accelerator for accelerator in unused if _accelerator_vendor(accelerator) == vendor]
+        if len(candidates) == 1:
+            matched[index] = candidates[0]
+            unused.remove(candidates[0])
+
+    if len(gpus) == 1 and len(accelerators) == 1 and matched[0] is None:
+        matched[0] = accelerators[0]
+    return matched
+
+
+def run_system_profiler():
+    """Run system_profiler for display hardware and return its output."""
+    result = subprocess.run(
+        ["system_profiler", "SPDisplaysDataType"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout
+
+
+def run_ioreg_accelerators():
+    """Run ioreg for GPU performance statistics and return its output."""
+    result = subprocess.run(
+        ["ioreg", "-r", "-d", "1", "-w", "0", "-c", "IOAccelerator"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout
+
+
+class HardwareInventory:
+    """Probes static hardware facts once and caches them until refresh()."""
+
+    def __init__(self, profiler=None):
+        # Callable returning system_profiler output; replaceable with recorded text
+        self._profiler = profiler or run_system_profiler
+        self._lock = threading.Lock()
+        self._gpus = None
+        self.error = None
+
+    def probe(self):
+        """Probe hardware if it has not been probed yet and return the GPU list."""
+        with self._lock:
+            if self._gpus is None:
+                self._gpus = self._probe_gpus()
+            return self._gpus
+
+    def refresh(self):
+        """Discard the cached facts and probe again."""
+        with self._lock:
+            self._gpus = None
+        return self.probe()
+
+    @property
+    def gpus(self):
+        """The cached GPU list, probing on first access."""
+        return self.probe()
+
+    def _probe_gpus(self):
+        if platform.system() != "Darwin" and self._profiler is run_system_profiler:
+            return []
+        try:
+            gpus = parse_system_profiler_displays(self._profiler())
+            self.error = None
+            return gpus
+        except Exception as e:
+            print(f"Error getting Mac GPU info: {e}")
+            self.error = str(e)
+            return []
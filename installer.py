@@ -0,0 +1,434 @@
+"""Versioned OpenWebUI installations in isolated virtual environments.
+
+Every OpenWebUI version gets its own venv under envs/ in the controller's
+data directory, so installing a new version never disturbs a
+working one and switching between installed versions is just pointing the
+controller at another executable. Packages are fetched into a shared
+wheelhouse (wheelhouse/) first and installed from there with --no-index;
+pip's HTTP cache lives in pip-cache/. Reinstalling a version, or installing
+one whose dependencies were seen before, therefore needs little or no
+network, and an install without any network works when the wheelhouse
+already has everything.
+
+The venv is created while the wheels are being downloaded. pip's output is
+turned into InstallEvents (phase, package, progress) by PipOutputParser
+instead of being passed on as raw lines:
+
+    installer = Installer()
+    installer.install("0.3.10", on_event=print)
+    installer.use("0.3.10")
+    installer.command_for()     # .../envs/0.3.10/bin/open-webui
+
+It can also be used from the command line:
+
+    python installer.py install 0.3.10
+    python installer.py list
+    python installer.py use 0.3.10
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import venv
+from collections import namedtuple
+
+from app_paths import data_dir
+
+PACKAGE = "open-webui"
+LATEST = "latest"
+
+IS_WINDOWS = os.name == "nt"
+
+# Install phases, in the order they normally happen
+VENV = "venv"                   # creating the virtual environment
+RESOLVING = "resolving"         # pip is collecting requirements
+DOWNLOADING = "downloading"     # fetching a distribution (not from the cache)
+BUILDING = "building"           # building a wheel from an sdist
+INSTALLING = "installing"       # installing into the venv
+DONE = "done"
+FAILED = "failed"
+
+InstallEvent = namedtuple("InstallEvent", [
+    "version",      # requested version, or "latest"
+    "phase",
+    "message",      # human-readable summary of the event
+    "package",      # distribution the event is about, if any
+    "done",         # packages handled so far in this phase
+    "total",        # expected packages, or None while unknown
+])
+
+InstalledVersion = namedtuple("InstalledVersion", [
+    "version",
+    "path",             # root of the venv
+    "command",          # the open-webui executable inside it
+    "installed_at",     # epoch seconds
+    "packages",         # distributions installed
+    "seconds",          # how long the install took
+])
+
+_COLLECTING_RE = re.compile(r"^Collecting ([A-Za-z0-9._\-\[\]]+)")
+_PROCESSING_RE = re.compile(r"^Processing \S*?([A-Za-z0-9._]+)-\d[^/\\\s]*\.(?:whl|tar\.gz|zip)")
+_DOWNLOADING_RE = re.compile(r"^\s*Downloading (\S+?)(?:-\d\S*)?(?:\.whl|\.tar\.gz|\.zip)?(?: \(([^)]+)\))?$")
+_CACHED_RE = re.compile(r"^\s*Using cached (\S+?)(?:-\d\S*)?(?:\.whl|\.tar\.gz|\.zip)?(?: \(([^)]+)\))?$")
+_BUILDING_RE = re.compile(r"^\s*Building wheel for (\S+)")
+_INSTALLING_RE = re.compile(r"^Installing collected packages: (.*)$")
+_SUCCESS_RE = re.compile(r"^Successfully installed (.*)$")
+# Newer pips fetch just the metadata of each wheel while resolving
+_METADATA_RE = re.compile(r"\.whl\.metadata(?: \(|$)")
+_INDEX_VERSION_RE = re.compile(rf"^{re.escape(PACKAGE)} \(([^)]+)\)", re.MULTILINE)
+_WHEEL_VERSION_RE = re.compile(rf"^{PACKAGE.replace('-', '_')}-([^-]+)-.*\.whl$")
+
+
+class PipOutputParser:
+    """Turns lines of pip output into InstallEvents.
+
+    `expected` is the number of distributions the install is expected to
+    involve (for example from the previous install); it is used as the total
+    until pip itself says how many packages it installs.
+    """
+
+    def __init__(self, version, expected=None):
+        self.version = version
+        self.expected = expected
+        self.collected = 0
+        self.downloaded = 0
+        self.installing = None
+        self.installed = 0
+        self.errors = []
+
+    def feed(self, line):
+        """Return the InstallEvent for a line of output, or None if it carries nothing new."""
+        line = line.rstrip()
+        match = _COLLECTING_RE.match(line) or _PROCESSING_RE.match(line)
+        if match:
+            self.collected += 1
+            return self._event(RESOLVING, f"Collecting {match.group(1)}", match.group(1), self.collected)
+        match = _DOWNLOADING_RE.match(line)
+        if match and _METADATA_RE.search(line):
+            # Part of collecting the package already reported, not a download
+            return None
+        if match:
+            self.downloaded += 1
+            size = f" ({match.group(2)})" if match.group(2) else ""
+            return self._event(DOWNLOADING, f"Downloading {match.group(1)}{size}", match.group(1), self.collected)
+        match = _CACHED_RE.match(line)
+        if match:
+            return self._event(RESOLVING, f"Using cached {match.group(1)}", match.group(1), self.collected)
+        match = _BUILDING_RE.match(line)
+        if match:
+            return self._event(BUILDING, f"Building wheel for {match.group(1)}", match.group(1), self.collected)
+        match = _INSTALLING_RE.match(line)
+        if match:
+            self.installing = [name.strip() for name in match.group(1).split(",") if name.strip()]
+            return InstallEvent(self.version, INSTALLING, f"Installing {len(self.installing)} packages", None,
+                                0, len(self.installing))
+        match = _SUCCESS_RE.match(line)
+        if match:
+            self.installed = len(match.group(1).split())
+            return InstallEvent(self.version, INSTALLING, f"Installed {self.installed} packages", None,
+                                self.installed, self.installed)
+        if line.startswith("ERROR:"):
+            self.errors.append(line[len("ERROR:"):].strip())
+            return InstallEvent(self.version, RESOLVING, line, None, self.collected, self.expected)
+        return None
+
+    def _event(self, phase, message, package, done):
+        total = self.expected if self.expected and self.expected >= done else None
+        return InstallEvent(self.version, phase, message, package, done, total)
+
+
+class InstallError(Exception):
+    pass
+
+
+def _bin_dir(env_path):
+    return os.path.join(env_path, "Scripts" if IS_WINDOWS else "bin")
+
+
+def _executable(env_path, name):
+    return os.path.join(_bin_dir(env_path), name + (".exe" if IS_WINDOWS else ""))
+
+
+def _version_key(version):
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+class Installer:
+    """Creates, lists and switches between per-version OpenWebUI venvs.
+
+    Installs of different versions can run at the same time, each on its own
+    thread; a second install of the same version, or removing it, waits for
+    the first. "latest" is resolved to a version number before locking.
+    """
+
+    def __init__(self, root=None, python=None):
+        self.root = root or data_dir()
+        self.envs_dir = os.path.join(self.root, "envs")
+        self.wheelhouse = os.path.join(self.root, "wheelhouse")
+        self.pip_cache = os.path.join(self.root, "pip-cache")
+        self.python = python or sys.executable
+        for path in (self.envs_dir, self.wheelhouse, self.pip_cache):
+            os.makedirs(path, exist_ok=True)
+        self._external_pip = None
+        self._version_locks = {}
+        self._lock = threading.Lock()
+
+    def installed(self):
+        """Return the InstalledVersions, newest install first."""
+        versions = []
+        for name in os.listdir(self.envs_dir):
+            record = self._read_record(os.path.join(self.envs_dir, name))
+            if record is not None:
+                versions.append(record)
+        return sorted(versions, key=lambda record: record.installed_at, reverse=True)
+
+    def get(self, version):
+        """The InstalledVersion of `version`, or None."""
+        return next((record for record in self.installed() if record.version == version), None)
+
+    def current(self):
+        """The version selected with use(), if it is still installed."""
+        try:
+            with open(os.path.join(self.envs_dir, "current")) as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return self.get(version)
+
+    def use(self, version):
+        """Select an installed version; nothing is reinstalled."""
+        record = self.get(version)
+        if record is None:
+            raise InstallError(f"OpenWebUI {version} is not installed")
+        path = os.path.join(self.envs_dir, "current")
+        with open(path + ".tmp", "w") as f:
+            f.write(record.version)
+        os.replace(path + ".tmp", path)
+        return record
+
+    def command_for(self, version=None):
+        """Executable of an installed version (the current one by default), or None."""
+        record = self.get(version) if version else self.current()
+        return record.command if record is not None else None
+
+    def remove(self, version, force=False):
+        """Delete an installed version; returns False if it is not installed.
+
+        The current version is only removed with force=True, which also
+        clears the selection. Raises InstallError otherwise.
+        """
+        with self._version_lock(version):
+            record = self.get(version)
+            if record is None:
+                return False
+            current = self.current()
+            if current is not None and current.version == record.version:
+                if not force:
+                    raise InstallError(f"OpenWebUI {version} is the current version; select another one "
+                                       f"first or force the removal")
+                os.remove(os.path.join(self.envs_dir, "current"))
+            shutil.rmtree(record.path)
+            return True
+
+    def resolve_version(self, version=None, offline=False):
+        """The version an install of `version` gets.
+
+        Explicit versions are returned as given. "latest" (or None) is looked
+        up in the package index, or in the wheelhouse when offline or the
+        index cannot be reached; it stays "latest" if neither knows.
+        """
+        if version and version != LATEST:
+            return version
+        if not offline:
+            result = subprocess.run([self.python, "-m", "pip", "index", "versions", PACKAGE],
+                                    capture_output=True, text=True, env=self._pip_env())
+            match = _INDEX_VERSION_RE.search(result.stdout)
+            if result.returncode == 0 and match:
+                return match.group(1)
+        versions = [match.group(1) for match in map(_WHEEL_VERSION_RE.match, os.listdir(self.wheelhouse)) if match]
+        return max(versions, key=_version_key) if versions else LATEST
+
+    def install(self, version=None, on_event=None, offline=False):
+        """Install a version (the latest by default) into its own venv; returns its InstalledVersion.
+
+        Blocks until done; on_event(InstallEvent) is called from this thread
+        (and from the venv thread for the "venv" phase). Raises InstallError.
+        """
+        version = self.resolve_version(version, offline)
+        with self._version_lock(version):
+            return self._install(version, on_event or (lambda event: None), offline)
+
+    def _version_lock(self, version):
+        with self._lock:
+            return self._version_locks.setdefault(version, threading.Lock())
+
+    def _install(self, version, on_event, offline):
+        existing = self.get(version) if version != LATEST else None
+        if existing is not None:
+            on_event(InstallEvent(version, DONE, f"OpenWebUI {version} is already installed", None, 0, 0))
+            return existing
+
+        started = time.monotonic()
+        requirement = PACKAGE if version == LATEST else f"{PACKAGE}=={version}"
+        # Scripts in a venv hard-code its path, so it is created where it stays. A venv only
+        # counts as installed once its install.json exists, so a failed install leaves nothing behind
+        target = os.path.join(self.envs_dir, version if version != LATEST else f"latest-{int(time.time())}")
+        previous = self.installed()
+        expected = previous[0].packages if previous else None
+
+        # The venv does not depend on the download, so create it meanwhile. With a pip that
+        # supports --python the venv needs no pip of its own, which skips the slow ensurepip step
+        external_pip = self._pip_supports_python_option()
+        venv_error = []
+
+        def create_venv():
+            on_event(InstallEvent(version, VENV, "Creating virtual environment", None, 0, 1))
+            try:
+                venv.EnvBuilder(with_pip=not external_pip, clear=True).create(target)
+            except Exception as e:
+                venv_error.append(e)
+                return
+            on_event(InstallEvent(version, VENV, "Virtual environment ready", None, 1, 1))
+
+        venv_thread = threading.Thread(target=create_venv, name=f"venv-{version}", daemon=True)
+        venv_thread.start()
+
+        try:
+            # Fill the shared wheelhouse; reuses wheels already there and pip's HTTP cache
+            if not offline:
+                parser = PipOutputParser(version, expected)
+                returncode = self._pip(self.python, ["wheel", "--wheel-dir", self.wheelhouse,
+                                                     "--find-links", self.wheelhouse, requirement], parser, on_event)
+                if returncode != 0:
+                    # Maybe offline; the wheelhouse may still have everything
+                    on_event(InstallEvent(version, RESOLVING, "Download failed; trying the local wheelhouse only",
+                                          None, 0, None))
+
+            venv_thread.join()
+            if venv_error:
+                raise InstallError(f"Could not create the virtual environment: {venv_error[0]}")
+
+            parser = PipOutputParser(version, expected)
+            install_args = ["install", "--no-index", "--find-links", self.wheelhouse, requirement]
+            if external_pip:
+                returncode = self._pip(self.python, ["--python", _executable(target, "python"), *install_args],
+                                       parser, on_event)
+            else:
+                returncode = self._pip(_executable(target, "python"), install_args, parser, on_event)
+            if returncode != 0:
+                detail = parser.errors[-1] if parser.errors else f"pip exited with {returncode}"
+                raise InstallError(f"Installing {requirement} failed: {detail}")
+
+            installed_version = self._installed_version(target)
+            existing = self.get(installed_version)
+            if existing is not None:
+                # "latest" turned out to be a version that is already installed
+                shutil.rmtree(target, ignore_errors=True)
+                on_event(InstallEvent(version, DONE, f"OpenWebUI {installed_version} is already installed", None,
+                                      0, 0))
+                return existing
+            self._write_record(target, installed_version, parser.installed, time.monotonic() - started)
+        except BaseException as e:
+            venv_thread.join()
+            shutil.rmtree(target, ignore_errors=True)
+            if isinstance(e, Exception):
+                on_event(InstallEvent(version, FAILED, str(e), None, 0, None))
+            raise
+
+        record = self._read_record(target)
+        on_event(InstallEvent(version, DONE, f"Installed OpenWebUI {installed_version} in {record.seconds:.0f} s",
+                              None, record.packages, record.packages))
+        return record
+
+    def _pip_supports_python_option(self):
+        """True if the controller's pip can install into another interpreter (pip 22.3+)."""
+        if self._external_pip is None:
+            result = subprocess.run([self.python, "-m", "pip", "--version"], capture_output=True, text=True)
+            match = re.match(r"pip (\d+)\.(\d+)", result.stdout)
+            self._external_pip = bool(match) and (int(match.group(1)), int(match.group(2))) >= (22, 3)
+        return self._external_pip
+
+    def _pip_env(self):
+        return dict(os.environ, PIP_CACHE_DIR=self.pip_cache, PIP_DISABLE_PIP_VERSION_CHECK="1",
+                    PYTHONUNBUFFERED="1")
+
+    def _pip(self, python, args, parser, on_event):
+        process = subprocess.Popen([python, "-m", "pip", *args, "--progress-bar", "off"], stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, text=True,
+                                   env=self._pip_env())
+        for line in process.stdout:
+            event = parser.feed(line)
+            if event is not None:
+                on_event(event)
+        return process.wait()
+
+    def _installed_version(self, env_path):
+        result = subprocess.run(
+            [_executable(env_path, "python"), "-c",
+             f"import importlib.metadata as m; print(m.version({PACKAGE!r}))"],
+            capture_output=True, text=True)
+        if result.returncode != 0:
+            raise InstallError(f"Could not determine the installed version: {result.stderr.strip()}")
+        return result.stdout.strip()
+
+    def _write_record(self, env_path, version, packages, seconds):
+        with open(os.path.join(env_path, "install.json"), "w") as f:
+            json.dump({"version": version, "installed_at": time.time(), "packages": packages,
+                       "seconds": round(seconds, 1)}, f)
+
+    def _read_record(self, env_path):
+        try:
+            with open(os.path.join(env_path, "install.json")) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return InstalledVersion(data["version"], env_path, _executable(env_path, "open-webui"),
+                                data["installed_at"], data["packages"], data["seconds"])
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage versioned OpenWebUI installations")
+    commands = parser.add_subparsers(dest="action", required=True)
+    install = commands.add_parser("install", help="install a version into its own venv")
+    install.add_argument("version", nargs="?", default=LATEST)
+    install.add_argument("--offline", action="store_true", help="only use the local wheelhouse")
+    commands.add_parser("list", help="list installed versions")
+    use = commands.add_parser("use", help="select the version the controller runs")
+    use.add_argument("version")
+    remove = commands.add_parser("remove", help="delete an installed version")
+    remove.add_argument("version")
+    remove.add_argument("--force", action="store_true", help="also remove the current version")
+    args = parser.parse_args(argv)
+
+    installer = Installer()
+    try:
+        if args.action == "install":
+            def print_event(event):
+                progress = f" [{event.done}/{event.total}]" if event.total else ""
+                print(f"{event.phase:<12}{event.message}{progress}", flush=True)
+            installer.install(args.version, print_event, offline=args.offline)
+        elif args.action == "list":
+            current = installer.current()
+            for record in installer.installed():
+                marker = "*" if current is not None and record.version == current.version else " "
+                print(f"{marker} {record.version:<12} {record.packages:>4} packages  {record.command}")
+        elif args.action == "use":
+            print(installer.use(args.version).command)
+        elif args.action == "remove":
+            if not installer.remove(args.version, force=args.force):
+                print(f"OpenWebUI {args.version} is not installed", file=sys.stderr)
+                return 1
+    except InstallError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Append-only JSON-lines logs of namedtuple records in the data directory."""
+import json
+import os
+import threading
+
+from app_paths import data_dir
+
+
+class JsonlHistory:
+    """One record per line; unreadable lines are skipped on load.
+
+    Subclasses set `filename` (the default file under data_dir()) and
+    `record_type`, and override `parse` when a field needs converting back
+    from its JSON form.
+    """
+
+    filename = None
+    record_type = None
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), self.filename)
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(record._asdict()) + "\n")
+
+    def load(self, limit=None):
+        """Return recorded entries, oldest first (the last `limit` if given)."""
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+        if limit:
+            lines = lines[-limit:]
+        records = []
+        for line in lines:
+            try:
+                records.append(self.parse(json.loads(line)))
+            except (ValueError, TypeError, KeyError):
+                continue
+        return records
+
+    def parse(self, entry):
+        """Build a record from one decoded line."""
+        return self.record_type(**entry)
@@ -0,0 +1,45 @@
+"""Deferred imports for modules that are slow to load but not needed at startup.
+
+    psutil = lazy_module("psutil")
+
+binds a stand-in that imports the real module the first time one of its
+attributes is used, so `psutil.Process(...)` and `except psutil.Error:` work
+unchanged. importlib's own per-module locks make the first use thread-safe.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    """Module proxy that imports on first attribute access."""
+
+    def __init__(self, name):
+        self.__name = name
+        self.__module = None
+
+    def __getattr__(self, attr):
+        module = self.__module
+        if module is None:
+            module = self.__module = importlib.import_module(self.__name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__module is not None else "not loaded"
+        return f"<lazy module {self.__name!r} ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+
+def preload(*names):
+    """Import modules on a background thread so their first real use is fast."""
+    def load():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+    thread = threading.Thread(target=load, name="preload", daemon=True)
+    thread.start()
+    return thread
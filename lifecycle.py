@@ -0,0 +1,376 @@
+"""Start/stop lifecycle of a served process.
+
+Transitions run on a worker thread, so neither starting nor stopping ever
+blocks the caller. The process is launched in its own process group and the
+whole group is signalled on stop, which reaches the workers a shell launches
+and not just the shell itself. A stop that does not finish in time is
+escalated to SIGKILL by a timer rather than a sleep loop.
+
+States:
+
+    stopped -> starting -> healthy -> stopping -> stopped
+                   |          |
+                   +----------+--> crashed (exited without being asked to,
+                                        or never became ready)
+"""
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+
+from lazy_import import lazy_module
+
+# Only needed once a service is stopped; keep it off the startup path
+psutil = lazy_module("psutil")
+
+STARTING = "starting"
+HEALTHY = "healthy"
+STOPPING = "stopping"
+STOPPED = "stopped"
+CRASHED = "crashed"
+
+ACTIVE_STATES = (STARTING, HEALTHY, STOPPING)
+
+IS_WINDOWS = os.name == "nt"
+
+
+def signal_process_group(process, sig):
+    """Send a signal to the process group led by `process`."""
+    if IS_WINDOWS:
+        if sig == signal.SIGTERM:
+            # Only console control events reach a whole process group on Windows
+            process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True)
+        return
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def process_group_alive(process):
+    """True while any member of the process group led by `process` still exists."""
+    if IS_WINDOWS:
+        return process.poll() is None
+    try:
+        os.killpg(process.pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ServiceLifecycle:
+    """Runs one service process through an explicit state machine.
+
+    on_state_change(old, new, info) is called from worker threads, never while
+    the lifecycle lock is held, with a dict holding "returncode", "error" and
+    "elapsed" where relevant; UI callers must marshal it onto their own thread. on_process_started(process) is
+    called right after the process is spawned so output readers can attach.
+
+    Without a readiness_check the service counts as healthy as soon as it is
+    spawned. Otherwise readiness_check(process, started, should_continue) runs
+    on its own thread, where `started` is the time.monotonic() of the spawn;
+    a truthy result (or one whose .ready is true) moves it to healthy and is
+    passed on as info["readiness"]. If the check gives up (or raises) while
+    the process is still running, the process is terminated and the service
+    ends in crashed, with the reason in info["error"], so restart policies
+    treat a start that hangs like any other failure.
+    """
+
+    def __init__(self, name="service", stop_timeout=5.0, on_state_change=None, on_process_started=None,
+                 readiness_check=None):
+        self.name = name
+        self.stop_timeout = stop_timeout
+        self.on_state_change = on_state_change
+        self.on_process_started = on_process_started
+        self.readiness_check = readiness_check
+
+        self.state = STOPPED
+        self.process = None
+        self.returncode = None
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._state_changed = threading.Condition(self._lock)
+        self._commands = queue.SimpleQueue()
+        self._kill_timer = None
+        self._stop_requested_at = None
+        self._stop_descendants = []
+        # The process being terminated because it never became ready
+        self._startup_failed = None
+        # Set while the process tree is suspended by pause(); written under the lock,
+        # since guardrails pause from the sampler thread while the worker stops
+        self.paused = False
+        # State changes recorded under the lock, delivered after releasing it
+        self._pending_events = []
+        self._worker = threading.Thread(target=self._run_commands, name=f"lifecycle-{name}", daemon=True)
+        self._worker.start()
+
+    @property
+    def running(self):
+        """True while a process is starting, serving or being stopped."""
+        return self.state in ACTIVE_STATES
+
+    def start(self, command, shell=True, env=None, cwd=None, **popen_options):
+        """Request a start; returns False if the service is already active."""
+        with self._lock:
+            if self.state in ACTIVE_STATES:
+                return False
+            self._set_state(STARTING)
+        self._emit_pending()
+        self._commands.put(lambda: self._spawn(command, shell, env, cwd, popen_options))
+        return True
+
+    def stop(self, wait=False, timeout=None):
+        """Request a graceful stop, escalating to SIGKILL after stop_timeout.
+
+        With wait=True, block until the process is gone (used at shutdown).
+        """
+        with self._lock:
+            if self.state not in (STARTING, HEALTHY):
+                accepted = False
+            else:
+                self._set_state(STOPPING)
+                accepted = True
+        self._emit_pending()
+        if accepted:
+            self._commands.put(self._terminate)
+        if wait:
+            self.wait_for(lambda state: state not in ACTIVE_STATES,
+                          self.stop_timeout + 2.0 if timeout is None else timeout)
+        return accepted
+
+    def mark_healthy(self, **info):
+        """Move from starting to healthy once the service is known to be serving."""
+        with self._lock:
+            healthy = self.state == STARTING
+            if healthy:
+                self._set_state(HEALTHY, **info)
+        self._emit_pending()
+        return healthy
+
+    def pause(self):
+        """Suspend the whole process tree; returns False if there is nothing to pause."""
+        with self._lock:
+            process = self.process
+            if process is None or process.poll() is not None or self.paused:
+                return False
+            if IS_WINDOWS:
+                for proc in self._tree(process):
+                    proc.suspend()
+            else:
+                signal_process_group(process, signal.SIGSTOP)
+            self.paused = True
+        return True
+
+    def resume(self):
+        """Continue a tree suspended by pause()."""
+        with self._lock:
+            process = self.process
+            if not self.paused or process is None:
+                return False
+            self.paused = False
+            if IS_WINDOWS:
+                for proc in self._tree(process):
+                    proc.resume()
+            else:
+                signal_process_group(process, signal.SIGCONT)
+        return True
+
+    def set_niceness(self, niceness):
+        """Set the scheduling priority of every process in the tree; returns how many were changed.
+
+        On Windows any positive niceness means below-normal priority. Raising
+        the priority again (a lower niceness) usually needs administrator rights.
+        """
+        process = self.process
+        if process is None or process.poll() is not None:
+            return 0
+        if IS_WINDOWS:
+            niceness = psutil.BELOW_NORMAL_PRIORITY_CLASS if niceness > 0 else psutil.NORMAL_PRIORITY_CLASS
+        changed = 0
+        for proc in self._tree(process):
+            try:
+                proc.nice(niceness)
+                changed += 1
+            except psutil.NoSuchProcess:
+                pass
+        return changed
+
+    @staticmethod
+    def _tree(process):
+        try:
+            root = psutil.Process(process.pid)
+            return [root] + root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+
+    def wait_for(self, predicate, timeout=None):
+        """Block until predicate(state) is true; returns the final check."""
+        with self._state_changed:
+            return self._state_changed.wait_for(lambda: predicate(self.state), timeout)
+
+    def _run_commands(self):
+        while True:
+            command = self._commands.get()
+            try:
+                command()
+            except Exception as e:
+                with self._lock:
+                    self.error = str(e)
+                    if self.state in ACTIVE_STATES:
+                        self._set_state(CRASHED)
+                self._emit_pending()
+
+    def _spawn(self, command, shell, env, cwd, popen_options):
+        with self._lock:
+            if self.state == STOPPING:
+                # Stopped before the worker got here; nothing to terminate
+                self._set_state(STOPPED)
+            starting = self.state == STARTING
+        self._emit_pending()
+        if not starting:
+            return
+
+        options = dict(popen_options)
+        if IS_WINDOWS:
+            options["creationflags"] = options.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            # New session: the process leads its own group, so killpg reaches its children
+            options["start_new_session"] = True
+
+        self.returncode = None
+        self.error = None
+        started = time.monotonic()
+        try:
+            process = subprocess.Popen(command, shell=shell, env=env, cwd=cwd, **options)
+        except Exception as e:
+            with self._lock:
+                self.error = str(e)
+                self._set_state(CRASHED)
+            self._emit_pending()
+            return
+
+        with self._lock:
+            self.process = process
+            self.paused = False
+        if self.on_process_started:
+            self.on_process_started(process)
+        threading.Thread(target=self._watch, args=(process,), name=f"lifecycle-watch-{self.name}",
+                         daemon=True).start()
+        if self.readiness_check is None:
+            self.mark_healthy()
+        else:
+            threading.Thread(target=self._check_ready, args=(process, started), name=f"lifecycle-ready-{self.name}",
+                             daemon=True).start()
+
+    def _check_ready(self, process, started):
+        def should_continue():
+            return self.process is process and self.state == STARTING and process.poll() is None
+
+        try:
+            result = self.readiness_check(process, started, should_continue)
+            reason = f"Not ready: {getattr(result, 'error', None) or 'readiness check failed'}"
+        except Exception as e:
+            result = None
+            reason = f"Readiness check failed: {e}"
+        if getattr(result, "ready", result) and self.process is process:
+            self.mark_healthy(readiness=result)
+        elif should_continue():
+            # Gave up while the process is still running: a failed start, not a pending one
+            self._fail_start(process, reason)
+
+    def _fail_start(self, process, reason):
+        with self._lock:
+            if self.process is not process or self.state != STARTING:
+                return
+            self.error = reason
+            self._startup_failed = process
+        self._commands.put(self._terminate)
+
+    def _terminate(self):
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        self._stop_requested_at = time.monotonic()
+        try:
+            # Remember descendants now; ones that start their own session escape killpg
+            self._stop_descendants = psutil.Process(process.pid).children(recursive=True)
+        except psutil.Error:
+            self._stop_descendants = []
+        signal_process_group(process, signal.SIGTERM)
+        # A suspended process only sees the SIGTERM once it runs again
+        self.resume()
+
+        self._kill_timer = threading.Timer(self.stop_timeout, self._kill, args=(process,))
+        self._kill_timer.daemon = True
+        self._kill_timer.start()
+
+    def _kill(self, process):
+        if process.poll() is None:
+            signal_process_group(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+        for child in self._stop_descendants:
+            try:
+                child.kill()
+            except psutil.Error:
+                pass
+
+    def _watch(self, process):
+        returncode = process.wait()
+
+        if self._stop_requested_at is not None:
+            # The group leader is gone; give the rest of the group what is left
+            # of the grace period, then kill whatever still holds on
+            remaining = self.stop_timeout - (time.monotonic() - self._stop_requested_at)
+            _, alive = psutil.wait_procs(self._stop_descendants, timeout=max(0.0, remaining))
+            for child in alive:
+                try:
+                    child.kill()
+                except psutil.Error:
+                    pass
+        elif returncode != 0:
+            # Do not leave orphaned workers holding the port after a crash
+            signal_process_group(process, signal.SIGTERM)
+        if self._kill_timer:
+            self._kill_timer.cancel()
+            self._kill_timer = None
+        self._stop_descendants = []
+
+        with self._lock:
+            if self.process is not process:
+                return
+            self.returncode = returncode
+            if self.state == STOPPING:
+                elapsed = time.monotonic() - self._stop_requested_at if self._stop_requested_at else None
+                self._set_state(STOPPED, elapsed=elapsed)
+            elif returncode == 0 and self._startup_failed is not process:
+                self._set_state(STOPPED)
+            else:
+                self._set_state(CRASHED)
+            self._stop_requested_at = None
+            self._startup_failed = None
+        self._emit_pending()
+
+    def _set_state(self, new, **info):
+        # Caller holds self._lock
+        old = self.state
+        if old == new:
+            return
+        self.state = new
+        self._state_changed.notify_all()
+        info.setdefault("returncode", self.returncode)
+        info.setdefault("error", self.error)
+        self._pending_events.append((old, new, info))
+
+    def _emit_pending(self):
+        """Deliver recorded state changes without holding the lock."""
+        with self._lock:
+            events, self._pending_events = self._pending_events, []
+        if self.on_state_change:
+            for old, new, info in events:
+                self.on_state_change(old, new, info)
@@ -0,0 +1,33 @@
+"""In-memory ring buffer of log lines, independent of any UI toolkit."""
+from collections import deque
+
+
+class LogBuffer:
+    """Ring buffer holding the most recent log lines."""
+
+    def __init__(self, max_lines=100000):
+        self._lines = deque(maxlen=max_lines)
+        self.total_lines = 0
+
+    @property
+    def max_lines(self):
+        return self._lines.maxlen
+
+    def extend(self, lines):
+        """Append lines, discarding the oldest ones once the buffer is full."""
+        self._lines.extend(lines)
+        self.total_lines += len(lines)
+
+    def tail(self, count):
+        """Return the last `count` lines, oldest first."""
+        if count <= 0:
+            return []
+        if count >= len(self._lines):
+            return list(self._lines)
+        return list(self._lines)[-count:]
+
+    def clear(self):
+        self._lines.clear()
+
+    def __len__(self):
+        return len(self._lines)
@@ -0,0 +1,484 @@
+"""On-disk capture and search of service output across runs.
+
+Each start of the service gets a run directory holding size- and
+time-rotated segment files plus a compact binary index. The index records
+the offset of every WARNING-or-worse line and a periodic time checkpoint, so
+level and time-range searches seek straight to the relevant bytes instead of
+reading whole files. Everything else is found by scanning memory-mapped
+segments. A lost index can be rebuilt from the segments, which hold the
+same timestamps and levels.
+
+Layout of a run directory:
+
+    run.json      metadata (command, start/end time, line count)
+    000000.log    segment files, one timestamped line per output line
+    index.bin     fixed-size records: timestamp, level, segment, byte offset
+"""
+import json
+import mmap
+import os
+import queue
+import re
+import shutil
+import struct
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+from datetime import datetime
+
+from app_paths import data_dir
+
+LEVELS = {
+    "DEBUG": 10,
+    "INFO": 20,
+    "WARN": 30,
+    "WARNING": 30,
+    "ERROR": 40,
+    "TRACEBACK": 40,
+    "CRITICAL": 50,
+    "FATAL": 50,
+}
+LEVEL_NAMES = {0: "", 10: "DEBUG", 20: "INFO", 30: "WARNING", 40: "ERROR", 50: "CRITICAL"}
+WARNING = LEVELS["WARNING"]
+
+# Only the start of a line is searched; a level word deep inside a message
+# (e.g. a logged URL containing "error") should not change its level
+_LEVEL_RE = re.compile(r"\b(DEBUG|INFO|WARN(?:ING)?|ERROR|CRITICAL|FATAL|Traceback)\b")
+_LEVEL_BYTES_RE = re.compile(_LEVEL_RE.pattern.encode())
+_LEVEL_SEARCH_CHARS = 120
+
+# Every line on disk starts with a fixed-width local timestamp
+_TIMESTAMP_WIDTH = len("2000-01-01T00:00:00.000")
+
+_INDEX_RECORD = struct.Struct("<dBHQ")  # timestamp, level, segment, offset
+
+# Bytes of a segment copied out at a time when every line has to be looked at
+_SCAN_CHUNK = 1024 * 1024
+
+META_FILE = "run.json"
+INDEX_FILE = "index.bin"
+
+LogMatch = namedtuple("LogMatch", ["run_id", "timestamp", "level", "text"])
+
+
+def detect_level(line):
+    """Return the numeric level of a log line, or 0 if it has none."""
+    match = _LEVEL_RE.search(line, 0, _LEVEL_SEARCH_CHARS)
+    if not match:
+        return 0
+    return LEVELS[match.group(1).upper()]
+
+
+def parse_level(level):
+    """Accept a level name or number and return the number."""
+    if level is None or isinstance(level, int):
+        return level or 0
+    return LEVELS[level.upper()]
+
+
+def _segment_name(segment):
+    return f"{segment:06d}.log"
+
+
+class RunLogWriter:
+    """Writes one run's output to rotated segment files on a background thread.
+
+    write() and write_lines() only enqueue, so they are safe to call from the
+    output reader. Lines are written and flushed in batches.
+    """
+
+    def __init__(self, run_dir, run_id, command="", max_bytes=64 * 1024 * 1024,
+                 rotate_seconds=3600, checkpoint_seconds=1.0, flush_seconds=0.5):
+        self.run_dir = run_dir
+        self.run_id = run_id
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.checkpoint_seconds = checkpoint_seconds
+        self.flush_seconds = flush_seconds
+
+        self._queue = queue.SimpleQueue()
+        self._segment = -1
+        self._segment_file = None
+        self._segment_size = 0
+        self._segment_started = 0.0
+        self._last_checkpoint = 0.0
+        self._pending_index = []
+        self._index_file = open(os.path.join(run_dir, INDEX_FILE), "ab")
+        # Cache the formatted second so only milliseconds change per line
+        self._prefix_second = None
+        self._prefix = ""
+
+        self.meta = {
+            "run_id": run_id,
+            "command": command,
+            "started": time.time(),
+            "ended": None,
+            "lines": 0,
+            "bytes": 0,
+        }
+        self._write_meta()
+
+        self._thread = threading.Thread(target=self._run, name=f"log-writer-{run_id}", daemon=True)
+        self._thread.start()
+
+    def write(self, line, timestamp=None):
+        """Queue one line of output (trailing newline optional)."""
+        self._queue.put((timestamp or time.time(), [line.rstrip("\n")]))
+
+    def write_lines(self, lines, timestamp=None):
+        """Queue a batch of lines without trailing newlines, all stamped with the same time."""
+        if lines:
+            self._queue.put((timestamp or time.time(), lines))
+
+    def close(self, timeout=5.0):
+        """Flush everything queued so far and finish the run."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        closing = False
+        while not closing:
+            try:
+                item = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+            batch = [item]
+            # Drain whatever else has arrived so it is written in one go
+            queued = 0 if item is None else len(item[1])
+            try:
+                while queued < 10000 and batch[-1] is not None:
+                    batch.append(self._queue.get_nowait())
+                    queued += 0 if batch[-1] is None else len(batch[-1][1])
+            except queue.Empty:
+                pass
+
+            for item in batch:
+                if item is None:
+                    closing = True
+                    break
+                timestamp, lines = item
+                for line in lines:
+                    self._write_line(timestamp, line)
+            self._flush()
+
+        if self._segment_file:
+            self._segment_file.close()
+        self._index_file.close()
+        self.meta["ended"] = time.time()
+        self._write_meta()
+
+    def _write_line(self, timestamp, text):
+        if (self._segment_file is None
+                or self._segment_size >= self.max_bytes
+                or timestamp - self._segment_started >= self.rotate_seconds):
+            self._open_segment(timestamp)
+
+        second = int(timestamp)
+        if second != self._prefix_second:
+            self._prefix_second = second
+            self._prefix = datetime.fromtimestamp(second).strftime("%Y-%m-%dT%H:%M:%S")
+        millis = int((timestamp - second) * 1000)
+        data = f"{self._prefix}.{millis:03d} {text}\n".encode("utf-8", "replace")
+
+        # Index every warning or worse, plus a periodic time checkpoint
+        level = detect_level(text)
+        if level >= WARNING or timestamp - self._last_checkpoint >= self.checkpoint_seconds:
+            self._pending_index.append(_INDEX_RECORD.pack(timestamp, level, self._segment, self._segment_size))
+            self._last_checkpoint = timestamp
+
+        self._segment_file.write(data)
+        self._segment_size += len(data)
+        self.meta["lines"] += 1
+        self.meta["bytes"] += len(data)
+
+    def _open_segment(self, timestamp):
+        if self._segment_file:
+            self._segment_file.close()
+        self._segment += 1
+        path = os.path.join(self.run_dir, _segment_name(self._segment))
+        self._segment_file = open(path, "wb", buffering=1024 * 1024)
+        self._segment_size = 0
+        self._segment_started = timestamp
+        # Always checkpoint the start of a segment
+        self._last_checkpoint = 0.0
+
+    def _flush(self):
+        # Data first, so the index never points past what is on disk
+        if self._segment_file:
+            self._segment_file.flush()
+        if self._pending_index:
+            self._index_file.write(b"".join(self._pending_index))
+            self._index_file.flush()
+            self._pending_index = []
+
+    def _write_meta(self):
+        path = os.path.join(self.run_dir, META_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.meta, f)
+        os.replace(path + ".tmp", path)
+
+
+class LogStore:
+    """Directory of captured runs with indexed search."""
+
+    def __init__(self, root=None, max_runs=50):
+        self.root = root or data_dir("logs")
+        os.makedirs(self.root, exist_ok=True)
+        self.max_runs = max_runs
+
+    def start_run(self, command="", **writer_options):
+        """Create a run directory and return its RunLogWriter."""
+        self._prune()
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        run_dir = os.path.join(self.root, run_id)
+        os.makedirs(run_dir)
+        return RunLogWriter(run_dir, run_id, command=command, **writer_options)
+
+    def run_ids(self):
+        """Return run ids, newest first."""
+        return sorted(
+            (name for name in os.listdir(self.root) if os.path.isfile(os.path.join(self.root, name, META_FILE))),
+            reverse=True,
+        )
+
+    def runs(self):
+        """Return the metadata of every run, newest first."""
+        result = []
+        for run_id in self.run_ids():
+            try:
+                with open(os.path.join(self.root, run_id, META_FILE)) as f:
+                    result.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return result
+
+    def search(self, level=None, runs=None, since=None, until=None, pattern=None, limit=1000):
+        """Return matching lines in chronological order.
+
+        level:   minimum level name or number; WARNING and above are served
+                 straight from the index
+        runs:    number of most recent runs, a list of run ids, or None for all
+        since, until: epoch timestamps bounding the search
+        pattern: regular expression (str) matched against the line text
+        limit:   keep at most this many of the newest matches
+        """
+        if isinstance(runs, int):
+            run_ids = self.run_ids()[:runs]
+        elif runs is None:
+            run_ids = self.run_ids()
+        else:
+            run_ids = list(runs)
+
+        min_level = parse_level(level)
+        regex = re.compile(pattern.encode("utf-8")) if pattern else None
+        matches = deque(maxlen=limit)
+        for run_id in sorted(run_ids):
+            run_dir = os.path.join(self.root, run_id)
+            if not os.path.isdir(run_dir):
+                continue
+            matches.extend(_search_run(run_id, run_dir, min_level, since, until, regex))
+        # Only decode the lines that are actually returned
+        return [_make_match(run_id, line, level) for run_id, line, level in matches]
+
+    def rebuild_index(self, run_id):
+        """Rewrite the index of a finished run from its segments; returns the number of records."""
+        return rebuild_index(os.path.join(self.root, run_id))
+
+    def _prune(self):
+        for run_id in self.run_ids()[self.max_runs - 1:]:
+            shutil.rmtree(os.path.join(self.root, run_id), ignore_errors=True)
+
+
+def rebuild_index(run_dir, checkpoint_seconds=1.0):
+    """Rewrite a run's index from its segment files, as RunLogWriter would have written it.
+
+    Must not be used on a run that is still being written.
+    """
+    records = []
+    segment = 0
+    while os.path.exists(os.path.join(run_dir, _segment_name(segment))):
+        last_checkpoint = 0.0
+        offset = 0
+        with open(os.path.join(run_dir, _segment_name(segment)), "rb") as f:
+            for line in f:
+                timestamp = _line_timestamp(line)
+                if timestamp is not None:
+                    level = detect_level(line[_TIMESTAMP_WIDTH + 1:].decode("utf-8", "replace"))
+                    if level >= WARNING or timestamp - last_checkpoint >= checkpoint_seconds:
+                        records.append(_INDEX_RECORD.pack(timestamp, level, segment, offset))
+                        last_checkpoint = timestamp
+                offset += len(line)
+        segment += 1
+    path = os.path.join(run_dir, INDEX_FILE)
+    with open(path + ".tmp", "wb") as f:
+        f.write(b"".join(records))
+    os.replace(path + ".tmp", path)
+    return len(records)
+
+
+def _read_index(run_dir):
+    try:
+        with open(os.path.join(run_dir, INDEX_FILE), "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    usable = len(data) - len(data) % _INDEX_RECORD.size
+    return list(_INDEX_RECORD.iter_unpack(data[:usable]))
+
+
+def _line_timestamp(line):
+    try:
+        return datetime.fromisoformat(line[:_TIMESTAMP_WIDTH].decode("ascii")).timestamp()
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def _make_match(run_id, line, level=None):
+    text = line[_TIMESTAMP_WIDTH + 1:].decode("utf-8", "replace")
+    return LogMatch(
+        run_id=run_id,
+        timestamp=_line_timestamp(line),
+        level=LEVEL_NAMES.get(detect_level(text) if level is None else level, ""),
+        text=text,
+    )
+
+
+class _Segments:
+    """Lazily memory-maps the segment files of a run."""
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self._maps = {}
+
+    def get(self, segment):
+        if segment not in self._maps:
+            path = os.path.join(self.run_dir, _segment_name(segment))
+            try:
+                with open(path, "rb") as f:
+                    self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Missing, or empty (mmap refuses zero-length files)
+                self._maps[segment] = None
+        return self._maps[segment]
+
+    def close(self):
+        for mapped in self._maps.values():
+            if mapped is not None:
+                mapped.close()
+
+
+def _search_run(run_id, run_dir, min_level, since, until, regex):
+    if not os.path.exists(os.path.join(run_dir, INDEX_FILE)):
+        # Writers create the index before any segment, so a run without one has lost it
+        try:
+            rebuild_index(run_dir)
+        except OSError:
+            pass
+    index = _read_index(run_dir)
+    segments = _Segments(run_dir)
+    try:
+        if min_level >= WARNING:
+            yield from _search_indexed(run_id, index, segments, min_level, since, until, regex)
+        else:
+            yield from _search_scan(run_id, run_dir, index, segments, min_level, since, until, regex)
+    finally:
+        segments.close()
+
+
+def _search_indexed(run_id, index, segments, min_level, since, until, regex):
+    """Read only the lines the index lists at or above min_level."""
+    for timestamp, level, segment, offset in index:
+        if level < min_level:
+            continue
+        if (since is not None and timestamp < since) or (until is not None and timestamp > until):
+            continue
+        mapped = segments.get(segment)
+        if mapped is None or offset >= len(mapped):
+            continue
+        end = mapped.find(b"\n", offset)
+        line = mapped[offset:end if end != -1 else len(mapped)]
+        if regex is not None and not regex.search(line, _TIMESTAMP_WIDTH + 1):
+            continue
+        yield run_id, line, level
+
+
+def _search_scan(run_id, run_dir, index, segments, min_level, since, until, regex):
+    """Scan memory-mapped segments, narrowed to the time range by checkpoints."""
+    by_segment = {}
+    for timestamp, _level, segment, offset in index:
+        by_segment.setdefault(segment, ([], []))
+        by_segment[segment][0].append(timestamp)
+        by_segment[segment][1].append(offset)
+
+    segment = 0
+    while os.path.exists(os.path.join(run_dir, _segment_name(segment))):
+        mapped = segments.get(segment)
+        if mapped is not None:
+            start, end = 0, len(mapped)
+            times, offsets = by_segment.get(segment, ([], []))
+            if since is not None and times:
+                # Last record before `since`; several records can share a timestamp,
+                # and lines from `since` on may precede the last of them
+                position = bisect_left(times, since) - 1
+                if position >= 0:
+                    start = offsets[position]
+            if until is not None and times:
+                # First checkpoint after `until`
+                position = bisect_right(times, until)
+                if position < len(times):
+                    end = offsets[position]
+                if times[0] > until:
+                    end = start
+            yield from _scan_region(run_id, mapped, start, end, min_level, since, until, regex)
+        segment += 1
+
+
+def _scan_region(run_id, mapped, start, end, min_level, since, until, regex):
+    if regex is not None:
+        # Let the regex engine skip non-matching bytes of the mapping, then expand to whole lines
+        last_line_start = -1
+        for match in regex.finditer(mapped, start, end):
+            newline = mapped.rfind(b"\n", start, match.start())
+            line_start = newline + 1 if newline != -1 else start
+            if line_start == last_line_start:
+                continue
+            last_line_start = line_start
+            line_end = mapped.find(b"\n", match.end(), end)
+            line = mapped[line_start:line_end if line_end != -1 else end]
+            if match.start() - line_start <= _TIMESTAMP_WIDTH:
+                # Matched inside the timestamp prefix; check the text itself
+                if not regex.search(line, _TIMESTAMP_WIDTH + 1):
+                    continue
+            if _keep_line(line, min_level, since, until):
+                yield run_id, line, None
+        return
+
+    # Level filters keep most lines, and splitting is far faster than a find()
+    # per line; split in bounded chunks rather than copying the whole region
+    while start < end:
+        chunk_end = end
+        if end - start > _SCAN_CHUNK:
+            newline = mapped.rfind(b"\n", start, start + _SCAN_CHUNK)
+            if newline == -1:
+                newline = mapped.find(b"\n", start + _SCAN_CHUNK, end)
+            chunk_end = newline + 1 if newline != -1 else end
+        for line in mapped[start:chunk_end].split(b"\n"):
+            if line and _keep_line(line, min_level, since, until):
+                yield run_id, line, None
+        start = chunk_end
+
+
+def _keep_line(line, min_level, since, until):
+    """Apply level and time filters to a raw line without decoding it."""
+    if min_level:
+        match = _LEVEL_BYTES_RE.search(line, _TIMESTAMP_WIDTH + 1, _TIMESTAMP_WIDTH + 1 + _LEVEL_SEARCH_CHARS)
+        if not match or LEVELS[match.group(1).decode().upper()] < min_level:
+            return False
+    if since is not None or until is not None:
+        timestamp = _line_timestamp(line)
+        if timestamp is None:
+            return False
+        if (since is not None and timestamp < since) or (until is not None and timestamp > until):
+            return False
+    return True
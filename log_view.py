@@ -0,0 +1,58 @@
+"""Bounded log display for the OpenWebUI Controller.
+
+Lines are kept in a fixed-size ring buffer and written to the Tk text widget
+in one insert per drain. The widget itself never holds more than a capped
+number of lines; old lines are trimmed in bulk rather than one at a time.
+"""
+import tkinter as tk
+
+from log_buffer import LogBuffer
+
+
+class LogView:
+    """Writes batches of lines to a text widget with a capped line count.
+
+    Auto-scrolling only happens while the view is already at the bottom, so
+    reading older output is not interrupted by new lines arriving.
+    """
+
+    def __init__(self, widget, max_lines=5000, buffer=None):
+        self.widget = widget
+        self.max_lines = max_lines
+        # Let the widget grow this far past max_lines before trimming, so
+        # deletes happen in large chunks instead of on every batch
+        self.trim_slack = max(1, max_lines // 10)
+        self.buffer = buffer if buffer is not None else LogBuffer()
+        self._widget_lines = 0
+
+    def append(self, lines):
+        """Append a batch of lines (without trailing newlines) in a single insert."""
+        if not lines:
+            return
+        self.buffer.extend(lines)
+
+        # A burst larger than the view only needs its tail inserted
+        if len(lines) > self.max_lines:
+            lines = lines[-self.max_lines:]
+
+        at_bottom = self.widget.yview()[1] >= 1.0
+        self.widget.config(state=tk.NORMAL)
+        self.widget.insert(tk.END, "\n".join(lines) + "\n")
+        self._widget_lines += len(lines)
+
+        excess = self._widget_lines - self.max_lines
+        if excess >= self.trim_slack:
+            self.widget.delete("1.0", f"{excess + 1}.0")
+            self._widget_lines -= excess
+
+        self.widget.config(state=tk.DISABLED)
+        if at_bottom:
+            self.widget.see(tk.END)
+
+    def clear(self):
+        """Remove all lines from the widget and the buffer."""
+        self.widget.config(state=tk.NORMAL)
+        self.widget.delete("1.0", tk.END)
+        self.widget.config(state=tk.DISABLED)
+        self._widget_lines = 0
+        self.buffer.clear()
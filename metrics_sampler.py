@@ -0,0 +1,310 @@
+"""Background sampling of system metrics for the OpenWebUI Controller.
+
+Collection (psutil, GPUtil/nvidia-smi, system_profiler) happens on a worker
+thread. The UI only ever reads the latest immutable snapshot, so a slow probe
+can never stall the Tk event loop.
+
+What is collected is up to the registered collectors (see collectors.py).
+The sampler schedules them by their declared interval and measured cost and
+records the wall and CPU time each one takes, which is the overhead that
+monitoring itself adds.
+"""
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from collectors import MAX_DUTY, GPUCollector, ProcessTreeCollector, default_collectors
+
+# Everything the UI needs to render one tick of the resources frame.
+MetricsSnapshot = namedtuple("MetricsSnapshot", [
+    "timestamp",
+    "cpu_percent",
+    "memory_percent",
+    "memory_used",
+    "gpus",             # tuple of gpu_backends.GPUSample, one per device
+    "gpu_error",        # str describing why no GPU data is available, or None
+    "processes",        # read-only mapping of service name -> process_tree.ProcessTreeSample
+    "collect_seconds",  # wall time spent collecting this snapshot
+    "readings",         # read-only mapping of collector name -> its latest reading
+])
+
+
+class _CollectorState:
+    """Scheduling and cost bookkeeping of one collector (worker thread only)."""
+
+    def __init__(self, collector):
+        self.collector = collector
+        self.opened = False
+        self.reading = None
+        self.last_run = None
+        self.runs = 0
+        self.wall_total = 0.0
+        self.wall_max = 0.0
+        self.cpu_total = 0.0
+        self.last_wall = 0.0
+        self.last_cpu = 0.0
+        self.open_seconds = None
+        self.error = None
+
+    def effective_interval(self):
+        """Declared interval, stretched if the collector costs more than MAX_DUTY of it."""
+        average = self.wall_total / self.runs if self.runs else 0.0
+        return max(self.collector.preferred_interval(), average / MAX_DUTY)
+
+    def stats(self, sample_interval):
+        runs = self.runs
+        return {
+            "name": self.collector.name,
+            "label": self.collector.label or self.collector.name,
+            "cost": self.collector.cost,
+            # Collectors cannot run more often than the sampler itself
+            "interval": max(self.effective_interval(), sample_interval),
+            "runs": runs,
+            "last_seconds": self.last_wall,
+            "avg_seconds": self.wall_total / runs if runs else 0.0,
+            "max_seconds": self.wall_max,
+            "wall_seconds": self.wall_total,
+            "cpu_seconds": self.cpu_total,
+            "avg_cpu_seconds": self.cpu_total / runs if runs else 0.0,
+            "open_seconds": self.open_seconds,
+            "error": self.error,
+        }
+
+
+class MetricsSampler:
+    """Collects system metrics on a worker thread and publishes snapshots."""
+
+    def __init__(self, interval=1.0, gpu_backend="auto", process_full_memory=False, collectors=None):
+        self.interval = interval
+        self._states = [_CollectorState(collector) for collector in
+                        (collectors if collectors is not None else default_collectors(gpu_backend, process_full_memory))]
+        self._latest = None
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Collection cost bookkeeping (only touched by the worker thread)
+        self._samples = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+        self._cpu_seconds = 0.0
+        self._first_sample_at = None
+
+    def register(self, collector):
+        """Add a collector; its readings appear in snapshots from the next sample on."""
+        if any(state.collector.name == collector.name for state in self._states):
+            raise ValueError(f"A collector named '{collector.name}' is already registered")
+        # Swap the whole list so the worker never sees it half-updated
+        self._states = self._states + [_CollectorState(collector)]
+
+    def collector(self, name):
+        """Return the registered collector called `name`, or None."""
+        return next((state.collector for state in self._states if state.collector.name == name), None)
+
+    def collectors(self):
+        return [state.collector for state in self._states]
+
+    def start(self):
+        """Start the worker thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the worker thread and wait briefly for it to exit."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        for state in self._states:
+            if state.opened:
+                state.opened = False
+                try:
+                    state.collector.close()
+                except Exception as e:
+                    print(f"Error closing {state.collector.name} collector: {e}")
+
+    def set_interval(self, interval):
+        """Change the sampling interval; takes effect after the current sample."""
+        self.interval = max(0.05, float(interval))
+
+    def _process_collector(self):
+        return next((c for c in self.collectors() if isinstance(c, ProcessTreeCollector)), None)
+
+    def _gpu_collector(self):
+        return next((c for c in self.collectors() if isinstance(c, GPUCollector)), None)
+
+    def track_process(self, name, pid):
+        """Track a process and its descendants under `name`."""
+        collector = self._process_collector()
+        if collector is not None:
+            collector.track(name, pid)
+
+    def untrack_process(self, name):
+        """Stop tracking the process registered under `name`."""
+        collector = self._process_collector()
+        if collector is not None:
+            collector.untrack(name)
+
+    def set_process_breakdown(self, enabled):
+        """Include a per-process breakdown of the tracked tree in snapshots."""
+        collector = self._process_collector()
+        if collector is not None:
+            collector.breakdown = bool(enabled)
+
+    def set_process_full_memory(self, enabled):
+        """Also read USS/PSS of tracked trees; much slower than RSS alone, especially on Linux."""
+        collector = self._process_collector()
+        if collector is not None:
+            collector.full_memory = bool(enabled)
+
+    def add_listener(self, callback):
+        """Call callback(snapshot) on the worker thread after every published sample."""
+        self._listeners = self._listeners + [callback]
+
+    def refresh_hardware(self):
+        """Ask the worker to re-probe static GPU facts before its next sample."""
+        collector = self._gpu_collector()
+        if collector is not None:
+            collector.refresh()
+
+    def latest(self):
+        """Return the most recent snapshot, or None before the first sample."""
+        # Attribute reads are atomic, and snapshots are never mutated
+        return self._latest
+
+    def stats(self):
+        """Return the measured collection cost of the worker thread and of each collector.
+
+        "cpu_share" is the CPU time spent collecting as a fraction of one core
+        since the first sample. CPU times are those of the sampler thread, so
+        the work of a probe that runs a separate process (nvidia-smi) only
+        shows in its wall time.
+        """
+        samples = self._samples
+        running = time.monotonic() - self._first_sample_at if self._first_sample_at is not None else 0.0
+        return {
+            "samples": samples,
+            "last_seconds": self._latest.collect_seconds if self._latest else 0.0,
+            "avg_seconds": self._total_seconds / samples if samples else 0.0,
+            "max_seconds": self._max_seconds,
+            "cpu_seconds": self._cpu_seconds,
+            "cpu_share": self._cpu_seconds / running if running > 0 else 0.0,
+            "collectors": [state.stats(self.interval) for state in self._states],
+        }
+
+    def gpu_backend_name(self):
+        """Return the name of the active GPU backend, or None."""
+        collector = self._gpu_collector()
+        return collector.backend.name if collector is not None and collector.backend else None
+
+    def sample_once(self, defer_slow_open=False):
+        """Collect and publish a single snapshot on the calling thread.
+
+        Collectors whose interval has not elapsed keep their previous reading.
+        With defer_slow_open, collectors that are slow to open (the GPU
+        backend) are left for the next sample, so the first snapshot is not
+        held up by NVML.
+        """
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        now = time.monotonic()
+        if self._first_sample_at is None:
+            self._first_sample_at = now
+
+        readings = {}
+        for state in self._states:
+            collector = state.collector
+            if not state.opened and defer_slow_open and collector.slow_open:
+                readings[collector.name] = None
+                continue
+            # Half a tick of slack, so a 2 s collector on a 1 s sampler runs every other tick
+            if state.last_run is not None and \
+                    now - state.last_run < state.effective_interval() - self.interval / 2:
+                readings[collector.name] = state.reading
+                continue
+            self._run_collector(state, now)
+            readings[collector.name] = state.reading
+
+        cpu = readings.get("cpu")
+        memory = readings.get("memory")
+        gpu_reading = readings.get("gpu")
+        if gpu_reading is None:
+            gpus, gpu_error = (), "Detecting GPUs..." if self._gpu_collector() is not None else "No GPU backend available"
+        else:
+            gpus, gpu_error = gpu_reading
+        processes = readings.get("processes")
+
+        elapsed = time.perf_counter() - started
+        snapshot = MetricsSnapshot(
+            timestamp=time.time(),
+            cpu_percent=cpu["percent"] if cpu else 0.0,
+            memory_percent=memory["percent"] if memory else 0.0,
+            memory_used=memory["used"] if memory else 0,
+            gpus=gpus,
+            gpu_error=gpu_error,
+            processes=processes if processes is not None else MappingProxyType({}),
+            collect_seconds=elapsed,
+            readings=MappingProxyType(readings),
+        )
+
+        self._samples += 1
+        self._total_seconds += elapsed
+        self._max_seconds = max(self._max_seconds, elapsed)
+        self._cpu_seconds += time.thread_time() - cpu_started
+        self._latest = snapshot
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"Error in metrics listener: {e}")
+        return snapshot
+
+    def _run_collector(self, state, now):
+        collector = state.collector
+        if not state.opened:
+            # Opening NVML or importing GPUtil is slow, so it happens here on the worker.
+            # It is timed on its own, so a slow open does not stretch the collector's interval
+            state.opened = True
+            started = time.perf_counter()
+            try:
+                collector.open()
+            except Exception as e:
+                state.error = str(e)
+            state.open_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            state.reading = collector.collect()
+            state.error = None
+        except Exception as e:
+            # Keep the previous reading; one failing collector must not stop the others
+            state.error = str(e)
+        state.last_run = now
+        state.runs += 1
+        state.last_wall = time.perf_counter() - started
+        state.last_cpu = time.thread_time() - cpu_started
+        state.wall_total += state.last_wall
+        state.wall_max = max(state.wall_max, state.last_wall)
+        state.cpu_total += state.last_cpu
+
+    def _run(self):
+        # Publish CPU and memory right away; the GPU backend is opened by the
+        # sample that follows shortly after. That one still waits a moment so
+        # its CPU percentages are measured over a real interval.
+        first = True
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                self.sample_once(defer_slow_open=first)
+            except Exception as e:
+                print(f"Error sampling metrics: {e}")
+            # Keep a steady rate regardless of how long collection took
+            interval = min(self.interval, 0.25) if first else self.interval
+            first = False
+            remaining = interval - (time.perf_counter() - started)
+            self._stop_event.wait(max(0.0, remaining))
@@ -0,0 +1,146 @@
+"""Multiplexed reading of child process output.
+
+One selector thread watches the stdout pipes of every supervised service
+instead of dedicating a blocking reader thread to each pipe. Output is read
+with readinto() in large chunks into a buffer reused for every read of that
+pipe, decoded once per chunk, split into lines, and handed to a per-pipe
+callback as one batch.
+
+Windows cannot select() on pipes, so there each pipe falls back to its own
+reader thread behind the same interface.
+"""
+import os
+import selectors
+import threading
+
+IS_WINDOWS = os.name == "nt"
+
+CHUNK_SIZE = 64 * 1024
+
+# Output without a newline is passed on once this much has accumulated
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class _Pipe:
+    """Per-pipe state: callbacks, a reusable read buffer and the incomplete trailing line."""
+
+    def __init__(self, fileobj, on_lines, on_eof):
+        self.fileobj = fileobj
+        self.on_lines = on_lines
+        self.on_eof = on_eof
+        # Every read lands in the same buffer; only complete lines are decoded out of it
+        self.buffer = bytearray(CHUNK_SIZE)
+        self.view = memoryview(self.buffer)
+        self.partial = bytearray()
+
+    def feed(self, count):
+        """Deliver the complete lines among the first `count` bytes of the buffer."""
+        end = self.buffer.rfind(b"\n", 0, count)
+        if end < 0:
+            self.partial += self.view[:count]
+            if len(self.partial) >= MAX_LINE_BYTES:
+                # A line this long is shown in pieces rather than held back indefinitely
+                self.on_lines([self.partial.decode("utf-8", "replace")])
+                self.partial = bytearray()
+            return
+        if self.partial:
+            self.partial += self.view[:end]
+            text = self.partial.decode("utf-8", "replace")
+        else:
+            # One decode per read, straight from the buffer
+            text = str(self.view[:end], "utf-8", "replace")
+        self.partial = bytearray(self.view[end + 1:count])
+        lines = text.split("\n")
+        if "\r" in text:
+            lines = [line.rstrip("\r") for line in lines]
+        self.on_lines(lines)
+
+    def finish(self):
+        if self.partial:
+            self.on_lines([self.partial.rstrip(b"\r").decode("utf-8", "replace")])
+            self.partial = bytearray()
+        if self.on_eof:
+            self.on_eof()
+
+
+class OutputMultiplexer:
+    """Reads many binary pipes from a single thread."""
+
+    def __init__(self):
+        self._selector = None if IS_WINDOWS else selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Self-pipe used to wake the selector when pipes are added
+        self._wake_r = self._wake_w = None
+        if self._selector is not None:
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def add(self, fileobj, on_lines, on_eof=None):
+        """Start reading `fileobj` (a binary pipe); on_lines(list_of_str) is called per chunk.
+
+        The lines of one chunk are passed as one list, so consumers can hand
+        them on as a batch.
+        """
+        pipe = _Pipe(fileobj, on_lines, on_eof)
+        if self._selector is None:
+            threading.Thread(target=self._read_blocking, args=(pipe,), daemon=True).start()
+            return
+
+        os.set_blocking(fileobj.fileno(), False)
+        with self._lock:
+            self._selector.register(fileobj.fileno(), selectors.EVENT_READ, pipe)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="output-multiplexer", daemon=True)
+                self._thread.start()
+        os.write(self._wake_w, b"\0")
+
+    def pipe_count(self):
+        """Number of pipes currently being read (selector mode only)."""
+        if self._selector is None:
+            return 0
+        with self._lock:
+            return len(self._selector.get_map()) - 1
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                pipe = key.data
+                if pipe is None:
+                    try:
+                        os.read(self._wake_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                try:
+                    count = pipe.fileobj.readinto(pipe.view)
+                except OSError:
+                    count = 0
+                if count is None:
+                    # Non-blocking pipe with nothing to read after all
+                    continue
+                if count:
+                    self._deliver(pipe.feed, count)
+                else:
+                    with self._lock:
+                        self._selector.unregister(key.fd)
+                    pipe.fileobj.close()
+                    self._deliver(pipe.finish)
+
+    def _deliver(self, method, *args):
+        # A failing callback must not stop output for every other service
+        try:
+            method(*args)
+        except Exception as e:
+            print(f"Error handling process output: {e}")
+
+    def _read_blocking(self, pipe):
+        readinto = getattr(pipe.fileobj, "readinto1", pipe.fileobj.readinto)
+        while True:
+            count = readinto(pipe.view)
+            if not count:
+                break
+            pipe.feed(count)
+        pipe.fileobj.close()
+        pipe.finish()
@@ -0,0 +1,237 @@
+"""Dashboard of every OpenWebUI Controller streaming to this aggregator.
+
+Start the aggregator once, then point each node's controller at it:
+
+    python owui_aggregator.py --host 0.0.0.0 --port 8766 --token secret
+    python owui_daemon.py --aggregator dashboard-host:8766 --agent-token secret           # on each node
+    python OpenWebUI_Controller.py --aggregator dashboard-host:8766 --agent-token secret  # or from the window
+
+Without --host the aggregator only listens on loopback, which suits SSH
+tunnels from the nodes. The token is sent in the clear; it keeps out stray
+agents, not attackers on an untrusted network.
+
+Every host is one row with its CPU, memory, GPU and request counters, and its
+services are rows below it. Recent error lines from all hosts are listed
+underneath. Without a display, or with --headless, the same table is printed
+every few seconds.
+"""
+import argparse
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from remote_monitor import DEFAULT_PORT, Aggregator
+
+COLUMNS = (("status", "Status", 110), ("cpu", "CPU", 70), ("memory", "Memory", 130),
+           ("gpu", "GPU", 170), ("requests", "Requests", 80), ("errors", "Errors", 110),
+           ("seen", "Last seen", 80))
+
+
+def host_status(host):
+    if not host["connected"]:
+        return "disconnected"
+    return "stale" if host["stale"] else "connected"
+
+
+def format_gpu(host):
+    if not host["gpus"]:
+        return host["system"].get("gpu_error") or "none"
+    utilizations = [gpu["utilization"] for gpu in host["gpus"] if "utilization" in gpu]
+    used = sum(gpu.get("memory_used_mb", 0) for gpu in host["gpus"]) / 1024
+    total = sum(gpu.get("memory_total_mb", 0) for gpu in host["gpus"]) / 1024
+    text = f"{len(host['gpus'])}x"
+    if utilizations:
+        text += f" {sum(utilizations) / len(utilizations):.0f}%"
+    if total:
+        text += f", {used:.1f}/{total:.1f} GB"
+    return text
+
+
+def format_age(timestamp, now):
+    if timestamp is None:
+        return "never"
+    age = now - timestamp
+    return f"{age:.0f} s ago" if age < 120 else f"{age / 60:.0f} min ago"
+
+
+def host_row(host, now):
+    """Column values of a host's row."""
+    services = host["services"]
+    system = host["system"]
+    memory = f"{system['memory']:.0f}%" if "memory" in system else ""
+    if "memory_used_mb" in system:
+        memory += f" ({system['memory_used_mb'] / 1024:.1f} GB)"
+    return (
+        host_status(host),
+        f"{system['cpu']:.0f}%" if "cpu" in system else "",
+        memory,
+        format_gpu(host) if "cpu" in system else "",
+        sum(service.get("requests", 0) for service in services),
+        f"{sum(service.get('server_errors', 0) for service in services)} 5xx, "
+        f"{sum(service.get('log_errors', 0) for service in services)} log",
+        format_age(host["last_seen"], now),
+    )
+
+
+def service_row(service):
+    """Column values of a service's row below its host."""
+    state = service.get("state", "?")
+    if service.get("paused"):
+        state += " (paused)"
+    if service.get("crash_loop"):
+        state += " (crash loop)"
+    elif service.get("restarts"):
+        state += f" ({service['restarts']} restarts)"
+    rss = service.get("rss_mb")
+    memory = "" if rss is None else (f"{rss / 1024:.1f} GB" if rss >= 1024 else f"{rss} MB")
+    if "process_count" in service:
+        memory += f" in {service['process_count']} processes"
+    return (
+        state,
+        f"{service['cpu_percent']}%" if "cpu_percent" in service else "",
+        memory,
+        "",
+        service.get("requests", ""),
+        f"{service.get('server_errors', 0)} 5xx, {service.get('log_errors', 0)} log",
+        "",
+    )
+
+
+def recent_errors(hosts, limit=200):
+    """(timestamp, host, service, line) of the newest error lines across hosts, oldest first."""
+    errors = [(timestamp or 0, host["host"], service, line)
+              for host in hosts for timestamp, service, line in host["errors"]]
+    return sorted(errors)[-limit:]
+
+
+class AggregatorWindow:
+    def __init__(self, root, aggregator, refresh_ms=1000):
+        import tkinter as tk
+        from tkinter import scrolledtext, ttk
+
+        self.root = root
+        self.aggregator = aggregator
+        self.refresh_ms = refresh_ms
+        host, port = aggregator.address
+        self.root.title("OpenWebUI Hosts")
+        self.root.geometry("1000x700")
+
+        main_frame = ttk.Frame(root, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        self.summary_var = tk.StringVar(value=f"Listening on {host}:{port}")
+        ttk.Label(main_frame, textvariable=self.summary_var).pack(anchor=tk.W)
+
+        self.tree = ttk.Treeview(main_frame, columns=[name for name, _, _ in COLUMNS], height=15)
+        self.tree.heading("#0", text="Host / service")
+        self.tree.column("#0", width=200)
+        for name, heading, width in COLUMNS:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, anchor=tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True, pady=(5, 10))
+
+        ttk.Label(main_frame, text="Recent errors").pack(anchor=tk.W)
+        self.errors_text = scrolledtext.ScrolledText(main_frame, height=12, wrap=tk.NONE)
+        self.errors_text.pack(fill=tk.BOTH, expand=True)
+        self._errors_shown = None
+
+        self.refresh()
+
+    def refresh(self):
+        now = time.time()
+        hosts = self.aggregator.hosts()
+        seen = set()
+        for host in hosts:
+            host_id = f"host:{host['host']}"
+            seen.add(host_id)
+            self._set_row(host_id, "", host["host"], host_row(host, now))
+            for service in host["services"]:
+                service_id = f"{host_id}/{service['name']}"
+                seen.add(service_id)
+                self._set_row(service_id, host_id, service["name"], service_row(service))
+        for host_id in self.tree.get_children():
+            for service_id in self.tree.get_children(host_id):
+                if service_id not in seen:
+                    self.tree.delete(service_id)
+            if host_id not in seen:
+                self.tree.delete(host_id)
+
+        connected = sum(1 for host in hosts if host["connected"])
+        host, port = self.aggregator.address
+        self.summary_var.set(f"Listening on {host}:{port} - {len(hosts)} hosts, {connected} connected")
+
+        errors = recent_errors(hosts)
+        if errors != self._errors_shown:
+            self._errors_shown = errors
+            self.errors_text.delete("1.0", "end")
+            self.errors_text.insert("end", "".join(
+                f"[{datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')}] {host_name}/{service}: {line}\n"
+                for timestamp, host_name, service, line in errors))
+            self.errors_text.see("end")
+
+        self.root.after(self.refresh_ms, self.refresh)
+
+    def _set_row(self, item_id, parent, text, values):
+        if self.tree.exists(item_id):
+            self.tree.item(item_id, text=text, values=values)
+        else:
+            self.tree.insert(parent, "end", iid=item_id, text=text, values=values, open=True)
+
+
+def print_table(aggregator):
+    now = time.time()
+    hosts = aggregator.hosts()
+    rows = [("", "Host / service") + tuple(heading for _, heading, _ in COLUMNS)]
+    for host in hosts:
+        rows.append(("", host["host"]) + tuple(str(value) for value in host_row(host, now)))
+        for service in host["services"]:
+            rows.append(("  ", service["name"]) + tuple(str(value) for value in service_row(service)))
+    widths = [max(len(row[i]) for row in rows) for i in range(2, len(rows[0]))]
+    name_width = max(len(indent + name) for indent, name, *_ in rows)
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {len(hosts)} hosts")
+    for indent, name, *values in rows:
+        print(f"{indent + name:<{name_width}}  " + "  ".join(f"{value:<{width}}" for value, width in zip(values, widths)))
+    for timestamp, host_name, service, line in recent_errors(hosts, 5):
+        print(f"  ! {host_name}/{service}: {line}")
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to accept agents on; use 0.0.0.0 to accept other machines")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to accept agents on")
+    parser.add_argument("--token", help="shared secret agents must send (--agent-token on the nodes)")
+    parser.add_argument("--headless", action="store_true", help="print the hosts instead of opening a window")
+    parser.add_argument("--print-interval", type=float, default=5.0, help="seconds between tables when headless")
+    parser.add_argument("--verbose", action="store_true", help="log agent connection errors")
+    args = parser.parse_args(argv)
+
+    aggregator = Aggregator(args.host, args.port, args.token, args.verbose)
+    aggregator.start()
+
+    root = None
+    if not args.headless:
+        try:
+            import tkinter as tk
+            root = tk.Tk()
+        except Exception as e:
+            print(f"No display ({e}); printing the hosts instead", file=sys.stderr)
+
+    if root is not None:
+        AggregatorWindow(root, aggregator)
+        root.mainloop()
+    else:
+        print(f"Listening for agents on {args.host}:{args.port}", flush=True)
+        stop_requested = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop_requested.set())
+        while not stop_requested.wait(args.print_interval):
+            print_table(aggregator)
+    aggregator.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
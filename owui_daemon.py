@@ -0,0 +1,122 @@
+"""Headless OpenWebUI Controller.
+
+Runs the same supervisor and metrics sampler as the Tk window, without a
+display, and serves the control API from control_api.py:
+
+    python owui_daemon.py --start open-webui --api-port 8765
+    curl -X POST -H "Authorization: Bearer $(cat ~/.openwebui_controller/control_token)" \
+        http://127.0.0.1:8765/services/ollama/start
+    curl http://127.0.0.1:8765/metrics
+
+With --aggregator it also streams its metrics to owui_aggregator.py.
+"""
+import argparse
+import signal
+import sys
+import threading
+from datetime import datetime
+
+from control_api import make_server
+from controller_core import ControllerCore, ollama_spec, openwebui_spec
+from installer import Installer
+from restart_policy import MODES, ON_FAILURE, RestartPolicy
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--command", help="OpenWebUI executable (default: the version selected with "
+                                           "'installer.py use', else open-webui)")
+    parser.add_argument("--version", dest="openwebui_version",
+                        help="run this version installed with installer.py instead of --command")
+    parser.add_argument("--host", default="0.0.0.0", help="address OpenWebUI listens on")
+    parser.add_argument("--port", type=int, default=8080, help="port OpenWebUI listens on")
+    parser.add_argument("--restart", choices=MODES, default=ON_FAILURE, help="OpenWebUI restart policy")
+    parser.add_argument("--start", action="append", default=[], metavar="SERVICE",
+                        help="service to start right away (repeatable)")
+    parser.add_argument("--api-host", default="127.0.0.1", help="address of the control API")
+    parser.add_argument("--api-port", type=int, default=8765, help="port of the control API")
+    parser.add_argument("--api-socket", help="serve the control API on this Unix socket instead of TCP")
+    parser.add_argument("--interval", type=float, default=1.0, help="metrics sampling interval in seconds")
+    parser.add_argument("--full-memory", action="store_true",
+                        help="also sample USS/PSS of service process trees (slower than RSS alone)")
+    parser.add_argument("--aggregator", metavar="HOST:PORT",
+                        help="stream metrics and error lines to an owui_aggregator.py dashboard")
+    parser.add_argument("--agent-name", help="name of this host on the dashboard (default: the hostname)")
+    parser.add_argument("--agent-interval", type=float, default=2.0, help="seconds between updates to the aggregator")
+    parser.add_argument("--agent-token", help="shared secret expected by the aggregator")
+    parser.add_argument("--quiet", action="store_true", help="do not echo service output to stdout")
+    parser.add_argument("--verbose", action="store_true", help="log every API request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    def timestamp():
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def on_output(name, lines):
+        if not args.quiet:
+            sys.stdout.write("".join(f"[{name}] {line}\n" for line in lines))
+            sys.stdout.flush()
+
+    def on_state_change(name, old, new, info):
+        print(f"[{timestamp()}] [{name}] {old} -> {new}", flush=True)
+
+    command = args.command
+    if args.openwebui_version:
+        command = Installer().command_for(args.openwebui_version)
+        if command is None:
+            print(f"OpenWebUI {args.openwebui_version} is not installed; see 'python installer.py list'",
+                  file=sys.stderr)
+            return 1
+    elif command is None:
+        command = Installer().command_for() or "open-webui"
+
+    core = ControllerCore(
+        specs=[openwebui_spec(command, args.host, args.port, RestartPolicy(args.restart)), ollama_spec()],
+        on_output=on_output,
+        on_state_change=on_state_change,
+        sample_interval=args.interval,
+    )
+    core.sampler.set_process_full_memory(args.full_memory)
+    for error in core.load_errors:
+        print(f"[{timestamp()}] {error}", file=sys.stderr)
+
+    server = make_server(core, args.api_host, args.api_port, args.api_socket, args.verbose)
+    core.start()
+    agent = None
+    if args.aggregator:
+        from remote_monitor import Agent
+        agent = Agent(core, args.aggregator, args.agent_name, args.agent_interval, args.agent_token)
+        agent.start()
+        print(f"[{timestamp()}] Streaming to aggregator {args.aggregator} as {agent.name}", flush=True)
+    for name in args.start:
+        if core.supervisor.get(name) is None:
+            print(f"[{timestamp()}] Unknown service '{name}'", file=sys.stderr)
+            continue
+        core.start_service(name)
+
+    stop_requested = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop_requested.set())
+
+    threading.Thread(target=server.serve_forever, name="control-api", daemon=True).start()
+    where = args.api_socket or f"http://{args.api_host}:{args.api_port}"
+    print(f"[{timestamp()}] Control API listening on {where}", flush=True)
+
+    # Wake up periodically so signals are handled promptly on every platform
+    while not stop_requested.wait(0.5):
+        pass
+
+    print(f"[{timestamp()}] Shutting down...", flush=True)
+    server.shutdown()
+    server.server_close()
+    if agent is not None:
+        agent.stop()
+    core.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Resource accounting for a process and all of its descendants.
+
+The controller launches OpenWebUI through a shell, so the memory and CPU that
+matter live in the uvicorn workers and model runners below it. Process
+objects are cached across samples so psutil's cpu_percent() has a previous
+reading to diff against; a new pid only gets a meaningful CPU value from its
+second sample onwards.
+"""
+from collections import namedtuple
+
+from lazy_import import lazy_module
+
+psutil = lazy_module("psutil")
+
+# Resource usage of a single process. Unavailable values are None.
+ProcessInfo = namedtuple("ProcessInfo", [
+    "pid",
+    "name",
+    "rss",
+    "uss",
+    "pss",
+    "cpu_percent",
+    "num_threads",
+    "num_fds",
+    "io_read_bytes",
+    "io_write_bytes",
+])
+
+# Totals for a whole process tree. "children" is a tuple of ProcessInfo for
+# every process in the tree (root included) when a breakdown was requested.
+ProcessTreeSample = namedtuple("ProcessTreeSample", [
+    "root_pid",
+    "process_count",
+    "rss",
+    "uss",
+    "pss",
+    "cpu_percent",
+    "num_threads",
+    "num_fds",
+    "io_read_bytes",
+    "io_write_bytes",
+    "children",
+])
+
+
+def _read_process(proc, full_memory):
+    """Read one process's counters inside a psutil oneshot() block."""
+    with proc.oneshot():
+        if proc.status() == psutil.STATUS_ZOMBIE:
+            # Exited but not yet reaped by its parent; it holds no resources
+            raise psutil.ZombieProcess(proc.pid)
+        uss = pss = None
+        if full_memory:
+            try:
+                full = proc.memory_full_info()
+                rss = full.rss
+                uss = full.uss
+                pss = getattr(full, "pss", None)  # Linux only
+            except psutil.AccessDenied:
+                rss = proc.memory_info().rss
+        else:
+            rss = proc.memory_info().rss
+
+        try:
+            num_fds = proc.num_fds()
+        except AttributeError:
+            num_fds = proc.num_handles()  # Windows
+        except psutil.AccessDenied:
+            num_fds = None
+
+        try:
+            io = proc.io_counters()
+            io_read, io_write = io.read_bytes, io.write_bytes
+        except (AttributeError, psutil.AccessDenied):
+            io_read = io_write = None  # not available on macOS
+
+        return ProcessInfo(
+            pid=proc.pid,
+            name=proc.name(),
+            rss=rss,
+            uss=uss,
+            pss=pss,
+            cpu_percent=proc.cpu_percent(),
+            num_threads=proc.num_threads(),
+            num_fds=num_fds,
+            io_read_bytes=io_read,
+            io_write_bytes=io_write,
+        )
+
+
+def _total(infos, field):
+    """Sum a field across processes, or None if no process reported it."""
+    values = [getattr(info, field) for info in infos if getattr(info, field) is not None]
+    return sum(values) if values else None
+
+
+class ProcessTreeMonitor:
+    """Aggregates resource usage over a root process and its descendants."""
+
+    def __init__(self, root_pid, full_memory=False):
+        self.root_pid = root_pid
+        # USS/PSS need memory_full_info(), which is noticeably slower to read
+        self.full_memory = full_memory
+        self._processes = {}
+
+    def sample(self, per_child=False):
+        """Return a ProcessTreeSample, or None once the root process is gone."""
+        root = self._root()
+        if root is None:
+            return None
+        try:
+            descendants = root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+        alive = {root.pid: root}
+        for child in descendants:
+            cached = self._processes.get(child.pid)
+            # psutil compares pid and create time, so a reused pid is a new process
+            alive[child.pid] = cached if cached is not None and cached == child else child
+        self._processes = alive
+
+        infos = []
+        for proc in alive.values():
+            try:
+                infos.append(_read_process(proc, self.full_memory))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                # Exited between listing and reading, or owned by another user
+                continue
+
+        return ProcessTreeSample(
+            root_pid=self.root_pid,
+            process_count=len(infos),
+            rss=_total(infos, "rss") or 0,
+            uss=_total(infos, "uss"),
+            pss=_total(infos, "pss"),
+            cpu_percent=_total(infos, "cpu_percent") or 0.0,
+            num_threads=_total(infos, "num_threads") or 0,
+            num_fds=_total(infos, "num_fds"),
+            io_read_bytes=_total(infos, "io_read_bytes"),
+            io_write_bytes=_total(infos, "io_write_bytes"),
+            children=tuple(sorted(infos, key=lambda info: info.rss, reverse=True)) if per_child else (),
+        )
+
+    def _root(self):
+        proc = self._processes.get(self.root_pid)
+        if proc is not None and proc.is_running():
+            return proc
+        try:
+            return psutil.Process(self.root_pid)
+        except psutil.NoSuchProcess:
+            return None
@@ -0,0 +1,123 @@
+"""Prometheus text exposition of controller metrics.
+
+Everything is rendered from data that is already cached: the sampler's latest
+snapshot and the supervisor's in-memory service state. A scrape therefore
+never runs nvidia-smi, system_profiler or any other probe of its own.
+"""
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STATES = ("starting", "healthy", "stopping", "stopped", "crashed")
+
+# Collectors whose readings already have dedicated metrics above
+_DEDICATED_COLLECTORS = ("cpu", "memory", "gpu", "processes")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Writer:
+    """Collects samples by metric family; each family is written as one contiguous block."""
+
+    def __init__(self):
+        self._families = {}     # metric name -> header lines followed by its samples, in first-seen order
+
+    def metric(self, metric_name, value, help_text, kind="gauge", **labels):
+        """Add one sample; None values are skipped. Labels may include "name"."""
+        if value is None:
+            return
+        lines = self._families.get(metric_name)
+        if lines is None:
+            lines = self._families[metric_name] = [f"# HELP {metric_name} {help_text}",
+                                                   f"# TYPE {metric_name} {kind}"]
+        if labels:
+            label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+            lines.append(f"{metric_name}{{{label_text}}} {self._number(value)}")
+        else:
+            lines.append(f"{metric_name} {self._number(value)}")
+
+    @staticmethod
+    def _number(value):
+        value = float(value)
+        return str(int(value)) if value.is_integer() else repr(value)
+
+    def text(self):
+        return "\n".join(line for lines in self._families.values() for line in lines) + "\n"
+
+
+def render(snapshot, services, sampler_stats=None, collectors=()):
+    """Return the exposition text for a MetricsSnapshot (or None) and ControllerCore.status().
+
+    Readings of `collectors` without dedicated metrics are exported
+    generically as owui_collector_value{collector,metric}.
+    """
+    out = _Writer()
+
+    if snapshot is not None:
+        out.metric("owui_sample_timestamp_seconds", snapshot.timestamp, "Time the metrics were sampled")
+        out.metric("owui_cpu_percent", snapshot.cpu_percent, "System CPU utilization")
+        out.metric("owui_memory_percent", snapshot.memory_percent, "System memory utilization")
+        out.metric("owui_memory_used_bytes", snapshot.memory_used, "System memory in use")
+        for gpu in snapshot.gpus:
+            labels = {"gpu": gpu.index, "name": gpu.name}
+            out.metric("owui_gpu_utilization_percent", gpu.utilization, "GPU utilization", **labels)
+            if gpu.memory_used_mb is not None:
+                out.metric("owui_gpu_memory_used_bytes", gpu.memory_used_mb * 1024 * 1024, "GPU memory in use", **labels)
+            if gpu.memory_total_mb is not None:
+                out.metric("owui_gpu_memory_total_bytes", gpu.memory_total_mb * 1024 * 1024, "GPU memory size", **labels)
+            out.metric("owui_gpu_temperature_celsius", gpu.temperature_c, "GPU temperature", **labels)
+            out.metric("owui_gpu_power_watts", gpu.power_w, "GPU power draw", **labels)
+        for collector in collectors:
+            reading = snapshot.readings.get(collector.name)
+            if collector.name in _DEDICATED_COLLECTORS or reading is None:
+                continue
+            for metric, value in collector.values(reading).items():
+                out.metric("owui_collector_value", value, "Latest reading of a metrics collector",
+                           collector=collector.name, metric=metric)
+
+    for status in services:
+        name = status["name"]
+        out.metric("owui_service_up", 1 if status["state"] == "healthy" else 0,
+                   "1 if the service is running and ready", service=name)
+        for state in STATES:
+            out.metric("owui_service_state", 1 if status["state"] == state else 0,
+                       "Current lifecycle state of the service", service=name, state=state)
+        out.metric("owui_service_rss_bytes", status.get("rss"), "Resident memory of the service process tree",
+                   service=name)
+        out.metric("owui_service_cpu_percent", status.get("cpu_percent"), "CPU used by the service process tree",
+                   service=name)
+        out.metric("owui_service_processes", status.get("process_count"), "Processes in the service tree",
+                   service=name)
+        out.metric("owui_service_time_to_ready_seconds", status.get("time_to_ready"),
+                   "Seconds from spawn to ready for the last start", service=name)
+        out.metric("owui_service_restarts_total", status.get("restarts"), "Automatic restarts", "counter",
+                   service=name)
+        out.metric("owui_service_crashes_total", status.get("crashes"), "Unrequested non-zero exits", "counter",
+                   service=name)
+        out.metric("owui_service_requests_total", status.get("requests"), "HTTP requests seen in the access log",
+                   "counter", service=name)
+        out.metric("owui_service_http_errors_total", status.get("client_errors"), "HTTP error responses", "counter",
+                   service=name, code_class="4xx")
+        out.metric("owui_service_http_errors_total", status.get("server_errors"), "HTTP error responses", "counter",
+                   service=name, code_class="5xx")
+        out.metric("owui_service_slow_requests_total", status.get("slow_requests"),
+                   "Requests slower than the slow-request threshold", "counter", service=name)
+        out.metric("owui_service_log_errors_total", status.get("log_errors"), "Error lines in the service output",
+                   "counter", service=name)
+        out.metric("owui_service_mttr_seconds", status.get("mttr"), "Mean time from going down to ready again",
+                   service=name)
+
+    if sampler_stats:
+        out.metric("owui_sampler_samples_total", sampler_stats["samples"], "Metrics samples collected", "counter")
+        out.metric("owui_sampler_collect_seconds", sampler_stats["last_seconds"], "Time spent collecting the last sample")
+        out.metric("owui_sampler_cpu_share", sampler_stats.get("cpu_share"),
+                   "CPU time spent collecting metrics, as a fraction of one core")
+        for stats in sampler_stats.get("collectors", ()):
+            out.metric("owui_collector_seconds_total", stats["wall_seconds"],
+                       "Wall time spent in a collector", "counter", collector=stats["name"])
+            out.metric("owui_collector_cpu_seconds_total", stats["cpu_seconds"],
+                       "CPU time spent in a collector", "counter", collector=stats["name"])
+            out.metric("owui_collector_interval_seconds", stats["interval"],
+                       "Current interval between runs of a collector", collector=stats["name"])
+    return out.text()
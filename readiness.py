@@ -0,0 +1,206 @@
+"""HTTP readiness probing and startup-latency history.
+
+OpenWebUI takes a while to load after its process starts, so "process
+spawned" is not "service ready". ReadinessProber polls the configured host
+and port over a single kept-alive HTTP/1.1 connection with exponential
+backoff and records:
+
+    ttfb           seconds from spawn until the server first answered at all
+    time_to_ready  seconds from spawn until the health path returned 2xx
+
+Each start is appended to a StartupHistory so cold-start regressions can be
+tracked across OpenWebUI versions.
+"""
+import json
+import time
+from collections import namedtuple
+
+from jsonl_history import JsonlHistory
+from lazy_import import lazy_module
+
+# asyncio is slow to import and only needed once a service starts
+asyncio = lazy_module("asyncio")
+
+StartupRecord = namedtuple("StartupRecord", [
+    "started",          # epoch time the process was spawned
+    "host",
+    "port",
+    "ready",            # True if the service answered before the timeout
+    "ttfb",             # seconds until the first HTTP response byte, or None
+    "time_to_ready",    # seconds until a 2xx from the health path, or None
+    "attempts",
+    "version",          # OpenWebUI version reported by /api/version, or None
+    "error",            # last connection/HTTP error when not ready
+    "service",          # name of the supervised service, if any
+], defaults=(None,))
+
+
+class _HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client for GET requests."""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+
+    async def get(self, path, on_first_byte=None):
+        """Return (status, body). Reconnects if the previous connection dropped."""
+        if self._writer is None or self._writer.is_closing():
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            return await asyncio.wait_for(self._request(path, on_first_byte), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _request(self, path, on_first_byte):
+        self._writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"User-Agent: openwebui-controller\r\nConnection: keep-alive\r\n\r\n".encode("ascii"))
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        if on_first_byte:
+            on_first_byte()
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        else:
+            # Body runs to end of stream; the connection cannot be reused
+            body = await self._reader.read()
+            self.close()
+
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, body
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self._reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await self._reader.readline()
+                return b"".join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readline()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class ReadinessProber:
+    """Polls a service until its health path answers 2xx."""
+
+    def __init__(self, host="127.0.0.1", port=8080, path="/health", version_path="/api/version",
+                 timeout=300.0, initial_delay=0.05, max_delay=2.0, backoff=1.5, request_timeout=5.0):
+        # A server bound to all interfaces is probed on loopback
+        self.host = "127.0.0.1" if host in ("0.0.0.0", "", None) else host
+        self.port = int(port)
+        self.path = path
+        self.version_path = version_path
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.request_timeout = request_timeout
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def wait_ready(self, started=None, should_continue=None):
+        """Poll until ready, timed out, or should_continue() returns False.
+
+        `started` is the time.monotonic() value of the spawn, so latency
+        includes anything that happened before probing began.
+        """
+        started = time.monotonic() if started is None else started
+        started_epoch = time.time() - (time.monotonic() - started)
+        connection = _HTTPConnection(self.host, self.port, self.request_timeout)
+        delay = self.initial_delay
+        attempts = 0
+        ttfb = None
+        error = None
+
+        def first_byte():
+            nonlocal ttfb
+            if ttfb is None:
+                ttfb = time.monotonic() - started
+
+        try:
+            while time.monotonic() - started < self.timeout:
+                if should_continue is not None and not should_continue():
+                    error = "cancelled"
+                    break
+                attempts += 1
+                try:
+                    status, _ = await connection.get(self.path, first_byte)
+                    if 200 <= status < 300:
+                        time_to_ready = time.monotonic() - started
+                        version = await self._read_version(connection)
+                        return StartupRecord(started_epoch, self.host, self.port, True, ttfb,
+                                             time_to_ready, attempts, version, None)
+                    error = f"HTTP {status}"
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+                    error = str(e) or type(e).__name__
+
+                await asyncio.sleep(delay)
+                delay = min(self.max_delay, delay * self.backoff)
+            else:
+                error = f"not ready after {self.timeout:.0f} s ({error})"
+        finally:
+            connection.close()
+
+        return StartupRecord(started_epoch, self.host, self.port, False, ttfb, None, attempts, None, error)
+
+    def run(self, started=None, should_continue=None):
+        """Blocking wrapper around wait_ready() for worker threads."""
+        return asyncio.run(self.wait_ready(started, should_continue))
+
+    async def _read_version(self, connection):
+        if not self.version_path:
+            return None
+        try:
+            status, body = await connection.get(self.version_path)
+            if status == 200:
+                return json.loads(body).get("version")
+        except (OSError, asyncio.TimeoutError, ValueError, AttributeError, asyncio.IncompleteReadError):
+            pass
+        return None
+
+
+class StartupHistory(JsonlHistory):
+    """Append-only JSON-lines log of StartupRecords."""
+
+    filename = "startup_history.jsonl"
+    record_type = StartupRecord
+
+    def summary(self):
+        """Median time-to-ready and start count per OpenWebUI version."""
+        by_version = {}
+        for record in self.load():
+            if record.ready:
+                by_version.setdefault(record.version or "unknown", []).append(record.time_to_ready)
+        result = {}
+        for version, times in by_version.items():
+            times.sort()
+            result[version] = {"starts": len(times), "median_time_to_ready": times[len(times) // 2]}
+        return result
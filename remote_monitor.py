@@ -0,0 +1,544 @@
+"""Streaming metrics from several controllers to one aggregator.
+
+An Agent runs next to a ControllerCore (in the window or owui_daemon.py) and
+keeps one TCP connection open to an Aggregator. Every `interval` seconds it
+flattens the latest metrics snapshot and service status into {key: value}
+and sends only the keys that changed since its previous frame, plus a log
+summary: the request and error counters (as part of the status) and new
+error lines, a few per frame. Values are rounded to what the dashboard
+shows, so jitter below that costs nothing.
+
+After connecting, the agent writes one zlib stream of newline-delimited
+JSON, flushed after every frame:
+
+    {"hello": 1, "host": "gpu-box", "interval": 2.0, "token": null}
+    {"t": 1714557600.0, "full": {"cpu": 12.5, "svc/open-webui/state": "healthy", ...}}
+    {"t": 1714557602.0, "set": {"cpu": 13.1}, "del": ["gpu/0/power_w"], "errors": [["ollama", "ERROR ..."]]}
+
+The first frame on a connection is full and later ones are deltas. A frame
+with nothing in it is a heartbeat. The compression state spans the
+connection, so repeated key names cost a few bytes. Nothing flows back: if
+the connection drops, the agent reconnects with backoff and starts over with
+a full frame.
+
+The Aggregator accepts any number of agents, rebuilds each host's state
+from its frames and returns it as plain dicts from hosts(); owui_aggregator.py
+shows them. Frames that do not have this shape close the connection. The
+token only keeps stray agents out: it is sent in the clear, so the aggregator
+listens on loopback unless given another address.
+"""
+import hmac
+import json
+import socket
+import socketserver
+import threading
+import time
+import zlib
+from collections import deque
+
+from log_store import LEVELS, detect_level
+
+PROTOCOL = 1
+DEFAULT_PORT = 8766
+
+ERROR = LEVELS["ERROR"]
+
+# Error lines an agent holds while the aggregator is unreachable, and sends per frame
+ERROR_BACKLOG = 50
+ERRORS_PER_FRAME = 5
+MAX_ERROR_LINE = 500
+# Error lines the aggregator keeps per host
+ERRORS_KEPT = 100
+
+# Agent reconnect backoff, in seconds
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 30.0
+CONNECT_TIMEOUT = 5.0
+SEND_TIMEOUT = 10.0
+
+# A connected host that has been silent for this many intervals is shown as stale
+STALE_INTERVALS = 3
+# Longest decompressed frame the aggregator accepts
+MAX_FRAME_BYTES = 1024 * 1024
+
+MB = 1024 * 1024
+
+_MISSING = object()
+
+# (GPUSample field, decimals) sent per GPU
+GPU_FIELDS = (("utilization", 0), ("memory_used_mb", 0), ("memory_total_mb", 0),
+              ("temperature_c", 0), ("power_w", 0))
+# (status field, decimals) sent per service; strings and flags are sent as they are
+SERVICE_FIELDS = (("state", None), ("cpu_percent", 0), ("process_count", None), ("requests", None),
+                  ("client_errors", None), ("server_errors", None), ("log_errors", None),
+                  ("restarts", None), ("crash_loop", None), ("paused", None))
+
+
+def parse_address(address, default_port=DEFAULT_PORT):
+    """Split "host", "host:port" or "[v6]:port" into (host, port)."""
+    host, port = address, default_port
+    if address.startswith("["):
+        host, _, rest = address[1:].partition("]")
+        if rest.startswith(":"):
+            port = int(rest[1:])
+    elif address.count(":") == 1:
+        host, port = address.split(":")
+        port = int(port)
+    return host or "127.0.0.1", port
+
+
+def _rounded(value, digits):
+    if digits is None or not isinstance(value, float):
+        return value
+    return int(round(value)) if digits == 0 else round(value, digits)
+
+
+def flatten(snapshot, services):
+    """Flat {key: value} view of a MetricsSnapshot and ControllerCore.status(); None values are left out."""
+    values = {}
+    if snapshot is not None:
+        values["cpu"] = round(snapshot.cpu_percent, 1)
+        values["memory"] = round(snapshot.memory_percent, 1)
+        values["memory_used_mb"] = int(snapshot.memory_used / MB)
+        if snapshot.gpu_error:
+            values["gpu_error"] = snapshot.gpu_error
+        for gpu in snapshot.gpus:
+            prefix = f"gpu/{gpu.index}/"
+            values[prefix + "name"] = gpu.name
+            for field, digits in GPU_FIELDS:
+                value = getattr(gpu, field)
+                if value is not None:
+                    values[prefix + field] = _rounded(value, digits)
+    for status in services:
+        prefix = f"svc/{status['name']}/"
+        for field, digits in SERVICE_FIELDS:
+            value = status.get(field)
+            if value is not None:
+                values[prefix + field] = _rounded(value, digits)
+        if status.get("rss") is not None:
+            values[prefix + "rss_mb"] = int(status["rss"] / MB)
+    return values
+
+
+def diff(previous, current):
+    """Return (changed, removed): the keys to set and to delete to turn previous into current."""
+    changed = {key: value for key, value in current.items() if previous.get(key, _MISSING) != value}
+    removed = [key for key in previous if key not in current]
+    return changed, removed
+
+
+def unflatten(values):
+    """Group flat keys back into system values, a list of GPUs and a list of services."""
+    system, gpus, services = {}, {}, {}
+    for key, value in values.items():
+        if key.startswith("gpu/"):
+            index, _, field = key[4:].partition("/")
+            gpus.setdefault(index, {"index": int(index)})[field] = value
+        elif key.startswith("svc/"):
+            # Service names may contain "/"; the field never does
+            name, _, field = key[4:].rpartition("/")
+            services.setdefault(name, {"name": name})[field] = value
+        else:
+            system[key] = value
+    return (system, sorted(gpus.values(), key=lambda gpu: gpu["index"]),
+            sorted(services.values(), key=lambda service: service["name"]))
+
+
+def _check_values(values, field):
+    if not isinstance(values, dict):
+        raise ValueError(f"'{field}' is not an object")
+    for key, value in values.items():
+        if not (value is None or isinstance(value, (str, int, float))):
+            raise ValueError(f"'{key}' is not a plain value")
+        if key.startswith("gpu/"):
+            index, _, name = key[4:].partition("/")
+            if not (index.isdigit() and name):
+                raise ValueError(f"invalid GPU key '{key}'")
+        elif key.startswith("svc/") and not all(key[4:].rpartition("/")):
+            raise ValueError(f"invalid service key '{key}'")
+
+
+def check_frame(frame):
+    """Raise ValueError unless `frame` is a metrics frame as an Agent sends it."""
+    if not isinstance(frame, dict):
+        raise ValueError("frame is not an object")
+    if not isinstance(frame.get("t", 0), (int, float)):
+        raise ValueError("'t' is not a number")
+    for field in ("full", "set"):
+        if field in frame:
+            _check_values(frame[field], field)
+    removed = frame.get("del", [])
+    if not (isinstance(removed, list) and all(isinstance(key, str) for key in removed)):
+        raise ValueError("'del' is not a list of keys")
+    errors = frame.get("errors", [])
+    if not (isinstance(errors, list) and all(isinstance(error, list) and len(error) == 2
+                                             and all(isinstance(part, str) for part in error)
+                                             for error in errors)):
+        raise ValueError("'errors' is not a list of [service, line] pairs")
+    skipped = frame.get("errors_skipped", 0)
+    if not isinstance(skipped, int) or isinstance(skipped, bool):
+        raise ValueError("'errors_skipped' is not a count")
+
+
+def is_error_line(line):
+    """ERROR/CRITICAL/Traceback lines, with the same cheap pre-check as the access log parser."""
+    return ("ERROR" in line or "Traceback" in line or "CRITICAL" in line or "FATAL" in line) \
+        and detect_level(line) >= ERROR
+
+
+class FrameWriter:
+    """Writes JSON frames to a socket as one zlib stream, flushed per frame."""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._compressor = zlib.compressobj()
+
+    def send(self, message):
+        """Send one frame; returns (uncompressed, sent) byte counts."""
+        data = (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+        packet = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._sock.sendall(packet)
+        return len(data), len(packet)
+
+
+class FrameReader:
+    """Reads the frames written by a FrameWriter; iterating ends when the peer closes."""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._decompressor = zlib.decompressobj()
+        self._pending = b""
+        self.bytes_received = 0
+
+    def __iter__(self):
+        while True:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                return
+            self.bytes_received += len(chunk)
+            data = self._decompressor.decompress(chunk, MAX_FRAME_BYTES)
+            while data:
+                self._pending += data
+                *frames, self._pending = self._pending.split(b"\n")
+                if len(self._pending) > MAX_FRAME_BYTES:
+                    raise ValueError("frame too large")
+                for frame in frames:
+                    yield json.loads(frame)
+                tail = self._decompressor.unconsumed_tail
+                data = self._decompressor.decompress(tail, MAX_FRAME_BYTES) if tail else b""
+
+
+class Agent:
+    """Streams a ControllerCore's metrics, service status and error lines to an aggregator."""
+
+    def __init__(self, core, address, name=None, interval=2.0, token=None):
+        self.core = core
+        self.address = parse_address(address) if isinstance(address, str) else tuple(address)
+        self.name = name or socket.gethostname()
+        self.interval = interval
+        self.token = token
+        self.connected = False
+        self.error = None
+        # Counters for overhead reporting
+        self.frames = 0
+        self.bytes_sent = 0
+        self.raw_bytes = 0
+        self.reconnects = 0
+        self.cpu_seconds = 0.0
+        self._errors = deque(maxlen=ERROR_BACKLOG)
+        self._errors_skipped = 0
+        self._errors_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._socket = None
+        self._thread = None
+        core.add_output_listener(self._on_output)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="remote-agent", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop streaming and close the connection."""
+        self._stop.set()
+        sock = self._socket
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=SEND_TIMEOUT)
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "error": self.error,
+            "frames": self.frames,
+            "bytes_sent": self.bytes_sent,
+            "raw_bytes": self.raw_bytes,
+            "reconnects": self.reconnects,
+            "cpu_seconds": self.cpu_seconds,
+        }
+
+    def _on_output(self, name, lines):
+        # Output reader thread
+        if self._stop.is_set():
+            return
+        for line in lines:
+            if is_error_line(line):
+                with self._errors_lock:
+                    if len(self._errors) == self._errors.maxlen:
+                        self._errors_skipped += 1
+                    self._errors.append((name, line[:MAX_ERROR_LINE]))
+
+    def _take_errors(self):
+        with self._errors_lock:
+            errors = [self._errors.popleft() for _ in range(min(ERRORS_PER_FRAME, len(self._errors)))]
+            skipped, self._errors_skipped = self._errors_skipped, 0
+        return errors, skipped
+
+    def _run(self):
+        delay = RECONNECT_MIN
+        while not self._stop.is_set():
+            try:
+                sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+            except OSError as e:
+                self.error = f"Cannot reach {self.address[0]}:{self.address[1]}: {e}"
+                self._stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
+                continue
+            connected_at = time.monotonic()
+            self._socket = sock
+            try:
+                self._stream(sock)
+            except OSError as e:
+                self.error = f"Connection lost: {e}"
+            finally:
+                self.connected = False
+                self._socket = None
+                sock.close()
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            # Connections that drop right away (wrong token, aggregator restarting) back off too
+            if time.monotonic() - connected_at > RECONNECT_MAX:
+                delay = RECONNECT_MIN
+            self._stop.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    def _stream(self, sock):
+        sock.settimeout(SEND_TIMEOUT)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        writer = FrameWriter(sock)
+        self._send(writer, {"hello": PROTOCOL, "host": self.name, "interval": self.interval, "token": self.token})
+        self.connected = True
+        self.error = None
+        previous = None
+        while not self._stop.is_set():
+            cpu_started = time.thread_time()
+            values = flatten(self.core.sampler.latest(), self.core.status())
+            frame = {"t": round(time.time(), 3)}
+            if previous is None:
+                frame["full"] = values
+            else:
+                changed, removed = diff(previous, values)
+                if changed:
+                    frame["set"] = changed
+                if removed:
+                    frame["del"] = removed
+            errors, skipped = self._take_errors()
+            if errors:
+                frame["errors"] = errors
+            if skipped:
+                frame["errors_skipped"] = skipped
+            self._send(writer, frame)
+            previous = values
+            self.cpu_seconds += time.thread_time() - cpu_started
+            self._stop.wait(self.interval)
+
+    def _send(self, writer, message):
+        raw, sent = writer.send(message)
+        self.frames += 1
+        self.raw_bytes += raw
+        self.bytes_sent += sent
+
+
+class HostState:
+    """What the aggregator knows about one agent's host."""
+
+    def __init__(self, name):
+        self.name = name
+        self.values = {}
+        self.errors = deque(maxlen=ERRORS_KEPT)     # (timestamp, service, line)
+        self.errors_skipped = 0
+        self.address = None
+        self.connection = None
+        self.connected = False
+        self.connected_at = None
+        self.last_seen = None
+        self.interval = None
+        self.frames = 0
+        self.bytes_received = 0
+
+    def apply(self, frame):
+        if "full" in frame:
+            self.values = dict(frame["full"])
+        self.values.update(frame.get("set", {}))
+        for key in frame.get("del", ()):
+            self.values.pop(key, None)
+        for service, line in frame.get("errors", ()):
+            self.errors.append((frame.get("t"), service, line))
+        self.errors_skipped += frame.get("errors_skipped", 0)
+
+    def as_dict(self, now):
+        system, gpus, services = unflatten(self.values)
+        connected_for = now - self.connected_at if self.connected and self.connected_at else None
+        return {
+            "host": self.name,
+            "address": self.address,
+            "connected": self.connected,
+            "stale": bool(self.connected and self.last_seen is not None and self.interval
+                          and now - self.last_seen > STALE_INTERVALS * self.interval),
+            "last_seen": self.last_seen,
+            "interval": self.interval,
+            "system": system,
+            "gpus": gpus,
+            "services": services,
+            "errors": list(self.errors),
+            "errors_skipped": self.errors_skipped,
+            "frames": self.frames,
+            "bytes_received": self.bytes_received,
+            "bytes_per_s": self.bytes_received / connected_for if connected_for else None,
+        }
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        aggregator = self.server.aggregator
+        reader = FrameReader(self.request)
+        host = None
+        connection = object()
+        aggregator._opened(self.request)
+        try:
+            for frame in reader:
+                if host is None:
+                    host = aggregator._hello(frame, self.client_address[0], connection)
+                    if host is None:
+                        return
+                else:
+                    aggregator._frame(host, connection, frame, reader.bytes_received)
+        except (OSError, ValueError, zlib.error) as e:
+            if aggregator.verbose:
+                print(f"Agent {self.client_address[0]}: {e}")
+        finally:
+            aggregator._closed(self.request)
+            if host is not None:
+                aggregator._disconnected(host, connection)
+
+
+class _AggregatorServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, aggregator, address):
+        self.aggregator = aggregator
+        super().__init__(address, _Handler)
+
+
+class Aggregator:
+    """Accepts agent connections and keeps the latest state of every host."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, token=None, verbose=False):
+        self.token = token
+        self.verbose = verbose
+        self._hosts = {}
+        self._sockets = set()
+        self._lock = threading.Lock()
+        self._server = _AggregatorServer(self, (host, port))
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="aggregator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop accepting agents and close the connections of those connected."""
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            sockets = list(self._sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def hosts(self):
+        """Every host seen so far, as plain dicts sorted by name."""
+        now = time.time()
+        with self._lock:
+            return [self._hosts[name].as_dict(now) for name in sorted(self._hosts)]
+
+    def forget(self, name):
+        """Drop a host that is not connected from hosts()."""
+        with self._lock:
+            host = self._hosts.get(name)
+            if host is not None and not host.connected:
+                del self._hosts[name]
+
+    def _opened(self, sock):
+        with self._lock:
+            self._sockets.add(sock)
+
+    def _closed(self, sock):
+        with self._lock:
+            self._sockets.discard(sock)
+
+    def _hello(self, frame, address, connection):
+        if not isinstance(frame, dict):
+            return None
+        name = frame.get("host")
+        interval = frame.get("interval")
+        if frame.get("hello") != PROTOCOL or not isinstance(name, str) or not name:
+            return None
+        if interval is not None and (not isinstance(interval, (int, float)) or interval <= 0):
+            return None
+        token = frame.get("token")
+        token = token.encode("utf-8") if isinstance(token, str) else b""
+        if self.token is not None and not hmac.compare_digest(token, self.token.encode("utf-8")):
+            if self.verbose:
+                print(f"Agent {address} ({name}) sent a wrong token")
+            return None
+        with self._lock:
+            host = self._hosts.get(name)
+            if host is None:
+                host = self._hosts[name] = HostState(name)
+            # A reconnecting agent takes over from its previous, possibly half-open, connection
+            host.connection = connection
+            host.connected = True
+            host.connected_at = time.time()
+            host.last_seen = host.connected_at
+            host.address = address
+            host.interval = interval
+            host.bytes_received = 0
+        return host
+
+    def _frame(self, host, connection, frame, bytes_received):
+        check_frame(frame)
+        with self._lock:
+            if host.connection is not connection:
+                return
+            host.apply(frame)
+            host.frames += 1
+            host.bytes_received = bytes_received
+            host.last_seen = time.time()
+
+    def _disconnected(self, host, connection):
+        with self._lock:
+            if host.connection is connection:
+                host.connection = None
+                host.connected = False
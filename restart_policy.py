@@ -0,0 +1,169 @@
+"""Automatic restarts of supervised services.
+
+A RestartPolicy says when a service that went down on its own is started
+again (always, on-failure, never) and how long to wait: the delay grows
+exponentially with each consecutive restart and is jittered so several
+services that died together do not all come back at the same instant. A
+service that keeps crashing within a short window is declared in a crash
+loop and left down until someone starts it by hand.
+
+RestartTracker keeps the per-service counters: restarts, crashes and the
+time from going down to being healthy again, whose mean is the MTTR.
+Every recovery is also appended to RestartHistory.
+"""
+import random
+import time
+from collections import deque, namedtuple
+
+from jsonl_history import JsonlHistory
+
+ALWAYS = "always"
+ON_FAILURE = "on-failure"
+NEVER = "never"
+
+MODES = (ALWAYS, ON_FAILURE, NEVER)
+
+RestartPolicy = namedtuple("RestartPolicy", [
+    "mode",                 # always | on-failure | never
+    "initial_delay",        # seconds before the first restart
+    "max_delay",            # cap on the exponential backoff
+    "multiplier",
+    "jitter",               # +/- fraction applied to every delay
+    "crash_loop_count",     # this many crashes...
+    "crash_loop_window",    # ...within this many seconds is a crash loop
+    "reset_after",          # healthy this long resets the backoff
+    "prewarm",              # spawn the replacement as soon as the port is free
+], defaults=(NEVER, 1.0, 60.0, 2.0, 0.2, 5, 120.0, 60.0, False))
+
+RestartRecord = namedtuple("RestartRecord", [
+    "service",
+    "down_at",              # epoch time the service went down
+    "reason",               # "exit code N", spawn error, ...
+    "attempt",              # consecutive restart number, starting at 1
+    "delay",                # backoff applied before respawning
+    "recovered",            # True once the replacement was healthy
+    "time_to_recover",      # seconds from going down to healthy again
+])
+
+
+def parse_policy(value):
+    """Build a RestartPolicy from a mode string, a dict, a policy or None."""
+    if value is None:
+        return RestartPolicy()
+    if isinstance(value, RestartPolicy):
+        policy = value
+    elif isinstance(value, str):
+        policy = RestartPolicy(mode=value)
+    elif isinstance(value, dict):
+        policy = RestartPolicy(**value)
+    else:
+        raise TypeError(f"Invalid restart policy: {value!r}")
+    if policy.mode not in MODES:
+        raise ValueError(f"Restart mode must be one of {', '.join(MODES)}, not {policy.mode!r}")
+    return policy
+
+
+def backoff_delay(policy, attempt, rng=random):
+    """Delay before consecutive restart number `attempt` (1-based)."""
+    delay = min(policy.max_delay, policy.initial_delay * policy.multiplier ** max(0, attempt - 1))
+    if policy.jitter:
+        delay *= 1.0 + rng.uniform(-policy.jitter, policy.jitter)
+    return max(0.0, delay)
+
+
+class RestartTracker:
+    """Restart decisions and recovery statistics for one service."""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.restarts = 0
+        self.crashes = 0
+        self.attempt = 0
+        self.crash_loop = False
+        self.recoveries = 0         # completed recoveries
+        self.last_recovery = None   # seconds from down to healthy, most recent recovery
+        self._recovery_total = 0.0
+        self._crash_times = deque()
+        self._healthy_at = None
+        self._pending = None        # RestartRecord awaiting recovery
+
+    @property
+    def mttr(self):
+        """Mean time to recovery in seconds, or None before the first recovery."""
+        if not self.recoveries:
+            return None
+        return self._recovery_total / self.recoveries
+
+    def should_restart(self, crashed):
+        """True if a service that went down on its own should come back."""
+        mode = self.policy.mode
+        return mode == ALWAYS or (mode == ON_FAILURE and crashed)
+
+    def went_down(self, service, crashed, reason, now=None):
+        """Record an unrequested exit; returns the RestartRecord to schedule, or None.
+
+        Sets crash_loop when there were crash_loop_count crashes within
+        crash_loop_window seconds, in which case no restart is scheduled.
+        """
+        now = time.monotonic() if now is None else now
+        if crashed:
+            self.crashes += 1
+            self._crash_times.append(now)
+            while self._crash_times and now - self._crash_times[0] > self.policy.crash_loop_window:
+                self._crash_times.popleft()
+        if not self.should_restart(crashed):
+            return None
+        if len(self._crash_times) >= self.policy.crash_loop_count:
+            self.crash_loop = True
+            return None
+
+        # A long healthy run means this is a fresh failure, not a continuing loop
+        if self._healthy_at is not None and now - self._healthy_at >= self.policy.reset_after:
+            self.attempt = 0
+        self._healthy_at = None
+        self.attempt += 1
+        down_at = time.time()
+        if self._pending is not None:
+            # The previous replacement never became healthy; keep counting from the first outage
+            down_at = self._pending.down_at
+        self._pending = RestartRecord(service, down_at, reason, self.attempt,
+                                      backoff_delay(self.policy, self.attempt), False, None)
+        return self._pending
+
+    def restarted(self):
+        self.restarts += 1
+
+    def became_healthy(self, now=None):
+        """Record a healthy service; returns the completed RestartRecord if this was a recovery."""
+        self._healthy_at = time.monotonic() if now is None else now
+        record, self._pending = self._pending, None
+        if record is None:
+            return None
+        time_to_recover = time.time() - record.down_at
+        self.recoveries += 1
+        self._recovery_total += time_to_recover
+        self.last_recovery = time_to_recover
+        return record._replace(recovered=True, time_to_recover=time_to_recover)
+
+    def reset(self):
+        """Forget the backoff and crash-loop state after a manual start or stop."""
+        self.attempt = 0
+        self.crash_loop = False
+        self._crash_times.clear()
+        self._pending = None
+
+    def stats(self):
+        return {
+            "restarts": self.restarts,
+            "crashes": self.crashes,
+            "crash_loop": self.crash_loop,
+            "mttr": self.mttr,
+            "last_recovery": self.last_recovery,
+        }
+
+
+class RestartHistory(JsonlHistory):
+    """Append-only JSON-lines log of RestartRecords."""
+
+    filename = "restart_history.jsonl"
+    record_type = RestartRecord
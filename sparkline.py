@@ -0,0 +1,115 @@
+"""Small history charts drawn on a Tk canvas.
+
+A Sparkline draws one column of a TimeSeriesStore. Points that arrive after
+the first draw are added incrementally: existing segments are shifted left
+with a single canvas move, one new segment is created per pixel column, and
+segments that scrolled off the left edge are deleted. Nothing is repainted
+from scratch unless the range or the canvas size changes, or an autoscaled
+chart (max_value=None) receives a value above its current scale.
+"""
+import math
+from collections import deque
+
+
+class Sparkline:
+    """Chart of the last `seconds` of one history column."""
+
+    def __init__(self, canvas, store, column, seconds=300, max_value=100.0, color="#3a7bd5"):
+        self.canvas = canvas
+        self.store = store
+        self.column = column
+        self.max_value = max_value
+        self._scale = max_value or 1.0
+        self.color = color
+        self.tag = f"sparkline-{column}"
+        # (item id, right x) oldest first; x is in chart coordinates, which
+        # are screen coordinates plus everything shifted so far
+        self._segments = deque()
+        self._offset = 0.0
+        self._size = None
+        self.set_range(seconds)
+
+    def set_range(self, seconds):
+        """Show the last `seconds` of history; redraws the whole chart."""
+        self.seconds = seconds
+        self.resolution = self.store.tier_for(seconds)
+        self.redraw()
+
+    def redraw(self):
+        """Repaint every visible point."""
+        self.canvas.delete(self.tag)
+        self._segments.clear()
+        self._offset = 0.0
+        self._size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        self._last_time = None
+        self._last_point = None
+        self._pending = []
+        self._appended = None
+        latest = self.store.latest(self.column, self.resolution)
+        if latest is not None:
+            times, values = self.store.query(self.column, latest[0] - self.seconds, self.resolution)
+            if self.max_value is None:
+                self._scale = max([v for v in values if v == v] + [1.0]) * 1.25
+            self._add_points(times, values)
+
+    def update(self):
+        """Draw points that arrived since the last call."""
+        if (self.canvas.winfo_width(), self.canvas.winfo_height()) != self._size:
+            self.redraw()
+            return
+        appended = self.store.appended(self.resolution)
+        if appended == self._appended:
+            return
+        self._appended = appended
+        self._add_points(*self.store.query(self.column, self._last_time, self.resolution))
+
+    def _add_points(self, times, values):
+        if not times:
+            return
+        width, height = self._size
+        if width <= 1 or height <= 1:
+            return
+        self._appended = self.store.appended(self.resolution)
+        self._last_time = times[-1]
+
+        # Several points share one pixel column when the range is wider than the canvas
+        slots = self.seconds / self.resolution
+        dx = width / slots
+        per_pixel = max(1, math.ceil(1 / dx))
+        step = dx * per_pixel
+
+        new = []
+        for value in values:
+            self._pending.append(value)
+            if len(self._pending) >= per_pixel:
+                valid = [v for v in self._pending if v == v]
+                new.append(sum(valid) / len(valid) if valid else None)
+                self._pending = []
+        if not new:
+            return
+        if self.max_value is None and max([v for v in new if v is not None] + [0.0]) > self._scale:
+            # Out of range for the current scale; repaint with a new one
+            self.redraw()
+            return
+
+        # Shift what is already drawn, then append the new segments at the right edge
+        shift = step * len(new)
+        if self._segments:
+            self.canvas.move(self.tag, -shift, 0)
+        self._offset += shift
+
+        x = width - shift + self._offset
+        for value in new:
+            x += step
+            point = None
+            if value is not None:
+                y = height - 1 - (min(max(value, 0.0), self._scale) / self._scale) * (height - 2)
+                point = (x, y)
+                if self._last_point is not None:
+                    item = self.canvas.create_line(self._last_point[0] - self._offset, self._last_point[1],
+                                                   x - self._offset, y, fill=self.color, tags=self.tag)
+                    self._segments.append((item, x))
+            self._last_point = point
+
+        while self._segments and self._segments[0][1] - self._offset < 0:
+            self.canvas.delete(self._segments.popleft()[0])
@@ -0,0 +1,31 @@
+"""Startup milestones of the controller, for --startup-timing.
+
+Milestones are milliseconds since the clock was started, which the controller
+does before importing anything heavy. Only the first time each milestone is
+reached counts.
+"""
+import json
+import sys
+import time
+
+
+class StartupTimer:
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.milestones = {}
+
+    def mark(self, name):
+        """Record `name` unless it was already reached; returns True the first time."""
+        if name in self.milestones:
+            return False
+        self.milestones[name] = (time.perf_counter() - self.started) * 1000
+        return True
+
+    def report(self):
+        return {f"{name}_ms": round(value, 1) for name, value in self.milestones.items()}
+
+    def print_report(self, stream=None):
+        """Write the milestones as one JSON line (to stdout by default)."""
+        stream = stream or sys.stdout
+        stream.write(json.dumps(self.report()) + "\n")
+        stream.flush()
@@ -0,0 +1,354 @@
+"""Supervision of several named services from one controller.
+
+Each ServiceSpec gets its own lifecycle, readiness probe, on-disk log capture,
+restart policy and process-tree metrics, while the output of every service is read by one
+shared OutputMultiplexer thread. Specs beyond the built-in ones can be listed
+in services.json in the controller's data directory:
+
+    [
+        {"name": "open-webui-b", "command": "open-webui serve --port 8081", "port": 8081},
+        {"name": "ollama-gpu1", "command": "ollama serve", "port": 11435,
+         "env": {"OLLAMA_HOST": "127.0.0.1:11435", "CUDA_VISIBLE_DEVICES": "1"},
+         "health_path": "/", "restart": {"mode": "on-failure", "prewarm": true}}
+    ]
+"""
+import errno
+import json
+import os
+import shlex
+import socket
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from app_paths import data_dir
+from lifecycle import ACTIVE_STATES, CRASHED, HEALTHY, STOPPED, STOPPING, ServiceLifecycle, process_group_alive
+from log_store import LogStore
+from output_reader import OutputMultiplexer
+from readiness import ReadinessProber, StartupHistory
+from restart_policy import RestartHistory, RestartTracker, parse_policy
+
+ServiceSpec = namedtuple("ServiceSpec", [
+    "name",
+    "command",          # run through the shell, as typed in a terminal
+    "args",             # extra arguments appended to the command
+    "env",              # extra environment variables
+    "host",
+    "port",             # None disables readiness probing
+    "health_path",
+    "version_path",
+    "cwd",
+    "restart",          # restart_policy.RestartPolicy, mode string or dict; None means never
+], defaults=((), None, "127.0.0.1", None, "/health", "/api/version", None, None))
+
+
+def load_specs(path=None):
+    """Read additional ServiceSpecs from a JSON file; missing file means none."""
+    path = path or os.path.join(data_dir(), "services.json")
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [ServiceSpec(**entry) for entry in entries]
+
+
+def _port_free(host, port):
+    """True unless something is still bound to host:port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        if os.name != "nt":
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host or "0.0.0.0", port))
+        except OSError as e:
+            # Only "in use" means busy; an address we cannot bind here cannot be checked
+            return e.errno not in (errno.EADDRINUSE, getattr(errno, "WSAEADDRINUSE", errno.EADDRINUSE))
+    return True
+
+
+class ManagedService:
+    """Runtime state of one supervised service."""
+
+    def __init__(self, spec, lifecycle, log_store):
+        self.spec = spec
+        self.lifecycle = lifecycle
+        self.log_store = log_store
+        self.run_log = None
+        self.last_readiness = None
+        self.restart = RestartTracker(parse_policy(spec.restart))
+        self.restart_timer = None
+        # Bumped by manual starts and stops so a pending restart knows it is stale
+        self.restart_generation = 0
+
+    @property
+    def name(self):
+        return self.spec.name
+
+    @property
+    def state(self):
+        return self.lifecycle.state
+
+    @property
+    def pid(self):
+        process = self.lifecycle.process
+        return process.pid if process is not None and self.lifecycle.running else None
+
+    def command_line(self):
+        spec = self.spec
+        if not spec.args:
+            return spec.command
+        return " ".join([spec.command] + [shlex.quote(str(arg)) for arg in spec.args])
+
+
+class Supervisor:
+    """Starts, stops and watches a set of named services.
+
+    Callbacks are invoked from worker threads:
+
+        on_output(name, lines)                 process output, plus supervisor messages
+        on_state_change(name, old, new, info)  lifecycle transitions
+        on_process_started(name, pid)          a new process (for metrics tracking)
+
+    When a service goes down without being asked to, its restart policy
+    decides whether it comes back; the state change info then carries
+    "restart_in" (seconds until the restart) or "crash_loop".
+    """
+
+    def __init__(self, on_output=None, on_state_change=None, on_process_started=None,
+                 startup_history=None, restart_history=None, stop_timeout=5.0):
+        self.on_output = on_output
+        self.on_state_change = on_state_change
+        self.on_process_started = on_process_started
+        self.startup_history = startup_history or StartupHistory()
+        self.restart_history = restart_history or RestartHistory()
+        self.stop_timeout = stop_timeout
+        self.multiplexer = OutputMultiplexer()
+        self._services = {}
+        self._lock = threading.Lock()
+
+    def add(self, spec):
+        """Register a spec, or replace the spec of a stopped service with the same name."""
+        with self._lock:
+            existing = self._services.get(spec.name)
+            if existing is not None:
+                if existing.lifecycle.running:
+                    raise RuntimeError(f"Service '{spec.name}' is running; stop it before changing it")
+                existing.spec = spec
+                existing.restart.policy = parse_policy(spec.restart)
+                return existing
+
+            service = ManagedService(spec, None, LogStore(data_dir("logs", spec.name)))
+            service.lifecycle = ServiceLifecycle(
+                spec.name,
+                stop_timeout=self.stop_timeout,
+                on_state_change=lambda old, new, info: self._state_changed(service, old, new, info),
+                on_process_started=lambda process: self._process_started(service, process),
+                readiness_check=lambda process, started, should_continue: self._check_readiness(
+                    service, started, should_continue),
+            )
+            self._services[spec.name] = service
+            return service
+
+    def remove(self, name):
+        """Forget a stopped service."""
+        with self._lock:
+            service = self._services.get(name)
+            if service is not None and service.lifecycle.running:
+                raise RuntimeError(f"Service '{name}' is running; stop it before removing it")
+            self._services.pop(name, None)
+
+    def get(self, name):
+        return self._services.get(name)
+
+    def services(self):
+        """Return the managed services in registration order."""
+        with self._lock:
+            return list(self._services.values())
+
+    def set_restart_policy(self, name, policy):
+        """Change the restart policy of a service, running or not."""
+        service = self._services[name]
+        policy = parse_policy(policy)
+        with self._lock:
+            service.restart.policy = policy
+            service.spec = service.spec._replace(restart=policy)
+
+    def start(self, name, reset_backoff=True):
+        """Start a service; returns False if it is already active.
+
+        A start by hand forgets the restart backoff and crash-loop state;
+        restart() passes reset_backoff=False so it keeps counting.
+        """
+        service = self._services[name]
+        self._cancel_restart(service, reset_backoff)
+        return self._start(service)
+
+    def _start(self, service):
+        spec = service.spec
+        env = None
+        if spec.env:
+            env = dict(os.environ)
+            env.update({key: str(value) for key, value in spec.env.items()})
+        return service.lifecycle.start(
+            service.command_line(),
+            shell=True,  # use the shell's PATH, as typed in a terminal
+            env=env,
+            cwd=spec.cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            bufsize=0,
+        )
+
+    def stop(self, name, wait=False, reset_backoff=True):
+        """Stop a service without blocking unless wait=True; also cancels a pending restart."""
+        service = self._services[name]
+        cancelled = self._cancel_restart(service, reset_backoff)
+        return service.lifecycle.stop(wait=wait) or cancelled
+
+    def restart(self, name):
+        """Stop a service gracefully and start it again once it is gone, without blocking.
+
+        Used by guardrails, so the backoff and crash-loop state survive it.
+        """
+        service = self._services[name]
+
+        def restart():
+            self.stop(name, wait=True, reset_backoff=False)
+            self.start(name, reset_backoff=False)
+
+        threading.Thread(target=restart, name=f"restart-{service.name}", daemon=True).start()
+
+    def stop_all(self, wait=False):
+        """Stop every active service; with wait=True block until all are gone."""
+        services = self.services()
+        for service in services:
+            self._cancel_restart(service)
+            service.lifecycle.stop()
+        if wait:
+            for service in services:
+                service.lifecycle.wait_for(lambda state: state not in ACTIVE_STATES, self.stop_timeout + 2.0)
+
+    def status(self):
+        """Return a list of plain dicts describing every service."""
+        return [
+            {
+                "name": service.name,
+                "state": service.state,
+                "pid": service.pid,
+                "command": service.command_line(),
+                "port": service.spec.port,
+                "returncode": service.lifecycle.returncode,
+                "error": service.lifecycle.error,
+                "time_to_ready": service.last_readiness.time_to_ready if service.last_readiness else None,
+                "restart_policy": service.restart.policy.mode,
+                "restart_pending": service.restart_timer is not None,
+                "paused": service.lifecycle.paused,
+                **service.restart.stats(),
+            }
+            for service in self.services()
+        ]
+
+    def message(self, name, text):
+        """Emit a timestamped supervisor message through on_output."""
+        if self.on_output:
+            self.on_output(name, [f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {text}"])
+
+    def _process_started(self, service, process):
+        # Lifecycle worker thread
+        service.run_log = service.log_store.start_run(process.args)
+        run_log = service.run_log
+
+        def on_lines(lines):
+            run_log.write_lines(lines)
+            if self.on_output:
+                self.on_output(service.name, lines)
+
+        self.multiplexer.add(process.stdout, on_lines, on_eof=run_log.close)
+        if self.on_process_started:
+            self.on_process_started(service.name, process.pid)
+
+    def _check_readiness(self, service, started, should_continue):
+        spec = service.spec
+        if not spec.port:
+            return True
+        prober = ReadinessProber(spec.host, spec.port, spec.health_path, spec.version_path)
+        self.message(service.name, f"Waiting for {prober.url} to become ready...")
+        record = prober.run(started, should_continue)._replace(service=service.name)
+        if record.error != "cancelled":
+            self.startup_history.record(record)
+            if not record.ready:
+                self.message(service.name, f"Readiness check failed: {record.error}")
+        service.last_readiness = record
+        return record
+
+    def _state_changed(self, service, old, new, info):
+        # Lifecycle worker thread, outside the lifecycle lock
+        if new == HEALTHY:
+            with self._lock:
+                record = service.restart.became_healthy()
+            if record is not None:
+                self.restart_history.record(record)
+                self.message(service.name, f"Recovered {record.time_to_recover:.1f} s after going down "
+                                           f"(restart {record.attempt}, MTTR {service.restart.mttr:.1f} s)")
+        elif new == CRASHED or (new == STOPPED and old != STOPPING):
+            self._went_down(service, new == CRASHED, info)
+        if self.on_state_change:
+            self.on_state_change(service.name, old, new, info)
+
+    def _went_down(self, service, crashed, info):
+        """Apply the restart policy to a service that exited on its own."""
+        reason = info.get("error") or f"exit code {info.get('returncode')}"
+        process = service.lifecycle.process
+        with self._lock:
+            record = service.restart.went_down(service.name, crashed, reason)
+            if record is not None:
+                generation = service.restart_generation
+                service.restart_timer = threading.Timer(record.delay, self._restart,
+                                                        args=(service, generation, process))
+                service.restart_timer.daemon = True
+                service.restart_timer.start()
+
+        if record is not None:
+            info["restart_in"] = record.delay
+            self.message(service.name, f"Service went down ({reason}); restarting in {record.delay:.1f} s "
+                                       f"(attempt {record.attempt})")
+        elif service.restart.crash_loop:
+            info["crash_loop"] = True
+            policy = service.restart.policy
+            self.message(service.name, f"Crash loop: {policy.crash_loop_count} crashes within "
+                                       f"{policy.crash_loop_window:.0f} s; not restarting until started by hand")
+
+    def _restart(self, service, generation, old_process):
+        # Restart timer thread
+        spec = service.spec
+        deadline = time.monotonic() + self.stop_timeout
+        while time.monotonic() < deadline and service.restart_generation == generation:
+            if service.restart.policy.prewarm:
+                # Pre-warm: go as soon as the port is free, even if old workers are still exiting
+                if not spec.port or _port_free(spec.host, spec.port):
+                    break
+            elif old_process is None or not process_group_alive(old_process):
+                break
+            time.sleep(0.1)
+
+        with self._lock:
+            if service.restart_generation != generation:
+                return
+            service.restart_timer = None
+        if self._start(service):
+            service.restart.restarted()
+
+    def _cancel_restart(self, service, reset_backoff=True):
+        """Drop any pending restart (and the backoff state); returns True if one was pending."""
+        with self._lock:
+            service.restart_generation += 1
+            timer, service.restart_timer = service.restart_timer, None
+            if reset_backoff:
+                service.restart.reset()
+        if timer is not None:
+            timer.cancel()
+            return True
+        return False
@@ -0,0 +1,70 @@
+"""AccessLogParser classification of recorded uvicorn and gin output."""
+import os
+import unittest
+
+from access_log import EMPTY_COUNTS, AccessLogParser, RequestCounts, add, subtract
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def sample_lines():
+    with open(os.path.join(FIXTURES, "access_log_sample.txt"), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+class AccessLogParserTest(unittest.TestCase):
+    def test_sample_counts(self):
+        parser = AccessLogParser()
+        parser.feed(sample_lines())
+        counts = parser.counts()
+        # 8 uvicorn request lines and 3 from gin
+        self.assertEqual(counts.requests, 11)
+        self.assertEqual(counts.client_errors, 2)   # 404, 401
+        self.assertEqual(counts.server_errors, 2)   # uvicorn 500, gin 500
+        # 2.345 s, 1500 ms and gin's 1.23 s; gin's "1m2.5s" has no latency
+        self.assertEqual(counts.slow, 3)
+        self.assertEqual(counts.latency_count, 6)
+        self.assertAlmostEqual(counts.latency_sum, 2.345 + 0.012 + 1.5 + 0.5 + 1.234567 + 512.3e-6)
+        # ERROR:, Traceback, the loguru ERROR line and CRITICAL:, but not ValueError or ERROR_REPORTING
+        self.assertEqual(counts.log_errors, 4)
+
+    def test_batches_add_up(self):
+        lines = sample_lines()
+        whole = AccessLogParser()
+        whole.feed(lines)
+        split = AccessLogParser()
+        for start in range(0, len(lines), 3):
+            split.feed(lines[start:start + 3])
+        self.assertEqual(split.counts(), whole.counts())
+
+    def test_status_classes(self):
+        parser = AccessLogParser()
+        for status in (200, 201, 302, 400, 404, 429, 500, 502, 503):
+            parser.feed([f'INFO:     127.0.0.1:5000 - "GET /x HTTP/1.1" {status} Reason'])
+        counts = parser.counts()
+        self.assertEqual((counts.requests, counts.client_errors, counts.server_errors), (9, 3, 3))
+        self.assertEqual((counts.slow, counts.latency_count, counts.log_errors), (0, 0, 0))
+
+    def test_slow_threshold(self):
+        lines = [
+            'INFO:     127.0.0.1:5000 - "GET /a HTTP/1.1" 200 OK 250ms',
+            'INFO:     127.0.0.1:5000 - "GET /b HTTP/1.1" 200 OK 0.3s',
+            'INFO:     127.0.0.1:5000 - "GET /c HTTP/1.1" 200 OK 0.2s',
+        ]
+        parser = AccessLogParser(slow_seconds=0.2)
+        parser.feed(lines)
+        self.assertEqual(parser.counts().slow, 2)
+
+    def test_lines_without_requests_or_errors_leave_counts_alone(self):
+        parser = AccessLogParser()
+        parser.feed(["INFO:     Application startup complete.", "", "plain output mentioning an error"])
+        self.assertEqual(parser.counts(), EMPTY_COUNTS)
+
+    def test_add_and_subtract(self):
+        a = RequestCounts(5, 1, 1, 0, 2, 1.5, 3)
+        b = RequestCounts(2, 0, 1, 1, 0, 0.5, 1)
+        self.assertEqual(subtract(add(a, b), b), a)
+
+
+if __name__ == "__main__":
+    unittest.main()
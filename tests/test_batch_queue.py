@@ -0,0 +1,94 @@
+"""BatchQueue overflow policies and drop accounting."""
+import threading
+import time
+import unittest
+
+from batch_queue import BLOCK, DROP_NEWEST, DROP_OLDEST, BatchQueue
+
+
+def numbered(start, stop):
+    return [str(n) for n in range(start, stop)]
+
+
+class BatchQueueTest(unittest.TestCase):
+    def test_drain_in_order_and_in_parts(self):
+        output = BatchQueue(max_lines=100)
+        output.put(numbered(0, 5))
+        output.put(iter(numbered(5, 8)))
+        output.put([])
+        self.assertEqual(len(output), 8)
+        self.assertEqual(output.drain(3), numbered(0, 3))
+        self.assertEqual(output.drain(4), numbered(3, 7))
+        self.assertEqual(output.drain(), ["7"])
+        self.assertEqual(output.drain(), [])
+        self.assertEqual(len(output), 0)
+
+    def test_drop_oldest(self):
+        output = BatchQueue(max_lines=10, policy=DROP_OLDEST)
+        self.assertEqual(output.put(numbered(0, 6)), 0)
+        self.assertEqual(output.put(numbered(6, 12)), 2)
+        self.assertEqual(output.drain(), numbered(2, 12))
+        # A batch larger than the whole queue keeps only its newest lines
+        self.assertEqual(output.put(numbered(0, 25)), 15)
+        self.assertEqual(output.drain(), numbered(15, 25))
+        self.assertEqual(output.dropped, 17)
+
+    def test_drop_newest(self):
+        output = BatchQueue(max_lines=10, policy=DROP_NEWEST)
+        output.put(numbered(0, 6))
+        self.assertEqual(output.put(numbered(6, 12)), 2)
+        self.assertEqual(output.put(numbered(12, 14)), 2)
+        self.assertEqual(output.drain(), numbered(0, 10))
+        self.assertEqual(output.dropped, 4)
+
+    def test_block_waits_for_room(self):
+        output = BatchQueue(max_lines=10, policy=BLOCK)
+        output.put(numbered(0, 8))
+        results = []
+        producer = threading.Thread(target=lambda: results.append(output.put(numbered(8, 12))))
+        producer.start()
+        time.sleep(0.1)
+        self.assertEqual(results, [])
+        self.assertEqual(output.drain(5), numbered(0, 5))
+        producer.join(5)
+        self.assertEqual(results, [0])
+        self.assertEqual(output.drain(), numbered(5, 12))
+        self.assertEqual(output.dropped, 0)
+
+    def test_block_splits_oversized_batches(self):
+        output = BatchQueue(max_lines=10, policy=BLOCK)
+        received = []
+        producer = threading.Thread(target=output.put, args=(numbered(0, 35),))
+        producer.start()
+        deadline = time.monotonic() + 5
+        while len(received) < 35 and time.monotonic() < deadline:
+            received.extend(output.drain())
+            self.assertLessEqual(output.high_water, 10)
+            time.sleep(0.01)
+        producer.join(5)
+        self.assertEqual(received, numbered(0, 35))
+
+    def test_block_timeout_drops_what_does_not_fit(self):
+        output = BatchQueue(max_lines=10, policy=BLOCK)
+        output.put(numbered(0, 10))
+        self.assertEqual(output.put(numbered(10, 13), timeout=0.05), 3)
+        self.assertEqual(output.dropped, 3)
+        self.assertEqual(output.drain(), numbered(0, 10))
+
+    def test_take_dropped_counts_since_the_last_call(self):
+        output = BatchQueue(max_lines=4, policy=DROP_OLDEST)
+        output.put(numbered(0, 6))
+        self.assertEqual(output.take_dropped(), 2)
+        self.assertEqual(output.take_dropped(), 0)
+        output.put(numbered(6, 9))
+        self.assertEqual(output.take_dropped(), 3)
+        self.assertEqual(output.stats(), {"queued": 4, "dropped": 5, "high_water": 4, "max_lines": 4,
+                                          "policy": DROP_OLDEST})
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            BatchQueue(policy="drop-random")
+
+
+if __name__ == "__main__":
+    unittest.main()
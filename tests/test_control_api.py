@@ -0,0 +1,165 @@
+"""Control API access checks: token, Host and Origin headers, and the Unix socket."""
+import http.client
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+import unittest
+
+import control_api
+from control_api import load_token, make_server
+
+TOKEN = "test-token"
+
+
+class FakeSupervisor:
+    def __init__(self, names):
+        self.names = names
+
+    def get(self, name):
+        return object() if name in self.names else None
+
+
+class FakeCore:
+    def __init__(self):
+        self.supervisor = FakeSupervisor({"open-webui"})
+        self.started = []
+
+    def status(self):
+        return [{"name": "open-webui", "state": "stopped"}]
+
+    def start_service(self, name):
+        self.started.append(name)
+        return True
+
+    def stop_service(self, name):
+        return False
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class ControlServerTestCase(unittest.TestCase):
+    def serve(self, **kwargs):
+        self.core = FakeCore()
+        server = make_server(self.core, verbose=False, token=TOKEN, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def request(self, connection, method, path, host=None, headers=()):
+        connection.putrequest(method, path, skip_host=host is not None)
+        if host is not None:
+            connection.putheader("Host", host)
+        for name, value in dict(headers).items():
+            connection.putheader(name, value)
+        connection.putheader("Content-Length", "0")
+        connection.endheaders()
+        response = connection.getresponse()
+        body = json.loads(response.read() or b"null")
+        connection.close()
+        return response.status, body
+
+
+class TcpTest(ControlServerTestCase):
+    def setUp(self):
+        self.server = self.serve(host="127.0.0.1", port=0)
+        self.port = self.server.server_address[1]
+
+    def call(self, method, path, host=None, **headers):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        return self.request(connection, method, path, host, headers)
+
+    def test_status_needs_no_token(self):
+        status, body = self.call("GET", "/status")
+        self.assertEqual(status, 200)
+        self.assertEqual(body[0]["name"], "open-webui")
+
+    def test_post_needs_the_token(self):
+        self.assertEqual(self.call("POST", "/services/open-webui/start")[0], 401)
+        self.assertEqual(self.call("POST", "/services/open-webui/start", Authorization="Bearer nope")[0], 401)
+        self.assertEqual(self.core.started, [])
+        status, body = self.call("POST", "/services/open-webui/start", Authorization=f"Bearer {TOKEN}")
+        self.assertEqual(status, 202)
+        self.assertEqual(body, {"service": "open-webui", "action": "start", "accepted": True})
+        self.assertEqual(self.core.started, ["open-webui"])
+
+    def test_host_must_be_the_bound_address(self):
+        self.assertEqual(self.call("GET", "/status", host=f"localhost:{self.port}")[0], 200)
+        self.assertEqual(self.call("GET", "/status", host=f"127.0.0.1:{self.port}")[0], 200)
+        self.assertEqual(self.call("GET", "/status", host=f"evil.example:{self.port}")[0], 403)
+        self.assertEqual(self.call("GET", "/status", host="127.0.0.1:1")[0], 403)
+        status, _ = self.call("POST", "/services/open-webui/start", host=f"evil.example:{self.port}",
+                              Authorization=f"Bearer {TOKEN}")
+        self.assertEqual(status, 403)
+        self.assertEqual(self.core.started, [])
+
+    def test_any_origin_is_refused(self):
+        self.assertEqual(self.call("GET", "/status", Origin=f"http://127.0.0.1:{self.port}")[0], 403)
+        status, _ = self.call("POST", "/services/open-webui/start", Origin="null", Authorization=f"Bearer {TOKEN}")
+        self.assertEqual(status, 403)
+        self.assertEqual(self.core.started, [])
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets only")
+class UnixSocketTest(ControlServerTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "control.sock")
+
+    def call(self, method, path, **headers):
+        return self.request(UnixHTTPConnection(self.path), method, path, headers=headers)
+
+    def test_socket_is_owner_only_and_needs_the_token(self):
+        self.serve(unix_socket=self.path)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        self.assertEqual(self.call("GET", "/status")[0], 200)
+        self.assertEqual(self.call("POST", "/services/open-webui/start")[0], 401)
+        self.assertEqual(self.call("POST", "/services/open-webui/start", Authorization=f"Bearer {TOKEN}")[0], 202)
+
+    def test_stale_socket_is_replaced(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+        self.serve(unix_socket=self.path)
+        self.assertEqual(self.call("GET", "/status")[0], 200)
+
+    def test_live_socket_is_left_alone(self):
+        self.serve(unix_socket=self.path)
+        with self.assertRaises(OSError):
+            make_server(FakeCore(), unix_socket=self.path, token=TOKEN)
+        self.assertEqual(self.call("GET", "/status")[0], 200)
+
+    def test_other_files_are_not_removed(self):
+        with open(self.path, "w") as f:
+            f.write("keep me")
+        with self.assertRaises(OSError):
+            make_server(FakeCore(), unix_socket=self.path, token=TOKEN)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "keep me")
+
+
+class TokenFileTest(unittest.TestCase):
+    def test_created_once_and_owner_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, control_api.TOKEN_FILE)
+            token = load_token(path)
+            self.assertGreaterEqual(len(token), 32)
+            self.assertEqual(load_token(path), token)
+            if os.name != "nt":
+                self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""Backend selection of open_backend and GPU readings through the sampler, using FakeGPUBackend."""
+import os
+import unittest
+from unittest import mock
+
+import gpu_backends
+from collectors import CHEAP, EXPENSIVE, GPUCollector
+from gpu_backends import FakeGPUBackend, GPUBackend, GPUBackendUnavailable, make_sample, open_backend
+from metrics_sampler import MetricsSampler
+
+
+def unavailable(name, opened):
+    class Unavailable(GPUBackend):
+        def open(self):
+            opened.append(name)
+            raise GPUBackendUnavailable(f"{name} missing")
+
+    Unavailable.name = name
+    return Unavailable
+
+
+def available(name, opened):
+    class Available(GPUBackend):
+        def open(self):
+            opened.append(name)
+
+    Available.name = name
+    return Available
+
+
+class OpenBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.opened = []
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop("OWUI_GPU_BACKEND", None)
+
+    def backends(self, **backends):
+        patcher = mock.patch.dict(gpu_backends.BACKENDS, backends)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def system(self, name):
+        patcher = mock.patch("gpu_backends.platform.system", return_value=name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_named_backend(self):
+        backend = open_backend("fake")
+        self.assertIsInstance(backend, FakeGPUBackend)
+
+    def test_none(self):
+        self.assertIsNone(open_backend("none"))
+        os.environ["OWUI_GPU_BACKEND"] = "none"
+        self.assertIsNone(open_backend())
+
+    def test_environment_selects_backend_for_auto_only(self):
+        os.environ["OWUI_GPU_BACKEND"] = "fake"
+        self.assertIsInstance(open_backend(), FakeGPUBackend)
+        self.assertIsNone(open_backend("none"))
+
+    def test_auto_falls_back_from_nvml_to_gputil(self):
+        self.system("Linux")
+        self.backends(nvml=unavailable("nvml", self.opened), gputil=available("gputil", self.opened))
+        self.assertEqual(open_backend().name, "gputil")
+        self.assertEqual(self.opened, ["nvml", "gputil"])
+
+    def test_auto_prefers_nvml(self):
+        self.system("Linux")
+        self.backends(nvml=available("nvml", self.opened), gputil=available("gputil", self.opened))
+        self.assertEqual(open_backend().name, "nvml")
+        self.assertEqual(self.opened, ["nvml"])
+
+    def test_auto_with_nothing_available(self):
+        self.system("Linux")
+        self.backends(nvml=unavailable("nvml", self.opened), gputil=unavailable("gputil", self.opened))
+        self.assertIsNone(open_backend())
+        self.assertEqual(self.opened, ["nvml", "gputil"])
+
+    def test_auto_on_macos(self):
+        self.system("Darwin")
+        self.backends(mac=available("mac", self.opened), nvml=available("nvml", self.opened))
+        self.assertEqual(open_backend().name, "mac")
+        self.assertEqual(self.opened, ["mac"])
+
+    def test_unavailable_named_backend(self):
+        self.backends(nvml=unavailable("nvml", self.opened))
+        self.assertIsNone(open_backend("nvml"))
+
+
+class FakeBackendTest(unittest.TestCase):
+    def test_wave_readings(self):
+        backend = FakeGPUBackend(count=3, memory_total_mb=8192)
+        gpus = backend.read()
+        self.assertEqual([gpu.index for gpu in gpus], [0, 1, 2])
+        for gpu in gpus:
+            self.assertTrue(5 <= gpu.utilization <= 95)
+            self.assertLess(gpu.memory_used_mb, gpu.memory_total_mb)
+            self.assertEqual(gpu.memory_total_mb, 8192)
+
+    def test_fixed_readings(self):
+        backend = FakeGPUBackend()
+        fixed = [make_sample(0, "A", utilization=10.0)]
+        backend.set_readings(fixed)
+        self.assertEqual(backend.read(), tuple(fixed))
+        backend.set_readings(None)
+        self.assertEqual(len(backend.read()), 2)
+        self.assertEqual(backend.reads, 2)
+
+
+class CollectorTest(unittest.TestCase):
+    def test_multi_gpu_readings_reach_snapshots(self):
+        backend = FakeGPUBackend()
+        readings = [make_sample(0, "GPU A", 10.0, 1000, 8000, 50, 100),
+                    make_sample(1, "GPU B", 90.0, 7000, 8000, 80, 300)]
+        backend.set_readings(readings)
+        collector = GPUCollector(backend)
+        sampler = MetricsSampler(collectors=[collector])
+
+        snapshot = sampler.sample_once(defer_slow_open=True)
+        self.assertEqual((snapshot.gpus, snapshot.gpu_error), ((), "Detecting GPUs..."))
+        self.assertEqual(backend.reads, 0)
+
+        snapshot = sampler.sample_once()
+        self.assertEqual(snapshot.gpus, tuple(readings))
+        self.assertIsNone(snapshot.gpu_error)
+        self.assertEqual(sampler.gpu_backend_name(), "fake")
+        self.assertEqual(collector.cost, CHEAP)
+        self.assertEqual(collector.values(snapshot.readings["gpu"])["gpu1_utilization"], 90.0)
+        self.assertEqual(collector.summary(snapshot.readings["gpu"]), "2 GPU(s) via fake")
+
+    def test_no_gpus_and_read_errors(self):
+        backend = FakeGPUBackend()
+        sampler = MetricsSampler(collectors=[GPUCollector(backend)])
+        backend.set_readings([])
+        self.assertEqual(sampler.sample_once().gpu_error, "No GPU detected")
+
+        def broken():
+            raise RuntimeError("driver gone")
+
+        backend.read = broken
+        snapshot = sampler.sample_once()
+        self.assertEqual((snapshot.gpus, snapshot.gpu_error), ((), "Error: driver gone"))
+
+    def test_unavailable_backend(self):
+        opened = []
+        sampler = MetricsSampler(collectors=[GPUCollector(unavailable("nvml", opened)())])
+        self.assertEqual(sampler.sample_once().gpu_error, "No GPU backend available")
+        self.assertIsNone(sampler.gpu_backend_name())
+
+    def test_process_spawning_backends_run_less_often(self):
+        for name in ("gputil", "mac"):
+            with self.subTest(backend=name):
+                collector = GPUCollector(available(name, [])())
+                collector.open()
+                self.assertEqual(collector.cost, EXPENSIVE)
+                self.assertGreaterEqual(collector.preferred_interval(), 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""GuardrailEngine driven by synthetic metric streams."""
+import os
+import tempfile
+import unittest
+
+from guardrails import CLEARED, TRIGGERED, GuardrailEngine, GuardrailHistory, parse_rule
+
+
+def rule(**options):
+    options.setdefault("name", "hot")
+    options.setdefault("metric", "cpu")
+    if "below" not in options:
+        options.setdefault("above", 90)
+    return parse_rule(options)
+
+
+def feed(engine, values, start=0, metric="cpu"):
+    """Evaluate one value per second; returns (timestamp, phase) of the events."""
+    events = []
+    for offset, value in enumerate(values):
+        events.extend((event.timestamp, event.phase)
+                      for event in engine.evaluate(start + offset, {metric: value}))
+    return events
+
+
+class TriggerTest(unittest.TestCase):
+    def test_triggers_after_duration(self):
+        engine = GuardrailEngine([rule(duration=10)])
+        self.assertEqual(feed(engine, [95] * 12), [(10, TRIGGERED)])
+        self.assertTrue(engine.status()[0]["triggered"])
+
+    def test_brief_breach_does_not_trigger(self):
+        engine = GuardrailEngine([rule(duration=10)])
+        self.assertEqual(feed(engine, [95] * 8 + [50] + [95] * 8), [])
+
+    def test_below(self):
+        engine = GuardrailEngine([rule(below=10, duration=2)])
+        self.assertEqual(feed(engine, [50, 5, 5, 5]), [(3, TRIGGERED)])
+
+    def test_event_carries_samples(self):
+        engine = GuardrailEngine([rule(duration=2)])
+        events = [event for t, value in enumerate([50, 95, 96, 97]) for event in engine.evaluate(t, {"cpu": value})]
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].samples, ((1, 95), (2, 96), (3, 97)))
+        self.assertEqual(events[0].value, 97)
+        self.assertEqual(events[0].threshold, 90.0)
+
+
+class HysteresisTest(unittest.TestCase):
+    def test_clears_only_past_clear_value_for_clear_duration(self):
+        engine = GuardrailEngine([rule(duration=0, clear=80, clear_duration=3)])
+        events = feed(engine, [95, 85, 85, 85, 85, 75, 75, 75, 75])
+        # 85 is below the threshold but not past the clear value
+        self.assertEqual(events, [(0, TRIGGERED), (8, CLEARED)])
+
+    def test_clear_streak_is_interrupted(self):
+        engine = GuardrailEngine([rule(duration=0, clear_duration=2, cooldown=0)])
+        self.assertEqual(feed(engine, [95, 50, 50, 95, 50, 50, 50]), [(0, TRIGGERED), (6, CLEARED)])
+
+    def test_none_counts_as_clear(self):
+        engine = GuardrailEngine([rule(duration=0, clear_duration=2)])
+        self.assertEqual(feed(engine, [95, None, None, None]), [(0, TRIGGERED), (3, CLEARED)])
+
+    def test_none_does_not_trigger(self):
+        engine = GuardrailEngine([rule(duration=0)])
+        self.assertEqual(feed(engine, [None] * 5), [])
+
+
+class CooldownTest(unittest.TestCase):
+    def test_cooldown_suppresses_retrigger(self):
+        engine = GuardrailEngine([rule(duration=2, clear_duration=1, cooldown=20)])
+        events = feed(engine, [95] * 3 + [50] * 2 + [95] * 20)
+        self.assertEqual(events, [(2, TRIGGERED), (4, CLEARED), (22, TRIGGERED)])
+
+    def test_no_cooldown(self):
+        engine = GuardrailEngine([rule(duration=0, clear_duration=0, cooldown=0)])
+        self.assertEqual(feed(engine, [95, 50, 95]), [(0, TRIGGERED), (1, CLEARED), (2, TRIGGERED)])
+
+
+class SetRulesTest(unittest.TestCase):
+    def test_state_of_kept_rules_carries_over(self):
+        engine = GuardrailEngine([rule(duration=0), rule(name="other", duration=0)])
+        feed(engine, [95])
+        engine.set_rules([rule(duration=0, clear_duration=5), rule(name="new", duration=0)])
+        status = {entry["name"]: entry for entry in engine.status()}
+        self.assertEqual(set(status), {"hot", "new"})
+        self.assertTrue(status["hot"]["triggered"])
+        self.assertFalse(status["new"]["triggered"])
+        # Still triggered, so only a clear follows, under the new clear_duration
+        self.assertEqual(feed(engine, [50] * 7, start=1), [(6, CLEARED)])
+
+    def test_partial_breach_carries_over(self):
+        engine = GuardrailEngine([rule(duration=5)])
+        feed(engine, [95] * 3)
+        engine.set_rules([rule(duration=5, action="log")])
+        self.assertEqual(feed(engine, [95] * 3, start=3), [(5, TRIGGERED)])
+
+
+class ActionTest(unittest.TestCase):
+    def test_result_of_action_is_stored(self):
+        seen = []
+
+        def on_action(event):
+            seen.append(event.phase)
+            return f"{event.phase} done"
+
+        engine = GuardrailEngine([rule(duration=0, clear_duration=0)], on_action=on_action)
+        events = [event for t, value in enumerate([95, 50]) for event in engine.evaluate(t, {"cpu": value})]
+        self.assertEqual(seen, [TRIGGERED, CLEARED])
+        self.assertEqual([event.result for event in events], ["triggered done", "cleared done"])
+        self.assertEqual(list(engine.events), events)
+
+    def test_action_exception_becomes_result(self):
+        def on_action(event):
+            raise RuntimeError("no such service")
+
+        engine = GuardrailEngine([rule(duration=0)], on_action=on_action)
+        events = engine.evaluate(0, {"cpu": 95})
+        self.assertEqual(events[0].result, "error: no such service")
+        self.assertEqual(engine.events[-1].result, "error: no such service")
+
+    def test_history_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            history = GuardrailHistory(os.path.join(directory, "guardrail_actions.jsonl"))
+            engine = GuardrailEngine([rule(duration=1)], history=history)
+            events = [event for t in range(3) for event in engine.evaluate(t, {"cpu": 95})]
+            self.assertEqual(history.load(), events)
+
+
+class ParseRuleTest(unittest.TestCase):
+    def test_above(self):
+        parsed = parse_rule({"name": "r", "metric": "cpu", "above": 90})
+        self.assertEqual((parsed.threshold, parsed.above), (90.0, True))
+
+    def test_below(self):
+        parsed = parse_rule({"name": "r", "metric": "cpu", "below": "10"})
+        self.assertEqual((parsed.threshold, parsed.above), (10.0, False))
+
+    def test_above_and_below(self):
+        with self.assertRaises(ValueError):
+            parse_rule({"name": "r", "metric": "cpu", "above": 90, "below": 10})
+
+    def test_unknown_action(self):
+        with self.assertRaises(ValueError):
+            parse_rule({"name": "r", "metric": "cpu", "above": 90, "action": "reboot"})
+
+    def test_action_needs_service(self):
+        with self.assertRaises(ValueError):
+            parse_rule({"name": "r", "metric": "cpu", "above": 90, "action": "pause"})
+        self.assertEqual(parse_rule({"name": "r", "metric": "cpu", "above": 90, "action": "pause",
+                                     "service": "ollama"}).service, "ollama")
+
+    def test_not_a_rule(self):
+        with self.assertRaises(TypeError):
+            parse_rule(["cpu", 90])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Parsers and GPU matching of hardware_inventory, run against recorded macOS output."""
+import os
+import unittest
+
+from gpu_backends import AppleGPUBackend
+from hardware_inventory import (HardwareInventory, match_accelerators, parse_ioreg_accelerators,
+                                parse_system_profiler_displays, parse_vram_mb)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+
+class ParseSystemProfilerTest(unittest.TestCase):
+    def test_apple_silicon(self):
+        gpus = parse_system_profiler_displays(fixture("system_profiler_apple_silicon.txt"))
+        self.assertEqual(gpus, [{"name": "Apple M1 Pro", "metal": True, "cores": 16, "vendor": "Apple (0x106b)"}])
+
+    def test_intel_and_amd(self):
+        gpus = parse_system_profiler_displays(fixture("system_profiler_intel_amd.txt"))
+        self.assertEqual([gpu["name"] for gpu in gpus], ["Intel UHD Graphics 630", "AMD Radeon Pro 5500M"])
+        self.assertEqual([gpu["vram"] for gpu in gpus], [1536, 8192])
+        self.assertTrue(all(gpu["metal"] for gpu in gpus))
+        self.assertEqual(gpus[1]["vendor"], "AMD (0x1002)")
+
+    def test_displays_section_is_skipped(self):
+        gpus = parse_system_profiler_displays(fixture("system_profiler_intel_amd.txt"))
+        self.assertNotIn("Color LCD", [gpu["name"] for gpu in gpus])
+        self.assertEqual(len(gpus), 2)
+
+    def test_empty_output(self):
+        self.assertEqual(parse_system_profiler_displays(""), [])
+
+    def test_vram(self):
+        self.assertEqual(parse_vram_mb("1536 MB"), 1536)
+        self.assertEqual(parse_vram_mb("8 GB"), 8192)
+        self.assertIsNone(parse_vram_mb("unknown"))
+
+
+class ParseIoregTest(unittest.TestCase):
+    def test_apple_silicon(self):
+        accelerators = parse_ioreg_accelerators(fixture("ioreg_apple_silicon.txt"))
+        self.assertEqual(len(accelerators), 1)
+        accelerator = accelerators[0]
+        self.assertEqual(accelerator["utilization"], 23.0)
+        self.assertEqual(accelerator["model"], "Apple M1 Pro")
+        self.assertEqual(accelerator["registry_name"], "AGXAcceleratorG13X")
+        # "In use system memory (driver)" must not be mistaken for the total
+        self.assertAlmostEqual(accelerator["memory_used_mb"], 584.0, places=0)
+
+    def test_intel_and_amd(self):
+        accelerators = parse_ioreg_accelerators(fixture("ioreg_intel_amd.txt"))
+        self.assertEqual([a["registry_name"] for a in accelerators],
+                         ["AMDRadeonX6000_AMDNavi14GraphicsAccelerator", "IntelAccelerator"])
+        self.assertEqual([a["utilization"] for a in accelerators], [37.0, 4.0])
+        self.assertNotIn("model", accelerators[1])
+
+    def test_accelerator_without_statistics_is_skipped(self):
+        output = '+-o IntelAccelerator  <class IntelAccelerator>\n    {\n      "IOClass" = "IntelAccelerator"\n    }\n'
+        self.assertEqual(parse_ioreg_accelerators(output), [])
+
+
+class MatchAcceleratorsTest(unittest.TestCase):
+    def test_listed_in_different_order(self):
+        gpus = parse_system_profiler_displays(fixture("system_profiler_intel_amd.txt"))
+        accelerators = parse_ioreg_accelerators(fixture("ioreg_intel_amd.txt"))
+        intel, amd = match_accelerators(gpus, accelerators)
+        # AMD by model name, Intel by its driver's vendor
+        self.assertEqual(amd["utilization"], 37.0)
+        self.assertEqual(intel["utilization"], 4.0)
+
+    def test_unmatched_gpu_gets_nothing(self):
+        gpus = [{"name": "Intel UHD Graphics 630", "vendor": "Intel"}, {"name": "AMD Radeon Pro 5500M"}]
+        accelerators = [{"utilization": 50.0, "registry_name": "AMDRadeonX6000_AMDNavi14GraphicsAccelerator"}]
+        self.assertEqual(match_accelerators(gpus, accelerators), [None, accelerators[0]])
+
+    def test_ambiguous_vendor_is_not_guessed(self):
+        gpus = [{"name": "AMD Radeon Pro W5700X"}, {"name": "AMD Radeon Pro W5700X"}]
+        accelerators = [{"utilization": 10.0, "registry_name": "AMDRadeonX6000_AMDNavi10GraphicsAccelerator"},
+                        {"utilization": 90.0, "registry_name": "AMDRadeonX6000_AMDNavi10GraphicsAccelerator"}]
+        self.assertEqual(match_accelerators(gpus, accelerators), [None, None])
+
+    def test_single_gpu_falls_back_to_position(self):
+        gpus = [{"name": "Some GPU"}]
+        accelerators = [{"utilization": 12.0, "registry_name": "UnknownAccelerator"}]
+        self.assertEqual(match_accelerators(gpus, accelerators), accelerators)
+
+
+class AppleGPUBackendTest(unittest.TestCase):
+    def test_read_pairs_stats_with_the_right_gpu(self):
+        inventory = HardwareInventory(profiler=lambda: fixture("system_profiler_intel_amd.txt"))
+        backend = AppleGPUBackend(inventory, ioreg=lambda: fixture("ioreg_intel_amd.txt"))
+        backend.open()
+        intel, amd = backend.read()
+        self.assertEqual((intel.name, intel.utilization), ("Intel UHD Graphics 630", 4.0))
+        self.assertEqual((amd.name, amd.utilization), ("AMD Radeon Pro 5500M", 37.0))
+        self.assertEqual(amd.memory_total_mb, 8192)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""PipOutputParser on recorded pip output, and Installer bookkeeping without running pip."""
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from installer import (BUILDING, DOWNLOADING, INSTALLING, LATEST, RESOLVING, InstallError, Installer,
+                       PipOutputParser)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def parse(name, expected=None):
+    parser = PipOutputParser("0.6.5", expected)
+    with open(os.path.join(FIXTURES, name)) as f:
+        events = [event for event in map(parser.feed, f) if event is not None]
+    return parser, events
+
+
+class PipOutputParserTest(unittest.TestCase):
+    def test_wheel_download(self):
+        parser, events = parse("pip_wheel_output.txt", expected=40)
+        self.assertEqual(parser.collected, 5)
+        # Metadata fetched while resolving is not a download
+        self.assertEqual(parser.downloaded, 3)
+        downloads = [event.message for event in events if event.phase == DOWNLOADING]
+        self.assertEqual(downloads, ["Downloading peewee (3.0 MB)", "Downloading open_webui (129.4 MB)",
+                                     "Downloading aiofiles (15 kB)"])
+        self.assertIn("Using cached aiocache", [event.message for event in events if event.phase == RESOLVING])
+        self.assertEqual({event.package for event in events if event.phase == BUILDING}, {"peewee"})
+        self.assertEqual([event.done for event in events if event.phase == RESOLVING][:5], [1, 2, 2, 3, 4])
+        self.assertTrue(all(event.total == 40 for event in events))
+        self.assertEqual(parser.errors, [])
+
+    def test_install_from_wheelhouse(self):
+        parser, events = parse("pip_install_output.txt")
+        self.assertEqual([event.package for event in events if event.phase == RESOLVING],
+                         ["open_webui", "aiocache", "aiofiles", "fastapi", "peewee"])
+        installing = [event for event in events if event.phase == INSTALLING]
+        self.assertEqual([(event.message, event.done, event.total) for event in installing],
+                         [("Installing 5 packages", 0, 5), ("Installed 5 packages", 5, 5)])
+        self.assertEqual(parser.installing, ["peewee", "aiofiles", "aiocache", "fastapi", "open-webui"])
+        self.assertEqual(parser.installed, 5)
+
+    def test_expected_total_is_dropped_once_exceeded(self):
+        _, events = parse("pip_install_output.txt", expected=3)
+        self.assertEqual([event.total for event in events if event.phase == RESOLVING], [3, 3, 3, None, None])
+
+    def test_errors(self):
+        parser, events = parse("pip_error_output.txt")
+        self.assertEqual(len(events), 2)
+        self.assertEqual(parser.errors[-1], "No matching distribution found for open-webui==9.9.9")
+
+
+class InstallerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.installer = Installer(root=directory.name)
+
+    def fake_install(self, version):
+        path = os.path.join(self.installer.envs_dir, version)
+        os.makedirs(path)
+        self.installer._write_record(path, version, 120, 30.0)
+        return path
+
+    def test_installed_and_use(self):
+        self.fake_install("0.6.4")
+        self.fake_install("0.6.5")
+        self.assertEqual({record.version for record in self.installer.installed()}, {"0.6.4", "0.6.5"})
+        self.assertIsNone(self.installer.current())
+        self.installer.use("0.6.4")
+        self.assertEqual(self.installer.current().version, "0.6.4")
+        self.assertEqual(self.installer.command_for(), self.installer.get("0.6.4").command)
+        with self.assertRaises(InstallError):
+            self.installer.use("0.1.0")
+
+    def test_remove_refuses_the_current_version_unless_forced(self):
+        path = self.fake_install("0.6.5")
+        self.installer.use("0.6.5")
+        with self.assertRaises(InstallError):
+            self.installer.remove("0.6.5")
+        self.assertTrue(os.path.isdir(path))
+        self.assertTrue(self.installer.remove("0.6.5", force=True))
+        self.assertFalse(os.path.exists(path))
+        self.assertIsNone(self.installer.current())
+        self.assertFalse(self.installer.remove("0.6.5"))
+
+    def test_remove_waits_for_an_install_of_the_same_version(self):
+        path = self.fake_install("0.6.5")
+        lock = self.installer._version_lock("0.6.5")
+        lock.acquire()
+        removed = []
+        thread = threading.Thread(target=lambda: removed.append(self.installer.remove("0.6.5")))
+        thread.start()
+        time.sleep(0.1)
+        self.assertEqual(removed, [])
+        self.assertTrue(os.path.isdir(path))
+        lock.release()
+        thread.join(5)
+        self.assertEqual(removed, [True])
+
+    def test_resolve_explicit_version(self):
+        with mock.patch("installer.subprocess.run") as run:
+            self.assertEqual(self.installer.resolve_version("0.6.5"), "0.6.5")
+        run.assert_not_called()
+
+    def test_resolve_latest_from_the_index(self):
+        output = "open-webui (0.6.5)\nAvailable versions: 0.6.5, 0.6.4, 0.6.3\n"
+        with mock.patch("installer.subprocess.run",
+                        return_value=subprocess.CompletedProcess([], 0, output, "")) as run:
+            self.assertEqual(self.installer.resolve_version(None), "0.6.5")
+            self.assertEqual(self.installer.resolve_version(LATEST), "0.6.5")
+        self.assertEqual(run.call_args[0][0][-3:], ["index", "versions", "open-webui"])
+
+    def test_resolve_latest_from_the_wheelhouse(self):
+        for name in ("open_webui-0.6.10-py3-none-any.whl", "open_webui-0.6.9-py3-none-any.whl",
+                     "fastapi-0.115.7-py3-none-any.whl"):
+            open(os.path.join(self.installer.wheelhouse, name), "w").close()
+        failed = subprocess.CompletedProcess([], 1, "", "ERROR: no network")
+        with mock.patch("installer.subprocess.run", return_value=failed):
+            self.assertEqual(self.installer.resolve_version(None), "0.6.10")
+        self.assertEqual(self.installer.resolve_version(None, offline=True), "0.6.10")
+
+    def test_unresolvable_latest_stays_latest(self):
+        self.assertEqual(self.installer.resolve_version(None, offline=True), LATEST)
+
+    def test_install_locks_the_resolved_version(self):
+        self.fake_install("0.6.5")
+        locked = []
+
+        def install(version, on_event, offline):
+            locked.append((version, self.installer._version_lock(version).locked()))
+            return self.installer.get(version)
+
+        with mock.patch.object(self.installer, "resolve_version", return_value="0.6.5"), \
+                mock.patch.object(self.installer, "_install", side_effect=install):
+            self.assertEqual(self.installer.install().version, "0.6.5")
+        self.assertEqual(locked, [("0.6.5", True)])
+        self.assertNotIn(LATEST, self.installer._version_locks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""ServiceLifecycle driven against a real sleeping child process."""
+import os
+import sys
+import time
+import unittest
+
+import psutil
+
+from lifecycle import CRASHED, HEALTHY, STOPPED, ServiceLifecycle
+
+SLEEP = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+
+class NotReady:
+    ready = False
+    error = "timed out after 0.1 s"
+
+
+class LifecycleTestCase(unittest.TestCase):
+    def start(self, readiness_check=None):
+        events = []
+        lifecycle = ServiceLifecycle("test", stop_timeout=2.0, readiness_check=readiness_check,
+                                     on_state_change=lambda old, new, info: events.append((new, info)))
+        self.addCleanup(lifecycle.stop, wait=True)
+        self.assertTrue(lifecycle.start(SLEEP, shell=False))
+        return lifecycle, events
+
+    def wait_state(self, lifecycle, *states):
+        self.assertTrue(lifecycle.wait_for(lambda state: state in states, 10.0), lifecycle.state)
+
+
+class ReadinessTest(LifecycleTestCase):
+    def test_ready_check_makes_healthy(self):
+        lifecycle, events = self.start(lambda process, started, should_continue: True)
+        self.wait_state(lifecycle, HEALTHY)
+
+    def test_not_ready_crashes_and_terminates(self):
+        lifecycle, events = self.start(lambda process, started, should_continue: NotReady())
+        self.wait_state(lifecycle, CRASHED, STOPPED)
+        self.assertEqual(lifecycle.state, CRASHED)
+        self.assertIsNotNone(lifecycle.process.poll())
+        self.assertEqual(events[-1][1]["error"], "Not ready: timed out after 0.1 s")
+
+    def test_raising_check_crashes(self):
+        def check(process, started, should_continue):
+            raise RuntimeError("probe broke")
+
+        lifecycle, events = self.start(check)
+        self.wait_state(lifecycle, CRASHED, STOPPED)
+        self.assertEqual(lifecycle.state, CRASHED)
+        self.assertEqual(lifecycle.error, "Readiness check failed: probe broke")
+
+    def test_stop_during_check_ends_stopped(self):
+        def check(process, started, should_continue):
+            while should_continue():
+                time.sleep(0.01)
+            return NotReady()
+
+        lifecycle, events = self.start(check)
+        lifecycle.stop()
+        self.wait_state(lifecycle, CRASHED, STOPPED)
+        self.assertEqual(lifecycle.state, STOPPED)
+
+
+@unittest.skipIf(os.name == "nt", "process status and niceness are checked the POSIX way")
+class ProcessControlTest(LifecycleTestCase):
+    def status(self, lifecycle):
+        return psutil.Process(lifecycle.process.pid).status()
+
+    def wait_status(self, lifecycle, status):
+        deadline = time.monotonic() + 5.0
+        while self.status(lifecycle) != status and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.status(lifecycle), status)
+
+    def test_pause_and_resume(self):
+        lifecycle, _ = self.start()
+        self.wait_state(lifecycle, HEALTHY)
+        self.assertTrue(lifecycle.pause())
+        self.assertTrue(lifecycle.paused)
+        self.assertFalse(lifecycle.pause())
+        self.wait_status(lifecycle, psutil.STATUS_STOPPED)
+
+        self.assertTrue(lifecycle.resume())
+        self.assertFalse(lifecycle.paused)
+        self.assertFalse(lifecycle.resume())
+        self.wait_status(lifecycle, psutil.STATUS_SLEEPING)
+
+    def test_stop_while_paused(self):
+        lifecycle, _ = self.start()
+        self.wait_state(lifecycle, HEALTHY)
+        lifecycle.pause()
+        started = time.monotonic()
+        lifecycle.stop(wait=True)
+        self.assertEqual(lifecycle.state, STOPPED)
+        self.assertFalse(lifecycle.paused)
+        # Ended by the SIGTERM, not the SIGKILL after stop_timeout
+        self.assertLess(time.monotonic() - started, lifecycle.stop_timeout)
+
+    def test_nothing_to_pause(self):
+        lifecycle = ServiceLifecycle("idle")
+        self.assertFalse(lifecycle.pause())
+        self.assertFalse(lifecycle.resume())
+        self.assertEqual(lifecycle.set_niceness(5), 0)
+
+    def test_set_niceness(self):
+        lifecycle, _ = self.start()
+        self.wait_state(lifecycle, HEALTHY)
+        niceness = min(os.nice(0) + 5, 19)
+        self.assertEqual(lifecycle.set_niceness(niceness), 1)
+        self.assertEqual(psutil.Process(lifecycle.process.pid).nice(), niceness)
+
+
+if __name__ == "__main__":
+    unittest.main()
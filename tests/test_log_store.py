@@ -0,0 +1,141 @@
+"""Run capture, rotation, indexed search and index rebuilds of LogStore."""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import log_store
+from log_store import INDEX_FILE, LogStore
+
+START = time.mktime((2024, 5, 1, 12, 0, 0, 0, 0, -1))
+
+
+def lines_for(second):
+    return [f"INFO:     request {second}",
+            f"WARNING:  slow request {second}" if second % 5 == 0 else f"DEBUG:    detail {second}",
+            f"ERROR:    failed {second}" if second % 10 == 0 else f"INFO:     done {second}"]
+
+
+class LogStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = LogStore(self.root, max_runs=3)
+
+    def capture(self, seconds=60, **options):
+        writer = self.store.start_run("open-webui serve", **options)
+        for second in range(seconds):
+            writer.write_lines(lines_for(second), START + second)
+        writer.close()
+        return writer
+
+
+class WriterTest(LogStoreTestCase):
+    def test_batches_are_written_in_order(self):
+        writer = self.capture(20)
+        self.assertEqual(writer.meta["lines"], 60)
+        self.assertIsNotNone(writer.meta["ended"])
+        with open(os.path.join(writer.run_dir, "000000.log")) as f:
+            written = f.read().splitlines()
+        self.assertEqual(len(written), 60)
+        self.assertTrue(written[0].endswith(" INFO:     request 0"))
+        self.assertTrue(written[0].startswith("2024-05-01T12:00:00.000"))
+        self.assertEqual(self.store.runs()[0]["lines"], 60)
+
+    def test_single_lines(self):
+        writer = self.store.start_run()
+        writer.write("ERROR: one\n", START)
+        writer.write("INFO: two", START + 1)
+        writer.close()
+        self.assertEqual([match.text for match in self.store.search()], ["ERROR: one", "INFO: two"])
+
+    def test_rotation_by_size(self):
+        writer = self.capture(60, max_bytes=1024)
+        segments = sorted(name for name in os.listdir(writer.run_dir) if name.endswith(".log"))
+        self.assertGreater(len(segments), 5)
+        self.assertEqual(segments[0], "000000.log")
+        matches = self.store.search()
+        self.assertEqual(len(matches), 180)
+        self.assertEqual([match.text for match in matches][-3:], lines_for(59))
+        self.assertEqual(len(self.store.search(level="ERROR")), 6)
+
+    def test_rotation_by_time(self):
+        writer = self.capture(60, rotate_seconds=10)
+        segments = [name for name in os.listdir(writer.run_dir) if name.endswith(".log")]
+        self.assertEqual(len(segments), 6)
+        matches = self.store.search(since=START + 25, until=START + 34)
+        self.assertEqual({int(match.text.split()[-1]) for match in matches}, set(range(25, 35)))
+
+    def test_old_runs_are_pruned(self):
+        for _ in range(5):
+            self.capture(1)
+        self.assertEqual(len(self.store.run_ids()), 3)
+
+
+class SearchTest(LogStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.capture(60)
+
+    def texts(self, **query):
+        return [match.text for match in self.store.search(**query)]
+
+    def test_indexed_levels(self):
+        self.assertEqual(self.texts(level="ERROR"), [f"ERROR:    failed {n}" for n in range(0, 60, 10)])
+        warnings = self.store.search(level="WARNING")
+        self.assertEqual(len(warnings), 18)
+        self.assertEqual({match.level for match in warnings}, {"WARNING", "ERROR"})
+
+    def test_scanned_levels(self):
+        self.assertEqual(len(self.texts(level="INFO")), 60 + 54 + 12 + 6)
+        self.assertEqual(len(self.texts()), 180)
+
+    def test_pattern(self):
+        self.assertEqual(self.texts(pattern=r"failed [12]0\b"), ["ERROR:    failed 10", "ERROR:    failed 20"])
+        self.assertEqual(self.texts(pattern="slow", level="ERROR"), [])
+        # Digits of the timestamp prefix are not part of the text
+        self.assertEqual(self.texts(pattern="^2024"), [])
+
+    def test_time_range(self):
+        matches = self.store.search(since=START + 10, until=START + 19.5)
+        self.assertEqual(len(matches), 30)
+        self.assertTrue(all(START + 10 <= match.timestamp <= START + 19.5 for match in matches))
+        self.assertEqual(self.texts(level="ERROR", since=START + 15, until=START + 45),
+                         ["ERROR:    failed 20", "ERROR:    failed 30", "ERROR:    failed 40"])
+
+    def test_limit_keeps_the_newest(self):
+        self.assertEqual(self.texts(limit=2), ["DEBUG:    detail 59", "INFO:     done 59"])
+
+    def test_scan_in_small_chunks(self):
+        with mock.patch.object(log_store, "_SCAN_CHUNK", 100):
+            self.assertEqual(self.texts(), [line for second in range(60) for line in lines_for(second)])
+
+
+class RebuildTest(LogStoreTestCase):
+    def test_rebuilt_index_matches_the_written_one(self):
+        writer = self.capture(60, max_bytes=2048)
+        path = os.path.join(writer.run_dir, INDEX_FILE)
+        with open(path, "rb") as f:
+            written = f.read()
+        self.assertGreater(self.store.rebuild_index(writer.run_id), 0)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), written)
+
+    def test_lost_index_is_rebuilt_on_search(self):
+        writer = self.capture(60)
+        expected = self.store.search(level="ERROR")
+        os.remove(os.path.join(writer.run_dir, INDEX_FILE))
+        self.assertEqual(self.store.search(level="ERROR"), expected)
+        self.assertTrue(os.path.exists(os.path.join(writer.run_dir, INDEX_FILE)))
+
+    def test_truncated_index_record_is_ignored(self):
+        writer = self.capture(60)
+        with open(os.path.join(writer.run_dir, INDEX_FILE), "ab") as f:
+            f.write(b"\x01\x02\x03")
+        self.assertEqual(len(self.store.search(level="ERROR")), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""LogBuffer capacity and LogView trimming and autoscroll."""
+import tkinter as tk
+import unittest
+
+from log_buffer import LogBuffer
+from log_view import LogView
+
+
+class LogBufferTest(unittest.TestCase):
+    def test_keeps_the_newest_lines(self):
+        buffer = LogBuffer(max_lines=5)
+        buffer.extend([f"line {n}" for n in range(3)])
+        buffer.extend([f"line {n}" for n in range(3, 8)])
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(buffer.max_lines, 5)
+        self.assertEqual(buffer.tail(10), [f"line {n}" for n in range(3, 8)])
+        self.assertEqual(buffer.total_lines, 8)
+
+    def test_tail(self):
+        buffer = LogBuffer(max_lines=100)
+        buffer.extend([str(n) for n in range(10)])
+        self.assertEqual(buffer.tail(3), ["7", "8", "9"])
+        self.assertEqual(buffer.tail(0), [])
+        self.assertEqual(buffer.tail(10), [str(n) for n in range(10)])
+
+    def test_batch_larger_than_capacity(self):
+        buffer = LogBuffer(max_lines=3)
+        buffer.extend([str(n) for n in range(10)])
+        self.assertEqual(buffer.tail(3), ["7", "8", "9"])
+
+    def test_clear_keeps_total(self):
+        buffer = LogBuffer(max_lines=3)
+        buffer.extend(["a", "b"])
+        buffer.clear()
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.total_lines, 2)
+
+
+class FakeText:
+    """The parts of a Tk text widget LogView uses, with a settable scroll position."""
+
+    def __init__(self):
+        self.lines = []
+        self.at_bottom = True
+        self.scrolled_to_end = 0
+        self.state = None
+
+    def yview(self):
+        return (0.0, 1.0) if self.at_bottom else (0.0, 0.5)
+
+    def config(self, state):
+        self.state = state
+
+    def insert(self, index, text):
+        assert index == tk.END
+        self.lines.extend(text.split("\n")[:-1])
+
+    def delete(self, start, end):
+        assert start == "1.0"
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        self.scrolled_to_end += 1
+
+
+class LogViewTest(unittest.TestCase):
+    def setUp(self):
+        self.widget = FakeText()
+        self.view = LogView(self.widget, max_lines=100, buffer=LogBuffer(1000))
+
+    def test_widget_is_trimmed_in_chunks(self):
+        self.view.append([str(n) for n in range(100)])
+        self.view.append([str(n) for n in range(100, 109)])
+        # Within the slack: nothing deleted yet
+        self.assertEqual(len(self.widget.lines), 109)
+        self.view.append(["109"])
+        self.assertEqual(self.widget.lines, [str(n) for n in range(10, 110)])
+        self.assertEqual(len(self.view.buffer), 110)
+        self.assertEqual(self.widget.state, tk.DISABLED)
+
+    def test_burst_larger_than_view_inserts_only_its_tail(self):
+        self.view.append([str(n) for n in range(500)])
+        self.assertEqual(self.widget.lines, [str(n) for n in range(400, 500)])
+        self.assertEqual(len(self.view.buffer), 500)
+
+    def test_autoscroll_only_at_bottom(self):
+        self.view.append(["a"])
+        self.assertEqual(self.widget.scrolled_to_end, 1)
+        self.widget.at_bottom = False
+        self.view.append(["b"])
+        self.assertEqual(self.widget.scrolled_to_end, 1)
+        self.widget.at_bottom = True
+        self.view.append(["c"])
+        self.assertEqual(self.widget.scrolled_to_end, 2)
+
+    def test_empty_batch_is_ignored(self):
+        self.view.append([])
+        self.assertEqual((self.widget.lines, self.widget.state), ([], None))
+
+    def test_clear(self):
+        self.view.append(["a", "b"])
+        self.widget.delete = lambda start, end: self.widget.lines.clear()
+        self.view.clear()
+        self.assertEqual(self.widget.lines, [])
+        self.assertEqual(len(self.view.buffer), 0)
+
+
+class TkLogViewTest(unittest.TestCase):
+    """The same behaviour on a real text widget, where a display is available."""
+
+    def setUp(self):
+        try:
+            self.root = tk.Tk()
+        except tk.TclError as e:
+            self.skipTest(f"no display: {e}")
+        self.addCleanup(self.root.destroy)
+        self.widget = tk.Text(self.root, height=10)
+        self.widget.pack()
+        self.root.update()
+        self.view = LogView(self.widget, max_lines=100)
+
+    def widget_lines(self):
+        return self.widget.get("1.0", "end-1c").splitlines()
+
+    def test_trims_to_max_lines(self):
+        for start in range(0, 300, 30):
+            self.view.append([str(n) for n in range(start, start + 30)])
+        lines = self.widget_lines()
+        self.assertLess(len(lines), 100 + self.view.trim_slack)
+        self.assertEqual(lines[-1], "299")
+        self.assertEqual(self.widget.cget("state"), tk.DISABLED)
+
+    def test_follows_new_lines_at_bottom(self):
+        self.view.append([str(n) for n in range(50)])
+        self.root.update()
+        self.assertEqual(self.widget.yview()[1], 1.0)
+        self.view.append([str(n) for n in range(50, 60)])
+        self.root.update()
+        self.assertEqual(self.widget.yview()[1], 1.0)
+
+    def test_stays_put_when_scrolled_up(self):
+        self.view.append([str(n) for n in range(50)])
+        self.root.update()
+        self.widget.yview_moveto(0.0)
+        self.root.update()
+        self.view.append([str(n) for n in range(50, 60)])
+        self.root.update()
+        self.assertEqual(self.widget.yview()[0], 0.0)
+        self.assertLess(self.widget.yview()[1], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+"""MetricsSampler snapshots and listeners, driven by in-process collectors."""
+import threading
+import time
+import unittest
+from unittest import mock
+
+import metrics_sampler
+from collectors import EXPENSIVE, MAX_DUTY, Collector
+from metrics_sampler import MetricsSampler
+
+
+class CountingCollector(Collector):
+    def __init__(self, name, values=None):
+        self.name = name
+        self.values_to_return = list(values or [])
+        self.runs = 0
+        self.opened = 0
+
+    def open(self):
+        self.opened += 1
+
+    def collect(self):
+        self.runs += 1
+        if self.values_to_return:
+            value = self.values_to_return.pop(0)
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return {"percent": float(self.runs), "used": self.runs, "total": 100}
+
+
+class SlowOpenCollector(CountingCollector):
+    slow_open = True
+
+
+class Clock:
+    """Stands in for the time module inside metrics_sampler; only advances when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = thread_time = time = monotonic
+
+
+class CostlyCollector(CountingCollector):
+    """Takes `seconds` of (fake) wall time per collect()."""
+
+    def __init__(self, name, clock, seconds, cost=None, interval=None):
+        super().__init__(name)
+        self.clock = clock
+        self.seconds = seconds
+        if cost is not None:
+            self.cost = cost
+        self.interval = interval
+
+    def collect(self):
+        self.clock.now += self.seconds
+        return super().collect()
+
+
+class LatestTest(unittest.TestCase):
+    def test_none_before_first_sample(self):
+        sampler = MetricsSampler(collectors=[CountingCollector("cpu")])
+        self.assertIsNone(sampler.latest())
+        self.assertEqual(sampler.stats()["samples"], 0)
+
+    def test_latest_is_the_published_snapshot(self):
+        sampler = MetricsSampler(collectors=[CountingCollector("cpu"), CountingCollector("memory")])
+        first = sampler.sample_once()
+        self.assertIs(sampler.latest(), first)
+        self.assertEqual(first.cpu_percent, 1.0)
+        self.assertEqual(first.memory_used, 1)
+        second = sampler.sample_once()
+        self.assertIs(sampler.latest(), second)
+        # Earlier snapshots are left as they were
+        self.assertEqual(first.cpu_percent, 1.0)
+        self.assertEqual(second.cpu_percent, 2.0)
+
+    def test_snapshot_readings_are_read_only(self):
+        sampler = MetricsSampler(collectors=[CountingCollector("cpu")])
+        snapshot = sampler.sample_once()
+        with self.assertRaises(TypeError):
+            snapshot.readings["cpu"] = None
+        with self.assertRaises(TypeError):
+            snapshot.processes["x"] = None
+
+    def test_missing_collectors_give_defaults(self):
+        snapshot = MetricsSampler(collectors=[]).sample_once()
+        self.assertEqual((snapshot.cpu_percent, snapshot.memory_percent, snapshot.memory_used), (0.0, 0.0, 0))
+        self.assertEqual(snapshot.gpus, ())
+        self.assertEqual(snapshot.gpu_error, "No GPU backend available")
+
+    def test_failing_collector_keeps_previous_reading(self):
+        cpu = CountingCollector("cpu", [{"percent": 7.0}, RuntimeError("gone")])
+        sampler = MetricsSampler(collectors=[cpu])
+        sampler.sample_once()
+        snapshot = sampler.sample_once()
+        self.assertEqual(snapshot.cpu_percent, 7.0)
+        self.assertEqual(sampler.stats()["collectors"][0]["error"], "gone")
+
+    def test_deferred_slow_open(self):
+        slow = SlowOpenCollector("slow")
+        sampler = MetricsSampler(collectors=[CountingCollector("cpu"), slow])
+        snapshot = sampler.sample_once(defer_slow_open=True)
+        self.assertIsNone(snapshot.readings["slow"])
+        self.assertEqual((slow.opened, slow.runs), (0, 0))
+        snapshot = sampler.sample_once(defer_slow_open=True)
+        self.assertIsNone(snapshot.readings["slow"])
+        snapshot = sampler.sample_once()
+        self.assertEqual((slow.opened, slow.runs), (1, 1))
+        self.assertIsNotNone(snapshot.readings["slow"])
+
+    def test_register_rejects_duplicate_names(self):
+        sampler = MetricsSampler(collectors=[CountingCollector("cpu")])
+        with self.assertRaises(ValueError):
+            sampler.register(CountingCollector("cpu"))
+        sampler.register(CountingCollector("extra"))
+        self.assertIn("extra", sampler.sample_once().readings)
+
+
+class ListenerTest(unittest.TestCase):
+    def test_listeners_get_every_snapshot(self):
+        sampler = MetricsSampler(collectors=[CountingCollector("cpu")])
+        seen = []
+        sampler.add_listener(seen.append)
+        snapshots = [sampler.sample_once() for _ in range(3)]
+        self.assertEqual(seen, snapshots)
+
+    def test_failing_listener_does_not_stop_the_others(self):
+        sampler = MetricsSampler(collectors=[CountingCollector("cpu")])
+        seen = []
+
+        def broken(snapshot):
+            raise RuntimeError("listener broke")
+
+        sampler.add_listener(broken)
+        sampler.add_listener(seen.append)
+        snapshot = sampler.sample_once()
+        self.assertEqual(seen, [snapshot])
+        self.assertIs(sampler.latest(), snapshot)
+
+    def test_listener_runs_on_the_worker_thread(self):
+        sampler = MetricsSampler(interval=0.05, collectors=[CountingCollector("cpu")])
+        threads = []
+        published = threading.Event()
+
+        def listener(snapshot):
+            threads.append(threading.current_thread())
+            published.set()
+
+        sampler.add_listener(listener)
+        sampler.start()
+        self.addCleanup(sampler.stop)
+        self.assertTrue(published.wait(5))
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual(threads[0].name, "metrics-sampler")
+
+
+class WorkerTest(unittest.TestCase):
+    def test_start_publishes_and_stop_closes(self):
+        closed = []
+
+        class Closing(CountingCollector):
+            def close(self):
+                closed.append(self.name)
+
+        sampler = MetricsSampler(interval=0.05, collectors=[Closing("cpu")])
+        sampler.start()
+        deadline = time.monotonic() + 5
+        while sampler.stats()["samples"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sampler.stop()
+        self.assertGreaterEqual(sampler.stats()["samples"], 3)
+        self.assertEqual(closed, ["cpu"])
+        samples = sampler.stats()["samples"]
+        time.sleep(0.15)
+        self.assertEqual(sampler.stats()["samples"], samples)
+
+
+class SchedulingTest(unittest.TestCase):
+    """Collectors on a 1 s sampler, driven tick by tick on a fake clock."""
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(metrics_sampler, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_ticks(self, collectors, ticks):
+        sampler = MetricsSampler(interval=1.0, collectors=collectors)
+        snapshots = []
+        for _ in range(ticks):
+            tick = self.clock.now
+            snapshots.append(sampler.sample_once())
+            self.clock.now = tick + 1.0
+        return sampler, snapshots
+
+    def test_cheap_collector_runs_every_tick(self):
+        collector = CostlyCollector("cpu", self.clock, 0.001)
+        self.run_ticks([collector], 40)
+        self.assertEqual(collector.runs, 40)
+
+    def test_declared_interval_with_half_tick_slack(self):
+        every_other = CostlyCollector("sensors", self.clock, 0.0, interval=2.0)
+        expensive = CostlyCollector("disk", self.clock, 0.0, cost=EXPENSIVE)
+        self.run_ticks([every_other, expensive], 40)
+        self.assertEqual(every_other.runs, 20)
+        self.assertEqual(expensive.runs, 8)     # the 5 s default for expensive collectors
+
+    def test_slow_collector_is_stretched_to_max_duty(self):
+        slow = CostlyCollector("processes", self.clock, 0.2)
+        fast = CostlyCollector("cpu", self.clock, 0.001)
+        sampler, snapshots = self.run_ticks([slow, fast], 40)
+        # 0.2 s per run at 5 % duty is one run every 4 s instead of every tick
+        self.assertEqual(slow.runs, 10)
+        self.assertEqual(fast.runs, 40)
+        self.assertLessEqual(slow.runs * slow.seconds / 40.0, MAX_DUTY)
+        stats = {entry["name"]: entry for entry in sampler.stats()["collectors"]}
+        self.assertAlmostEqual(stats["processes"]["interval"], 0.2 / MAX_DUTY)
+        self.assertEqual(stats["cpu"]["interval"], 1.0)
+
+    def test_skipped_ticks_keep_the_previous_reading(self):
+        slow = CostlyCollector("processes", self.clock, 0.2)
+        _, snapshots = self.run_ticks([slow], 8)
+        readings = [snapshot.readings["processes"]["used"] for snapshot in snapshots]
+        self.assertEqual(readings, [1, 1, 1, 1, 2, 2, 2, 2])
+
+    def test_failing_collector_is_still_scheduled(self):
+        flaky = CostlyCollector("sensors", self.clock, 0.0, interval=2.0)
+        flaky.values_to_return = [RuntimeError("driver gone")]
+        sampler, snapshots = self.run_ticks([flaky], 4)
+        self.assertEqual(flaky.runs, 2)
+        self.assertIsNone(snapshots[0].readings["sensors"])
+        self.assertEqual(snapshots[2].readings["sensors"]["used"], 2)
+        self.assertIsNone(sampler.stats()["collectors"][0]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""OutputMultiplexer line splitting across reads, partial lines and EOF."""
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+import output_reader
+from output_reader import OutputMultiplexer, _Pipe
+
+
+class PipeFeedTest(unittest.TestCase):
+    """_Pipe.feed() fed by hand, one simulated read at a time."""
+
+    def setUp(self):
+        self.batches = []
+        self.pipe = _Pipe(None, self.batches.append, None)
+
+    def read(self, data):
+        self.pipe.buffer[:len(data)] = data
+        self.pipe.feed(len(data))
+
+    def test_line_split_across_reads(self):
+        self.read(b"first\nsec")
+        self.read(b"ond line")
+        self.read(b" ends here\nthird\nfou")
+        self.assertEqual(self.batches, [["first"], ["second line ends here", "third"]])
+        self.pipe.finish()
+        self.assertEqual(self.batches[-1], ["fou"])
+
+    def test_crlf_and_utf8_split_across_reads(self):
+        data = "naïve\r\nsecond\r\n".encode("utf-8")
+        split = data.index(b"\xc3") + 1
+        self.read(data[:split])
+        self.read(data[split:])
+        self.assertEqual(self.batches, [["naïve", "second"]])
+
+    def test_partial_last_line_is_delivered_at_eof(self):
+        self.read(b"done\nno newline\r")
+        self.pipe.finish()
+        self.assertEqual(self.batches, [["done"], ["no newline"]])
+
+    def test_overlong_line_is_passed_on_in_pieces(self):
+        with mock.patch.object(output_reader, "MAX_LINE_BYTES", 8):
+            self.read(b"abcde")
+            self.assertEqual(self.batches, [])
+            self.read(b"fghij")
+            self.read(b"k\n")
+        self.assertEqual(self.batches, [["abcdefghij"], ["k"]])
+
+    def test_finish_calls_on_eof_once_lines_are_out(self):
+        events = []
+        pipe = _Pipe(None, lambda lines: events.append(lines), lambda: events.append("eof"))
+        pipe.buffer[:4] = b"last"
+        pipe.feed(4)
+        pipe.finish()
+        self.assertEqual(events, [["last"], "eof"])
+
+
+class MultiplexerTest(unittest.TestCase):
+    def setUp(self):
+        self.multiplexer = OutputMultiplexer()
+        self.lines = {}
+        self.eof = {}
+
+    def open_pipe(self, name):
+        read_fd, write_fd = os.pipe()
+        self.lines[name] = []
+        self.eof[name] = threading.Event()
+        self.multiplexer.add(os.fdopen(read_fd, "rb", buffering=0), self.lines[name].extend,
+                             on_eof=self.eof[name].set)
+        return write_fd
+
+    def test_lines_split_across_writes(self):
+        write_fd = self.open_pipe("a")
+        for part in (b"hel", b"lo\nwor", b"ld\npart", b"ial"):
+            os.write(write_fd, part)
+            time.sleep(0.02)
+        os.close(write_fd)
+        self.assertTrue(self.eof["a"].wait(5))
+        self.assertEqual(self.lines["a"], ["hello", "world", "partial"])
+
+    def test_pipes_are_routed_to_their_own_callbacks(self):
+        fds = {name: self.open_pipe(name) for name in ("a", "b", "c")}
+        for n in range(200):
+            for name, fd in fds.items():
+                os.write(fd, f"{name}{n}\n".encode())
+        for fd in fds.values():
+            os.close(fd)
+        for name in fds:
+            self.assertTrue(self.eof[name].wait(5))
+            self.assertEqual(self.lines[name], [f"{name}{n}" for n in range(200)])
+
+    def test_chunk_larger_than_the_read_buffer(self):
+        write_fd = self.open_pipe("a")
+        expected = [f"{n:08d}" * 20 for n in range(2000)]
+        data = "".join(line + "\n" for line in expected).encode()
+        self.assertGreater(len(data), output_reader.CHUNK_SIZE)
+        writer = threading.Thread(target=lambda: (os.write(write_fd, data), os.close(write_fd)))
+        writer.start()
+        self.assertTrue(self.eof["a"].wait(5))
+        writer.join(5)
+        self.assertEqual(self.lines["a"], expected)
+
+    def test_failing_callback_does_not_stop_other_pipes(self):
+        read_fd, bad_fd = os.pipe()
+
+        def fail(lines):
+            raise RuntimeError("consumer bug")
+
+        self.multiplexer.add(os.fdopen(read_fd, "rb", buffering=0), fail)
+        good_fd = self.open_pipe("good")
+        with mock.patch("builtins.print"):
+            os.write(bad_fd, b"boom\n")
+            os.write(good_fd, b"fine\n")
+            os.close(bad_fd)
+            os.close(good_fd)
+            self.assertTrue(self.eof["good"].wait(5))
+        self.assertEqual(self.lines["good"], ["fine"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""ProcessTreeMonitor aggregation over a spawned tree of Python processes."""
+import subprocess
+import sys
+import time
+import unittest
+
+import psutil
+
+from collectors import ProcessTreeCollector
+from process_tree import ProcessTreeMonitor
+
+# A parent that starts two children, one holding 32 MB, and reports when both are up
+TREE = """
+import subprocess, sys
+child = "import sys, time; data = bytearray(int(sys.argv[1]) * 1024 * 1024); print('up', flush=True); time.sleep(60)"
+children = [subprocess.Popen([sys.executable, "-c", child, size], stdout=subprocess.PIPE) for size in ("32", "0")]
+for proc in children:
+    proc.stdout.readline()
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+class ProcessTreeTest(unittest.TestCase):
+    def setUp(self):
+        self.process = subprocess.Popen([sys.executable, "-c", TREE], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.addCleanup(self.kill_tree)
+        self.assertEqual(self.process.stdout.readline().strip(), b"ready")
+
+    def kill_tree(self):
+        if self.process.poll() is None:
+            for child in psutil.Process(self.process.pid).children(recursive=True):
+                child.kill()
+            self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+    def test_totals_cover_the_whole_tree(self):
+        sample = ProcessTreeMonitor(self.process.pid).sample(per_child=True)
+        self.assertEqual(sample.root_pid, self.process.pid)
+        self.assertEqual(sample.process_count, 3)
+        self.assertEqual(len(sample.children), 3)
+        self.assertEqual(sample.rss, sum(child.rss for child in sample.children))
+        self.assertEqual(sample.num_threads, sum(child.num_threads for child in sample.children))
+        self.assertGreater(sample.rss, 32 * 1024 * 1024)
+        # Largest first: the child holding 32 MB
+        self.assertEqual([child.rss for child in sample.children],
+                         sorted((child.rss for child in sample.children), reverse=True))
+        self.assertGreater(sample.children[0].rss, 32 * 1024 * 1024)
+        self.assertNotEqual(sample.children[0].pid, self.process.pid)
+
+    def test_breakdown_is_opt_in(self):
+        self.assertEqual(ProcessTreeMonitor(self.process.pid).sample().children, ())
+
+    def test_full_memory_is_opt_in(self):
+        sample = ProcessTreeMonitor(self.process.pid).sample()
+        self.assertIsNone(sample.uss)
+        self.assertIsNone(sample.pss)
+        sample = ProcessTreeMonitor(self.process.pid, full_memory=True).sample()
+        self.assertIsNotNone(sample.uss)
+        self.assertLessEqual(sample.uss, sample.rss)
+
+    def test_processes_are_reused_across_samples(self):
+        monitor = ProcessTreeMonitor(self.process.pid)
+        monitor.sample()
+        first = dict(monitor._processes)
+        time.sleep(0.05)
+        monitor.sample()
+        self.assertEqual(set(first), set(monitor._processes))
+        for pid, proc in monitor._processes.items():
+            self.assertIs(proc, first[pid])
+
+    def test_exited_child_leaves_the_tree(self):
+        monitor = ProcessTreeMonitor(self.process.pid)
+        self.assertEqual(monitor.sample().process_count, 3)
+        child = psutil.Process(self.process.pid).children()[0]
+        child.kill()
+        # The parent never reaps it, so it lingers as a zombie, which is not counted
+        deadline = time.monotonic() + 5
+        while child.status() != psutil.STATUS_ZOMBIE and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(monitor.sample().process_count, 2)
+
+    def test_gone_root_gives_none(self):
+        monitor = ProcessTreeMonitor(self.process.pid)
+        monitor.sample()
+        self.kill_tree()
+        self.assertIsNone(monitor.sample())
+
+    def test_collector_tracks_by_name(self):
+        collector = ProcessTreeCollector()
+        collector.track("webui", self.process.pid)
+        reading = collector.collect()
+        self.assertEqual(reading["webui"].process_count, 3)
+        self.assertEqual(collector.values(reading)["webui_processes"], 3)
+        collector.untrack("webui")
+        self.assertEqual(dict(collector.collect()), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Exposition format of prometheus.render."""
+import unittest
+
+from gpu_backends import make_sample
+from metrics_sampler import MetricsSnapshot
+from prometheus import render
+
+
+def families(text):
+    """Metric names in the order their samples appear, one entry per contiguous run."""
+    runs = []
+    for line in text.splitlines():
+        name = line.split()[2] if line.startswith("#") else line.split("{")[0].split()[0]
+        if not runs or runs[-1] != name:
+            runs.append(name)
+    return runs
+
+
+class RenderTest(unittest.TestCase):
+    def setUp(self):
+        gpus = (make_sample(0, "GPU A", 10, 100, 1000, 50, 80), make_sample(1, "GPU B", 20, 200, 2000, 60, 90))
+        self.snapshot = MetricsSnapshot(1.0, 5.0, 40.0, 1024, gpus, None, {}, 0.01, {})
+        self.services = [{"name": "a", "state": "healthy", "restarts": 1},
+                         {"name": "b", "state": "crashed", "restarts": 2}]
+        self.stats = {"samples": 3, "last_seconds": 0.01,
+                      "collectors": [{"name": "cpu", "wall_seconds": 0.1, "cpu_seconds": 0.05, "interval": 1.0},
+                                     {"name": "gpu", "wall_seconds": 0.2, "cpu_seconds": 0.1, "interval": 2.0}]}
+
+    def test_families_are_contiguous(self):
+        runs = families(render(self.snapshot, self.services, self.stats))
+        self.assertEqual(len(runs), len(set(runs)), runs)
+
+    def test_gpu_name_label(self):
+        text = render(self.snapshot, [])
+        self.assertIn('owui_gpu_utilization_percent{gpu="1",name="GPU B"} 20', text)
+        self.assertIn('owui_gpu_memory_used_bytes{gpu="0",name="GPU A"} 104857600', text)
+
+    def test_service_state(self):
+        text = render(None, self.services)
+        self.assertIn('owui_service_up{service="a"} 1', text)
+        self.assertIn('owui_service_state{service="b",state="crashed"} 1', text)
+        self.assertIn('owui_service_state{service="b",state="healthy"} 0', text)
+        self.assertEqual(text.count("# TYPE owui_service_state gauge"), 1)
+
+    def test_none_values_are_skipped(self):
+        self.assertNotIn("owui_service_rss_bytes", render(None, self.services))
+
+    def test_label_escaping(self):
+        text = render(None, [{"name": 'say "hi"\n', "state": "stopped"}])
+        self.assertIn('owui_service_up{service="say \\"hi\\"\\n"} 0', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+"""ReadinessProber against a stub HTTP/1.1 server on an ephemeral port."""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from readiness import ReadinessProber, StartupHistory, StartupRecord
+from restart_policy import RestartHistory
+from supervisor import ManagedService, ServiceSpec, Supervisor
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        stub = self.server
+        stub.requests.append((self.client_address, self.path))
+        if stub.delay:
+            time.sleep(stub.delay)
+        if self.path == "/api/version":
+            self.reply(200, json.dumps({"version": stub.version}).encode())
+        elif stub.failures > 0:
+            stub.failures -= 1
+            self.reply(503, b"starting")
+        else:
+            self.reply(200, b"ok")
+
+    def reply(self, status, body):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            if self.server.chunked:
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                # Split the body so the client has to join several chunks
+                for start in range(0, len(body), 4):
+                    piece = body[start:start + 4]
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        except OSError:
+            # The prober gave up on a slow reply and closed the connection
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, failures=0, chunked=False, delay=0.0, version="0.6.5"):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.failures = failures
+        self.chunked = chunked
+        self.delay = delay
+        self.version = version
+        self.requests = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def connections(self):
+        return len({address for address, _ in self.requests})
+
+
+class StubServerTestCase(unittest.TestCase):
+    def serve(self, **kwargs):
+        server = StubServer(**kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+
+class ProberTest(StubServerTestCase):
+    def prober(self, server, **kwargs):
+        options = dict(timeout=5.0, initial_delay=0.01, max_delay=0.05, request_timeout=1.0)
+        options.update(kwargs)
+        return ReadinessProber("127.0.0.1", server.port, **options)
+
+    def test_ready_after_503s(self):
+        server = self.serve(failures=3)
+        started = time.monotonic()
+        record = self.prober(server).run(started)
+        self.assertTrue(record.ready)
+        self.assertEqual(record.attempts, 4)
+        self.assertEqual(record.version, "0.6.5")
+        self.assertIsNone(record.error)
+        # The first 503 already counts as the first byte
+        self.assertLessEqual(record.ttfb, record.time_to_ready)
+        self.assertLess(record.time_to_ready, time.monotonic() - started + 0.001)
+
+    def test_keep_alive_reuses_one_connection(self):
+        server = self.serve(failures=3)
+        self.prober(server).run()
+        self.assertEqual(len(server.requests), 5)
+        self.assertEqual(server.requests[-1][1], "/api/version")
+        self.assertEqual(server.connections(), 1)
+
+    def test_chunked_body(self):
+        server = self.serve(failures=1, chunked=True, version="0.6.10-chunked")
+        record = self.prober(server).run()
+        self.assertTrue(record.ready)
+        self.assertEqual(record.version, "0.6.10-chunked")
+        self.assertEqual(server.connections(), 1)
+
+    def test_slow_server_times_out(self):
+        server = self.serve(delay=0.5)
+        record = self.prober(server, timeout=0.3, request_timeout=0.1).run()
+        self.assertFalse(record.ready)
+        self.assertIsNone(record.time_to_ready)
+        self.assertIsNone(record.ttfb)
+        self.assertTrue(record.error.startswith("not ready after"), record.error)
+        self.assertIn("TimeoutError", record.error)
+        # Each timed-out request drops its connection, so the next one reconnects
+        self.assertGreaterEqual(record.attempts, 2)
+
+    def test_http_error_is_reported_on_timeout(self):
+        server = self.serve(failures=1000)
+        record = self.prober(server, timeout=0.2).run()
+        self.assertFalse(record.ready)
+        self.assertIsNotNone(record.ttfb)
+        self.assertTrue(record.error.endswith("(HTTP 503)"), record.error)
+
+    def test_should_continue_cancels(self):
+        server = self.serve(failures=1000)
+        checks = []
+
+        def should_continue():
+            checks.append(None)
+            return len(checks) <= 2
+
+        record = self.prober(server).run(should_continue=should_continue)
+        self.assertFalse(record.ready)
+        self.assertEqual(record.error, "cancelled")
+        self.assertEqual(record.attempts, 2)
+
+    def test_backoff_grows_to_max_delay(self):
+        server = self.serve(failures=6)
+        delays = []
+        sleep = asyncio.sleep
+
+        async def recording_sleep(delay, *args, **kwargs):
+            delays.append(delay)
+            await sleep(0)
+
+        with mock.patch("asyncio.sleep", recording_sleep):
+            record = self.prober(server, initial_delay=0.01, backoff=2.0, max_delay=0.05).run()
+        self.assertTrue(record.ready)
+        self.assertEqual(delays, [0.01, 0.02, 0.04, 0.05, 0.05, 0.05])
+
+    def test_unreachable_port_retries(self):
+        server = self.serve()
+        port = server.port
+        server.shutdown()
+        server.server_close()
+        record = ReadinessProber("127.0.0.1", port, timeout=0.2, initial_delay=0.01,
+                                 max_delay=0.05, request_timeout=0.1).run()
+        self.assertFalse(record.ready)
+        self.assertIsNone(record.ttfb)
+        self.assertGreater(record.attempts, 1)
+
+
+class StartupHistoryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "startup_history.jsonl")
+        self.history = StartupHistory(self.path)
+
+    def start(self, version, time_to_ready, ready=True, service=None):
+        return StartupRecord(time.time(), "127.0.0.1", 8080, ready, 0.01, time_to_ready if ready else None,
+                             1, version if ready else None, None if ready else "HTTP 503", service)
+
+    def test_round_trip_and_limit(self):
+        records = [self.start("0.6.5", 1.0 + i, service="open-webui") for i in range(5)]
+        for record in records:
+            self.history.record(record)
+        self.assertEqual(self.history.load(), records)
+        self.assertEqual(self.history.load(limit=2), records[-2:])
+
+    def test_missing_file_and_bad_lines(self):
+        self.assertEqual(self.history.load(), [])
+        self.history.record(self.start("0.6.5", 2.0))
+        with open(self.path, "a") as f:
+            f.write("not json\n")
+            f.write('{"unknown": 1}\n')
+        self.history.record(self.start("0.6.5", 3.0))
+        self.assertEqual([r.time_to_ready for r in self.history.load()], [2.0, 3.0])
+
+    def test_summary_medians_ready_starts_per_version(self):
+        for version, seconds in (("0.6.5", 3.0), ("0.6.5", 1.0), ("0.6.5", 2.0), ("0.7.0", 5.0)):
+            self.history.record(self.start(version, seconds))
+        self.history.record(self.start("0.7.0", None, ready=False))
+        self.assertEqual(self.history.summary(), {
+            "0.6.5": {"starts": 3, "median_time_to_ready": 2.0},
+            "0.7.0": {"starts": 1, "median_time_to_ready": 5.0},
+        })
+
+
+class SupervisorReadinessTest(StubServerTestCase):
+    """The supervisor records finished probes but not cancelled ones."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.history = StartupHistory(os.path.join(directory.name, "startup_history.jsonl"))
+        self.supervisor = Supervisor(startup_history=self.history,
+                                     restart_history=RestartHistory(os.path.join(directory.name, "restarts.jsonl")))
+
+    def service(self, server):
+        spec = ServiceSpec("open-webui", "open-webui serve", port=server.port)
+        return ManagedService(spec, None, None)
+
+    def test_ready_start_is_recorded(self):
+        service = self.service(self.serve(failures=1))
+        record = self.supervisor._check_readiness(service, time.monotonic(), lambda: True)
+        self.assertTrue(record.ready)
+        self.assertEqual(record.service, "open-webui")
+        self.assertEqual(self.history.load(), [record])
+        self.assertIs(service.last_readiness, record)
+
+    def test_cancelled_start_is_not_recorded(self):
+        service = self.service(self.serve())
+        record = self.supervisor._check_readiness(service, time.monotonic(), lambda: False)
+        self.assertEqual(record.error, "cancelled")
+        self.assertEqual(self.history.load(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
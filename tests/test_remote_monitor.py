@@ -0,0 +1,132 @@
+"""Frame validation and host state of the remote monitor, over loopback sockets."""
+import socket
+import time
+import unittest
+
+from remote_monitor import PROTOCOL, Aggregator, FrameWriter, HostState, check_frame, diff, unflatten
+
+
+class CheckFrameTest(unittest.TestCase):
+    def test_valid_frames(self):
+        check_frame({"t": 1.5, "full": {"cpu": 12.5, "gpu/0/name": "A", "svc/open-webui/paused": False}})
+        check_frame({"t": 2, "set": {"cpu": 13}, "del": ["gpu/0/power_w"], "errors": [["ollama", "ERROR x"]],
+                     "errors_skipped": 3})
+        check_frame({"t": 3})
+
+    def test_invalid_frames(self):
+        for frame in (
+            ["not", "a", "frame"],
+            {"t": "now"},
+            {"full": ["cpu", 1]},
+            {"set": {"cpu": {"nested": 1}}},
+            {"set": {"gpu/x/name": "A"}},
+            {"set": {"gpu/0": "A"}},
+            {"set": {"svc/open-webui": "healthy"}},
+            {"del": "cpu"},
+            {"del": [1]},
+            {"errors": [["ollama"]]},
+            {"errors": "ERROR"},
+            {"errors": [["ollama", 5]]},
+            {"errors_skipped": "many"},
+        ):
+            with self.subTest(frame=frame), self.assertRaises(ValueError):
+                check_frame(frame)
+
+
+class HostStateTest(unittest.TestCase):
+    def test_deltas_rebuild_the_state(self):
+        host = HostState("node")
+        first = {"cpu": 10.0, "memory": 50.0, "gpu/0/name": "A", "gpu/0/utilization": 5, "svc/a/b/state": "healthy"}
+        second = {"cpu": 20.0, "memory": 50.0, "gpu/0/name": "A", "svc/a/b/state": "crashed"}
+        host.apply({"t": 1, "full": first})
+        changed, removed = diff(first, second)
+        host.apply({"t": 2, "set": changed, "del": removed, "errors": [["a/b", "ERROR boom"]]})
+        self.assertEqual(host.values, second)
+
+        state = host.as_dict(time.time())
+        self.assertEqual(state["system"], {"cpu": 20.0, "memory": 50.0})
+        self.assertEqual(state["gpus"], [{"index": 0, "name": "A"}])
+        self.assertEqual(state["services"], [{"name": "a/b", "state": "crashed"}])
+        self.assertEqual(state["errors"], [(2, "a/b", "ERROR boom")])
+        self.assertEqual(state["host"], "node")
+
+    def test_system_values_do_not_shadow_host_fields(self):
+        host = HostState("node")
+        host.apply({"full": {"host": "spoofed", "connected": True}})
+        state = host.as_dict(time.time())
+        self.assertEqual(state["host"], "node")
+        self.assertFalse(state["connected"])
+
+    def test_unflatten_orders_gpus_by_index(self):
+        _, gpus, _ = unflatten({"gpu/10/name": "B", "gpu/2/name": "A"})
+        self.assertEqual([gpu["index"] for gpu in gpus], [2, 10])
+
+
+class AggregatorTest(unittest.TestCase):
+    def setUp(self):
+        self.aggregator = Aggregator(port=0, token="secret")
+        self.aggregator.start()
+        self.addCleanup(self.aggregator.stop)
+
+    def connect(self, hello):
+        sock = socket.create_connection(self.aggregator.address, timeout=5)
+        self.addCleanup(sock.close)
+        writer = FrameWriter(sock)
+        writer.send(hello)
+        return sock, writer
+
+    def hello(self, token="secret", **fields):
+        return {"hello": PROTOCOL, "host": "node", "interval": 1.0, "token": token, **fields}
+
+    def wait_hosts(self, predicate):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            hosts = self.aggregator.hosts()
+            if predicate(hosts):
+                return hosts
+            time.sleep(0.01)
+        self.fail(f"hosts never matched: {self.aggregator.hosts()}")
+
+    def closed(self, sock):
+        sock.settimeout(5)
+        try:
+            return sock.recv(1) == b""
+        except ConnectionResetError:
+            return True
+
+    def test_binds_loopback_by_default(self):
+        self.assertEqual(self.aggregator.address[0], "127.0.0.1")
+
+    def test_frames_update_the_host(self):
+        sock, writer = self.connect(self.hello())
+        writer.send({"t": 1.0, "full": {"cpu": 5.0, "svc/a/state": "healthy"}})
+        hosts = self.wait_hosts(lambda hosts: hosts and hosts[0]["system"].get("cpu") == 5.0)
+        self.assertTrue(hosts[0]["connected"])
+        self.assertEqual(hosts[0]["services"], [{"name": "a", "state": "healthy"}])
+
+    def test_wrong_token_is_rejected(self):
+        for token in ("wrong", None, 42, "sécret"):
+            with self.subTest(token=token):
+                sock, _ = self.connect(self.hello(token=token))
+                self.assertTrue(self.closed(sock))
+        self.assertEqual(self.aggregator.hosts(), [])
+
+    def test_malformed_frame_closes_the_connection(self):
+        sock, writer = self.connect(self.hello())
+        writer.send({"t": 1.0, "full": {"cpu": 5.0}})
+        self.wait_hosts(lambda hosts: hosts and hosts[0]["system"].get("cpu") == 5.0)
+        writer.send({"t": 2.0, "errors": "not a list"})
+        self.assertTrue(self.closed(sock))
+        hosts = self.wait_hosts(lambda hosts: not hosts[0]["connected"])
+        self.assertEqual(hosts[0]["system"], {"cpu": 5.0})
+
+    def test_malformed_hello_closes_the_connection(self):
+        for hello in (["hello"], self.hello(interval="soon")):
+            with self.subTest(hello=hello):
+                sock, _ = self.connect(hello)
+                self.assertTrue(self.closed(sock))
+        self.assertEqual(self.aggregator.hosts(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
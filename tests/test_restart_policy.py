@@ -0,0 +1,198 @@
+"""Restart backoff, crash-loop detection and recovery statistics."""
+import os
+import shlex
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import restart_policy
+from lifecycle import HEALTHY
+from restart_policy import (ALWAYS, NEVER, ON_FAILURE, RestartHistory, RestartPolicy, RestartRecord,
+                            RestartTracker, backoff_delay, parse_policy)
+from supervisor import ServiceSpec, Supervisor
+
+
+class FixedRandom:
+    def __init__(self, value):
+        self.value = value
+
+    def uniform(self, low, high):
+        return low + (high - low) * self.value
+
+
+class Clock:
+    """Stands in for the time module inside restart_policy."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class BackoffTest(unittest.TestCase):
+    def test_grows_exponentially_up_to_the_cap(self):
+        policy = RestartPolicy(ALWAYS, initial_delay=1.0, max_delay=10.0, multiplier=2.0, jitter=0)
+        self.assertEqual([backoff_delay(policy, attempt) for attempt in range(1, 7)],
+                         [1.0, 2.0, 4.0, 8.0, 10.0, 10.0])
+
+    def test_jitter_stays_within_its_fraction(self):
+        policy = RestartPolicy(ALWAYS, initial_delay=4.0, jitter=0.25)
+        self.assertEqual(backoff_delay(policy, 1, FixedRandom(0.0)), 3.0)
+        self.assertEqual(backoff_delay(policy, 1, FixedRandom(1.0)), 5.0)
+        for _ in range(100):
+            self.assertTrue(3.0 <= backoff_delay(policy, 1) <= 5.0)
+
+    def test_parse_policy(self):
+        self.assertEqual(parse_policy(None).mode, NEVER)
+        self.assertEqual(parse_policy("on-failure").mode, ON_FAILURE)
+        self.assertEqual(parse_policy({"mode": "always", "max_delay": 5.0}).max_delay, 5.0)
+        with self.assertRaises(ValueError):
+            parse_policy("sometimes")
+        with self.assertRaises(TypeError):
+            parse_policy(3)
+
+
+class TrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(restart_policy, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tracker(self, mode=ALWAYS, **options):
+        options.setdefault("jitter", 0)
+        return RestartTracker(RestartPolicy(mode, **options))
+
+    def test_on_failure_ignores_a_clean_exit(self):
+        tracker = self.tracker(ON_FAILURE)
+        self.assertIsNone(tracker.went_down("svc", False, "exit code 0"))
+        record = tracker.went_down("svc", True, "exit code 1")
+        self.assertEqual((record.attempt, record.delay, record.reason), (1, 1.0, "exit code 1"))
+        self.assertEqual(tracker.crashes, 1)
+
+    def test_always_restarts_a_clean_exit_and_never_does_not(self):
+        self.assertIsNotNone(self.tracker(ALWAYS).went_down("svc", False, "exit code 0"))
+        self.assertIsNone(self.tracker(NEVER).went_down("svc", True, "exit code 1"))
+
+    def test_consecutive_failures_back_off(self):
+        tracker = self.tracker(initial_delay=1.0, max_delay=4.0)
+        delays = []
+        for _ in range(4):
+            delays.append(tracker.went_down("svc", False, "exit code 0").delay)
+            self.clock.now += 1.0
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 4.0])
+
+    def test_crash_loop_within_the_window(self):
+        tracker = self.tracker(crash_loop_count=3, crash_loop_window=10.0)
+        self.assertIsNotNone(tracker.went_down("svc", True, "exit code 1"))
+        self.clock.now += 4.0
+        self.assertIsNotNone(tracker.went_down("svc", True, "exit code 1"))
+        self.clock.now += 4.0
+        self.assertIsNone(tracker.went_down("svc", True, "exit code 1"))
+        self.assertTrue(tracker.crash_loop)
+
+    def test_crashes_spread_beyond_the_window_are_not_a_loop(self):
+        tracker = self.tracker(crash_loop_count=3, crash_loop_window=10.0)
+        for _ in range(5):
+            self.assertIsNotNone(tracker.went_down("svc", True, "exit code 1"))
+            self.clock.now += 6.0
+        self.assertFalse(tracker.crash_loop)
+
+    def test_long_healthy_run_resets_the_backoff(self):
+        tracker = self.tracker(reset_after=60.0)
+        tracker.went_down("svc", True, "exit code 1")
+        tracker.went_down("svc", True, "exit code 1")
+        tracker.became_healthy()
+        self.clock.now += 10.0
+        self.assertEqual(tracker.went_down("svc", True, "exit code 1").attempt, 3)
+        tracker.became_healthy()
+        self.clock.now += 61.0
+        self.assertEqual(tracker.went_down("svc", True, "exit code 1").attempt, 1)
+
+    def test_mttr_is_the_mean_time_to_recover(self):
+        tracker = self.tracker()
+        self.assertIsNone(tracker.mttr)
+        self.assertIsNone(tracker.became_healthy())
+        for downtime in (2.0, 4.0):
+            tracker.went_down("svc", True, "exit code 1")
+            self.clock.now += downtime
+            record = tracker.became_healthy()
+            self.assertTrue(record.recovered)
+            self.assertEqual(record.time_to_recover, downtime)
+        self.assertEqual(tracker.mttr, 3.0)
+        self.assertEqual(tracker.last_recovery, 4.0)
+
+    def test_recovery_counts_from_the_first_outage(self):
+        tracker = self.tracker()
+        tracker.went_down("svc", True, "exit code 1")
+        self.clock.now += 3.0
+        # The replacement died before becoming healthy
+        tracker.went_down("svc", True, "exit code 1")
+        self.clock.now += 2.0
+        record = tracker.became_healthy()
+        self.assertEqual((record.attempt, record.time_to_recover), (2, 5.0))
+
+    def test_reset_clears_backoff_and_crash_loop(self):
+        tracker = self.tracker(crash_loop_count=2)
+        tracker.went_down("svc", True, "exit code 1")
+        tracker.went_down("svc", True, "exit code 1")
+        self.assertTrue(tracker.crash_loop)
+        tracker.reset()
+        self.assertFalse(tracker.crash_loop)
+        self.assertEqual(tracker.went_down("svc", True, "exit code 1").attempt, 1)
+
+
+class RestartHistoryTest(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            history = RestartHistory(os.path.join(directory, "restart_history.jsonl"))
+            records = [RestartRecord("svc", 1000.0 + i, "exit code 1", i + 1, 1.0, True, 2.5) for i in range(3)]
+            for record in records:
+                history.record(record)
+            self.assertEqual(history.load(), records)
+            self.assertEqual(history.load(limit=1), records[-1:])
+
+
+class SupervisorRestartTest(unittest.TestCase):
+    """A guardrail restart keeps the backoff state; a start by hand does not."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.dict(os.environ, {"OWUI_CONTROLLER_HOME": directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.supervisor = Supervisor(stop_timeout=2.0)
+        self.addCleanup(self.supervisor.stop_all, wait=True)
+        command = f"{shlex.quote(sys.executable)} -c 'import time; time.sleep(30)'"
+        self.service = self.supervisor.add(ServiceSpec("sleeper", command, restart="on-failure"))
+
+    def wait_healthy(self):
+        self.assertTrue(self.service.lifecycle.wait_for(lambda state: state == HEALTHY, 10.0))
+
+    def test_restart_keeps_backoff_and_start_resets_it(self):
+        self.assertTrue(self.supervisor.start("sleeper"))
+        self.wait_healthy()
+        first_pid = self.service.pid
+        self.service.restart.attempt = 3
+
+        self.supervisor.restart("sleeper")
+        deadline = time.monotonic() + 10.0
+        while self.service.pid in (None, first_pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.wait_healthy()
+        self.assertNotEqual(self.service.pid, first_pid)
+        self.assertEqual(self.service.restart.attempt, 3)
+
+        self.supervisor.stop("sleeper", wait=True)
+        self.assertEqual(self.service.restart.attempt, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
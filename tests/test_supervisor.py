@@ -0,0 +1,107 @@
+"""Supervisor running several real child processes through one OutputMultiplexer."""
+import os
+import shlex
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from lifecycle import ACTIVE_STATES, STOPPED
+from supervisor import ServiceSpec, Supervisor
+
+# Prints numbered lines tagged with the service name, one of them on stderr
+CHATTY = """
+import sys
+name, count = sys.argv[1], int(sys.argv[2])
+for i in range(count):
+    stream = sys.stderr if i == count // 2 else sys.stdout
+    stream.write(f"{name} {i}\\n")
+sys.stdout.write(f"{name} done\\n")
+"""
+
+
+def chatty_spec(name, count):
+    command = f"{shlex.quote(sys.executable)} -u -c {shlex.quote(CHATTY)} {name} {count}"
+    return ServiceSpec(name, command)
+
+
+class SupervisorOutputTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.dict(os.environ, {"OWUI_CONTROLLER_HOME": directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.output = {}
+        self.done = {}
+        self.lock = threading.Lock()
+        self.supervisor = Supervisor(on_output=self.on_output)
+        self.addCleanup(self.close_run_logs)
+        self.addCleanup(self.supervisor.stop_all, wait=True)
+
+    def close_run_logs(self):
+        # The multiplexer closes them at EOF; wait for that before the directory goes
+        for service in self.supervisor.services():
+            if service.run_log is not None:
+                service.run_log.close()
+
+    def on_output(self, name, lines):
+        with self.lock:
+            self.output.setdefault(name, []).extend(lines)
+        if f"{name} done" in lines:
+            self.done[name].set()
+
+    def run_services(self, counts):
+        for name, count in counts.items():
+            self.done[name] = threading.Event()
+            self.supervisor.add(chatty_spec(name, count))
+        for name in counts:
+            self.assertTrue(self.supervisor.start(name))
+        for name in counts:
+            self.assertTrue(self.done[name].wait(10.0), name)
+            service = self.supervisor.get(name)
+            self.assertTrue(service.lifecycle.wait_for(lambda state: state not in ACTIVE_STATES, 10.0))
+
+    def process_lines(self, name):
+        # Supervisor messages are timestamped in brackets; the rest is process output
+        with self.lock:
+            return [line for line in self.output.get(name, []) if not line.startswith("[")]
+
+    def test_each_service_gets_only_its_own_lines(self):
+        counts = {"alpha": 3000, "beta": 2000, "gamma": 1}
+        self.run_services(counts)
+        for name, count in counts.items():
+            expected = [f"{name} {i}" for i in range(count)] + [f"{name} done"]
+            lines = self.process_lines(name)
+            # stderr is merged into stdout, so only the order around that one line may differ
+            self.assertEqual(sorted(lines), sorted(expected), name)
+            self.assertEqual(self.supervisor.get(name).state, STOPPED)
+
+    def test_output_is_written_to_each_run_log(self):
+        counts = {"alpha": 500, "beta": 300}
+        self.run_services(counts)
+        for name, count in counts.items():
+            log_store = self.supervisor.get(name).log_store
+            deadline = time.monotonic() + 10.0
+            while True:
+                texts = [match.text for match in log_store.search(limit=None)]
+                if len(texts) >= count + 1 or time.monotonic() > deadline:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(sorted(texts), sorted([f"{name} {i}" for i in range(count)] + [f"{name} done"]))
+
+    def test_one_reader_thread_for_all_services(self):
+        def readers():
+            return sum(thread.name == "output-multiplexer" for thread in threading.enumerate())
+
+        before = readers()
+        self.run_services({"alpha": 10, "beta": 10, "gamma": 10})
+        self.assertEqual(readers(), before + 1)
+        self.assertEqual(self.supervisor.multiplexer.pipe_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
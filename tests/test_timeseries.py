@@ -0,0 +1,115 @@
+"""TimeSeriesStore bucketing, ring buffers and save/load round trips."""
+import math
+import os
+import struct
+import tempfile
+import unittest
+
+import timeseries
+from timeseries import TimeSeriesStore
+
+TIERS = ((1, 5), (10, 3))
+
+
+def store_with(samples, columns=("cpu", "mem")):
+    store = TimeSeriesStore(columns, TIERS)
+    for t in samples:
+        store.append(t, {"cpu": float(t), "mem": 100.0 + t})
+    return store
+
+
+class StoreTest(unittest.TestCase):
+    def test_buckets_hold_means(self):
+        store = store_with([0, 2, 4, 10, 21])
+        times, values = store.query("cpu", resolution=10)
+        self.assertEqual(list(times), [0.0, 10.0])
+        self.assertEqual(list(values), [2.0, 10.0])
+        self.assertEqual(store.latest("mem", 10), (10.0, 110.0))
+
+    def test_ring_keeps_the_newest_points(self):
+        store = store_with(range(40))
+        times, values = store.query("cpu")
+        self.assertEqual(list(times), [34.0, 35.0, 36.0, 37.0, 38.0])
+        self.assertEqual(list(values), [34.0, 35.0, 36.0, 37.0, 38.0])
+        self.assertEqual(store.appended(1), 39)
+        self.assertEqual(list(store.query("cpu", since=36.0)[0]), [37.0, 38.0])
+
+    def test_missing_values_are_nan(self):
+        store = TimeSeriesStore(("cpu", "gpu"), TIERS)
+        store.append(0, {"cpu": 1.0})
+        store.append(1, {"cpu": 2.0, "gpu": None})
+        store.append(2, {"cpu": 3.0})
+        self.assertTrue(math.isnan(store.query("gpu")[1][0]))
+
+
+class SaveLoadTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "history.bin")
+
+    def assertSameHistory(self, first, second):
+        for resolution in first.resolutions:
+            self.assertEqual(first.appended(resolution), second.appended(resolution))
+            for column in first.columns:
+                self.assertEqual(first.query(column, resolution=resolution),
+                                 second.query(column, resolution=resolution))
+
+    def test_round_trip_after_wraparound(self):
+        original = store_with(range(40))
+        original.save(self.path)
+        restored = TimeSeriesStore(("cpu", "mem"), TIERS)
+        self.assertTrue(restored.load(self.path))
+        self.assertSameHistory(original, restored)
+
+    def test_open_buckets_survive_a_save(self):
+        # 30..34 are still being averaged in the 10 s tier when the store is saved
+        original = store_with(range(35))
+        original.save(self.path)
+        restored = TimeSeriesStore(("cpu", "mem"), TIERS)
+        self.assertTrue(restored.load(self.path))
+        for store in (original, restored):
+            for t in range(35, 41):
+                store.append(t, {"cpu": float(t), "mem": 100.0 + t})
+        self.assertSameHistory(original, restored)
+        self.assertEqual(restored.latest("cpu", 10), (30.0, 34.5))
+
+    def test_columns_are_matched_by_name(self):
+        store_with(range(12)).save(self.path)
+        restored = TimeSeriesStore(("gpu", "cpu"), TIERS)
+        self.assertTrue(restored.load(self.path))
+        self.assertEqual(list(restored.query("cpu", resolution=10)[1]), [4.5])
+        self.assertTrue(math.isnan(restored.query("gpu", resolution=10)[1][0]))
+        restored.append(15, {"cpu": 15.0, "gpu": 1.0})
+        restored.append(20, {})
+        # The restored open bucket (10 and 11) is averaged with the new sample; gpu only has the new one
+        self.assertEqual(restored.latest("cpu", 10), (10.0, 12.0))
+        self.assertEqual(restored.latest("gpu", 10), (10.0, 1.0))
+
+    def test_other_tiers_are_ignored(self):
+        store_with(range(40)).save(self.path)
+        restored = TimeSeriesStore(("cpu", "mem"), ((1, 5), (60, 3)))
+        self.assertTrue(restored.load(self.path))
+        self.assertEqual(len(restored.query("cpu")[0]), 5)
+        self.assertIsNone(restored.latest("cpu", 60))
+
+    def test_format_version_mismatch_is_refused(self):
+        store_with(range(40)).save(self.path)
+        with open(self.path, "r+b") as f:
+            f.seek(4)
+            f.write(struct.pack("<H", timeseries._FORMAT_VERSION + 1))
+        restored = store_with([0, 1])
+        self.assertFalse(restored.load(self.path))
+        self.assertEqual(list(restored.query("cpu")[0]), [0.0])
+
+    def test_missing_or_truncated_file(self):
+        restored = TimeSeriesStore(("cpu", "mem"), TIERS)
+        self.assertFalse(restored.load(self.path))
+        store_with(range(40)).save(self.path)
+        with open(self.path, "r+b") as f:
+            f.truncate(30)
+        self.assertFalse(restored.load(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
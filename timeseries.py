@@ -0,0 +1,240 @@
+"""Multi-resolution metric history.
+
+Samples go into a set of tiers. Each tier is a fixed-size ring buffer of
+array-backed columns (one array("d") of timestamps and one array("f") per
+metric) that holds the mean of every bucket of `resolution` seconds. With
+the default tiers the store keeps 1 s points for an hour, 10 s points for a
+day and 1 min points for a week in well under a megabyte, no matter how long
+the controller runs.
+
+The whole store can be saved to and loaded from a compact binary file, so
+history survives restarts. The file also holds the bucket each tier is still
+averaging, so saving in the middle of a minute loses none of its samples.
+"""
+import math
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+
+# (resolution in seconds, number of points)
+DEFAULT_TIERS = (
+    (1, 3600),          # 1 hour
+    (10, 8640),         # 24 hours
+    (60, 10080),        # 7 days
+)
+
+_MAGIC = b"OWTS"
+_FORMAT_VERSION = 2
+_READABLE_VERSIONS = (1, 2)     # version 1 files lack the open buckets
+_HEADER = struct.Struct("<4sHHB")
+_TIER_HEADER = struct.Struct("<dIIIQ")
+_BUCKET_HEADER = struct.Struct("<?q")
+_NAME_LENGTH = struct.Struct("<H")
+
+NAN = float("nan")
+
+
+class _Tier:
+    """Ring buffer of bucket means at one resolution."""
+
+    def __init__(self, resolution, capacity, column_count):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = [array("f", bytes(4 * capacity)) for _ in range(column_count)]
+        self.head = 0           # index the next point is written to
+        self.count = 0
+        self.appended = 0       # points ever written, for incremental readers
+        self._bucket = None
+        self._sums = [0.0] * column_count
+        self._counts = [0] * column_count
+
+    def add(self, timestamp, values):
+        bucket = int(timestamp // self.resolution)
+        if self._bucket is not None and bucket != self._bucket:
+            self._flush()
+        self._bucket = bucket
+        sums, counts = self._sums, self._counts
+        for i, value in enumerate(values):
+            if value is not None and value == value:
+                sums[i] += value
+                counts[i] += 1
+
+    def _flush(self):
+        i = self.head
+        self.times[i] = self._bucket * self.resolution
+        for column, total, count in zip(self.values, self._sums, self._counts):
+            column[i] = total / count if count else NAN
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.appended += 1
+        self._sums = [0.0] * len(self._sums)
+        self._counts = [0] * len(self._counts)
+
+    def ordered(self, data):
+        """Return a chronological copy of one of this tier's arrays."""
+        if self.count < self.capacity:
+            return data[:self.count]
+        return data[self.head:] + data[:self.head]
+
+
+class TimeSeriesStore:
+    """Thread-safe multi-resolution history of a fixed set of columns."""
+
+    def __init__(self, columns, tiers=DEFAULT_TIERS):
+        self.columns = tuple(columns)
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        self._tiers = [_Tier(resolution, capacity, len(self.columns)) for resolution, capacity in tiers]
+        self._lock = threading.Lock()
+
+    @property
+    def resolutions(self):
+        return tuple(tier.resolution for tier in self._tiers)
+
+    def append(self, timestamp, values):
+        """Add one sample; `values` maps column names to numbers (None or missing means no data)."""
+        row = [values.get(name) for name in self.columns]
+        with self._lock:
+            for tier in self._tiers:
+                tier.add(timestamp, row)
+
+    def tier_for(self, seconds):
+        """Finest resolution whose tier covers `seconds` of history."""
+        for tier in self._tiers:
+            if tier.resolution * tier.capacity >= seconds:
+                return tier.resolution
+        return self._tiers[-1].resolution
+
+    def appended(self, resolution):
+        """Number of points ever written at `resolution`; changes whenever new points exist."""
+        return self._tier(resolution).appended
+
+    def query(self, column, since=None, resolution=None):
+        """Return (timestamps, values) arrays of points newer than `since`, oldest first.
+
+        Missing data is NaN. Without a resolution the finest tier is used.
+        """
+        tier = self._tier(resolution) if resolution else self._tiers[0]
+        index = self._index[column]
+        with self._lock:
+            times = tier.ordered(tier.times)
+            values = tier.ordered(tier.values[index])
+        if since is not None:
+            start = bisect_right(times, since)
+            times, values = times[start:], values[start:]
+        return times, values
+
+    def latest(self, column, resolution=None):
+        """Most recent completed point as (timestamp, value), or None."""
+        tier = self._tier(resolution) if resolution else self._tiers[0]
+        with self._lock:
+            if not tier.count:
+                return None
+            i = (tier.head - 1) % tier.capacity
+            return tier.times[i], tier.values[self._index[column]][i]
+
+    def _tier(self, resolution):
+        for tier in self._tiers:
+            if tier.resolution == resolution:
+                return tier
+        raise KeyError(f"No tier with resolution {resolution}")
+
+    def save(self, path):
+        """Write the store to `path` atomically."""
+        with self._lock:
+            parts = [_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(self.columns), sys.byteorder == "big")]
+            for name in self.columns:
+                encoded = name.encode("utf-8")
+                parts.append(_NAME_LENGTH.pack(len(encoded)) + encoded)
+            parts.append(_NAME_LENGTH.pack(len(self._tiers)))
+            for tier in self._tiers:
+                parts.append(_TIER_HEADER.pack(tier.resolution, tier.capacity, tier.count, tier.head, tier.appended))
+                parts.append(tier.times.tobytes())
+                parts.extend(column.tobytes() for column in tier.values)
+                parts.append(_BUCKET_HEADER.pack(tier._bucket is not None, tier._bucket or 0))
+                parts.append(struct.pack(f"<{len(self.columns)}d", *tier._sums))
+                parts.append(struct.pack(f"<{len(self.columns)}I", *tier._counts))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Restore history saved by save(); returns False if the file is missing or unusable.
+
+        Tiers and columns are matched by resolution and name, so a file from a
+        build with different columns still restores the ones both have.
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, version, column_count, big_endian = _HEADER.unpack_from(data, 0)
+        except (OSError, struct.error):
+            return False
+        if magic != _MAGIC or version not in _READABLE_VERSIONS:
+            return False
+        swap = bool(big_endian) != (sys.byteorder == "big")
+
+        try:
+            offset = _HEADER.size
+            names = []
+            for _ in range(column_count):
+                (length,) = _NAME_LENGTH.unpack_from(data, offset)
+                offset += _NAME_LENGTH.size
+                names.append(data[offset:offset + length].decode("utf-8"))
+                offset += length
+            (tier_count,) = _NAME_LENGTH.unpack_from(data, offset)
+            offset += _NAME_LENGTH.size
+
+            with self._lock:
+                for _ in range(tier_count):
+                    resolution, capacity, count, head, appended = _TIER_HEADER.unpack_from(data, offset)
+                    offset += _TIER_HEADER.size
+                    times = array("d")
+                    times.frombytes(data[offset:offset + 8 * capacity])
+                    offset += 8 * capacity
+                    columns = []
+                    for _ in names:
+                        column = array("f")
+                        column.frombytes(data[offset:offset + 4 * capacity])
+                        offset += 4 * capacity
+                        columns.append(column)
+                    if swap:
+                        times.byteswap()
+                        for column in columns:
+                            column.byteswap()
+                    bucket = None
+                    sums = counts = ()
+                    if version >= 2:
+                        has_bucket, bucket = _BUCKET_HEADER.unpack_from(data, offset)
+                        offset += _BUCKET_HEADER.size
+                        sums = struct.unpack_from(f"<{len(names)}d", data, offset)
+                        offset += 8 * len(names)
+                        counts = struct.unpack_from(f"<{len(names)}I", data, offset)
+                        offset += 4 * len(names)
+                        if not has_bucket:
+                            bucket = None
+                    self._restore_tier(resolution, capacity, count, head, appended, times, dict(zip(names, columns)),
+                                       bucket, dict(zip(names, zip(sums, counts))))
+        except (struct.error, ValueError, UnicodeDecodeError):
+            return False
+        return True
+
+    def _restore_tier(self, resolution, capacity, count, head, appended, times, columns, bucket, partial):
+        # Caller holds self._lock; `partial` maps column names to the open bucket's (sum, count)
+        for tier in self._tiers:
+            if tier.resolution == resolution and tier.capacity == capacity and len(times) == capacity:
+                tier.times = times
+                tier.values = [columns.get(name) or array("f", [NAN]) * capacity for name in self.columns]
+                tier.count, tier.head, tier.appended = count, head, appended
+                tier._bucket = bucket
+                tier._sums = [partial.get(name, (0.0, 0))[0] for name in self.columns]
+                tier._counts = [partial.get(name, (0.0, 0))[1] for name in self.columns]
+                return
+
+
+def nan_to_none(value):
+    return None if value is None or math.isnan(value) else value